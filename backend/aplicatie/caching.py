@@ -0,0 +1,17 @@
+from django.conf import settings
+
+from .forecasting.cache import ForecastCache
+
+_forecast_cache = None
+
+
+def get_forecast_cache():
+    """Instanța de proces a cache-ului de prognoze, configurată din settings.FORECAST_CACHE."""
+    global _forecast_cache
+    if _forecast_cache is None:
+        _forecast_cache = ForecastCache(**getattr(settings, 'FORECAST_CACHE', {}))
+    return _forecast_cache
+
+
+def invalidate_stock(stock_id):
+    get_forecast_cache().invalidate(stock_id)
@@ -0,0 +1,60 @@
+"""
+Formatul compact (opțional) pentru prognoze și planuri: coloane în loc de o listă
+de dict-uri per rând, date ca ISO (YYYY-MM-DD) sau zile de la 1970-01-01,
+valori reale rotunjite.
+
+    ?compact=1&dates=iso|epoch&decimals=2
+"""
+import numpy as np
+import pandas as pd
+
+DATE_FORMATS = ('iso', 'epoch')
+DEFAULT_DECIMALS = 2
+MAX_DECIMALS = 6
+
+
+def compact_options(params):
+    """
+    Opțiunile din query string: None pentru formatul clasic (listă de rânduri).
+    Ridică ValueError pentru valori invalide.
+    """
+    if params.get('compact') not in ('1', 'true'):
+        return None
+    dates = params.get('dates', 'iso')
+    if dates not in DATE_FORMATS:
+        raise ValueError('dates trebuie să fie iso sau epoch')
+    try:
+        decimals = int(params.get('decimals', DEFAULT_DECIMALS))
+    except ValueError:
+        raise ValueError('decimals trebuie să fie un număr întreg')
+    if not 0 <= decimals <= MAX_DECIMALS:
+        raise ValueError(f'decimals trebuie să fie între 0 și {MAX_DECIMALS}')
+    return {'dates': dates, 'decimals': decimals}
+
+
+def compact_frame(df, dates='iso', decimals=DEFAULT_DECIMALS, date_columns=()):
+    """
+    {'length': n, 'dates': 'iso'|'epoch', 'columns': {nume: listă}}.
+    Coloanele datetime64 (și cele din `date_columns`, ex. date ISO deja serializate)
+    devin date; coloanele float sunt rotunjite la `decimals`.
+    """
+    columns = {}
+    for name in df.columns:
+        values = df[name]
+        if name in date_columns or pd.api.types.is_datetime64_any_dtype(values):
+            days = pd.to_datetime(values).to_numpy(dtype='datetime64[D]')
+            if dates == 'epoch':
+                columns[name] = days.astype(np.int64).tolist()
+            else:
+                columns[name] = np.datetime_as_string(days, unit='D').tolist()
+        elif pd.api.types.is_float_dtype(values):
+            columns[name] = np.round(values.to_numpy(dtype=np.float64), decimals).tolist()
+        else:
+            columns[name] = values.tolist()
+    return {'length': len(df), 'dates': dates, 'columns': columns}
+
+
+def compact_records(records, options, date_columns=('review_date',)):
+    """Ca compact_frame, pentru o listă de rânduri deja serializată (ex. ForecastJob.result)."""
+    df = pd.DataFrame.from_records(records)
+    return compact_frame(df, date_columns=[c for c in date_columns if c in df.columns], **options)
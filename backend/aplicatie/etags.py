@@ -0,0 +1,63 @@
+"""
+Funcții etag/last_modified pentru django.views.decorators.http.condition.
+Sunt apelate în interiorul @api_view (request.user e deja autentificat) și costă
+cel mult un query agregat, în loc de serializarea completă a răspunsului.
+Stock.updated_at e atins la orice modificare a istoricului (rollups.refresh_snapshot).
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Stock, ForecastRun
+from .forecasting.models import MODEL_VERSIONS
+
+
+def _digest(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+def stock_list_etag(request, *args, **kwargs):
+    if request.method != 'GET':
+        return None
+    agg = Stock.objects.filter(user=request.user).aggregate(n=Count('id'), changed=Max('updated_at'))
+    return _digest('stocks', request.path, request.user.pk, agg['n'], agg['changed'], request.GET.urlencode())
+
+
+def _stock_state(request, pk):
+    return (Stock.objects
+            .filter(pk=pk, user=request.user)
+            .values_list('updated_at', 'snapshot__last_date', 'snapshot__days')
+            .first())
+
+
+def stock_etag(request, pk, *args, **kwargs):
+    state = _stock_state(request, pk)
+    if state is None:
+        return None
+    return _digest('stock', request.path, pk, state, request.GET.urlencode())
+
+
+def stock_last_modified(request, pk, *args, **kwargs):
+    state = _stock_state(request, pk)
+    return state[0] if state else None
+
+
+def alerts_etag(request, *args, **kwargs):
+    # planurile se creează / șterg doar odată cu run-ul lor; din stoc apare doar stock_name
+    agg = (ForecastRun.objects
+           .filter(stock__user=request.user)
+           .aggregate(n=Count('id'), last=Max('id'), stock_changed=Max('stock__updated_at')))
+    # upcoming=1 depinde de ziua curentă
+    return _digest('alerts', request.user.pk, agg['n'], agg['last'], agg['stock_changed'], timezone.localdate(),
+                   request.GET.urlencode())
+
+
+def forecast_etag(request, *args, **kwargs):
+    pid = request.GET.get('product_id')
+    if not pid or not pid.isdigit():
+        return None
+    state = Stock.objects.filter(pk=pid).values_list('updated_at', 'min_stock_level').first()
+    if state is None:
+        return None
+    return _digest('forecast', pid, state, sorted(MODEL_VERSIONS.items()), request.GET.urlencode())
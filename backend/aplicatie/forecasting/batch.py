@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .pipeline import auto_forecast_pipeline, _can_fork
+from .inventory import generate_order_plan
+
+
+def _pool_context():
+    # fork evită re-importul Prophet/statsmodels în fiecare worker, dar doar fără alte
+    # thread-uri în proces (server WSGI cu thread-uri): altfel forkserver / spawn
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods and _can_fork():
+        return multiprocessing.get_context("fork")
+    if "forkserver" in methods:
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def forecast_job(job, cache=None):
+    """Rulează pipeline-ul + planul pentru un singur stoc; nu ridică excepții."""
+    start = time.perf_counter()
+    previous = job.get("states") or {}
+    states = dict(previous)
+    result = {"stock_id": job["stock_id"], "status": "failed", "model": None,
+              "wape": None, "forecast": None, "plan": None, "error": None, "states": {}, "diagnostics": {}}
+    try:
+        fc_df, wape, model_name = auto_forecast_pipeline(
+            job["history"], horizon_days=job["horizon_days"], cache=cache, cache_tag=job["stock_id"],
+            states=states, prepared=job.get("prepared", False), diagnostics=result["diagnostics"],
+            parallel=False  # pool-ul ocupă deja toate nucleele
+        )
+        if fc_df is None:
+            result["error"] = model_name
+        else:
+            result["plan"] = generate_order_plan(
+                fc_df,
+                current_stock=job["current_stock"],
+                min_stock_level=job["min_stock_level"],
+                review_period_days=job["review_days"]
+            )
+            result.update(status="ok", model=model_name, wape=float(wape), forecast=fc_df)
+        # doar stările re-antrenate (identitatea nu supraviețuiește trecerii între procese)
+        result["states"] = {k: v for k, v in states.items() if v is not previous.get(k)}
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def batch_forecast(jobs, max_workers=None, cache=None):
+    """
+    Prognoză pentru mai multe stocuri în paralel (ProcessPoolExecutor).
+    `jobs` e o listă de dict-uri cu cheile: stock_id, history, horizon_days,
+    current_stock, min_stock_level, review_days și opțional prepared (history vine
+    deja din prep_data / PreparedPanel) și states (pentru update
+    incremental; stările re-antrenate vin înapoi în rezultat). Rezultatele păstrează ordinea job-urilor.
+    Cu `cache`, workerii împart doar nivelul de pe disc al cache-ului.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return [forecast_job(job, cache) for job in jobs]
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        futures = {pool.submit(forecast_job, job, cache): i for i, job in enumerate(jobs)}
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                results[i] = fut.result()
+            except Exception as e:
+                # workerul a murit (ex. OOM) - nu pierdem restul batch-ului
+                results[i] = {"stock_id": jobs[i]["stock_id"], "status": "failed", "model": None,
+                              "wape": None, "forecast": None, "plan": None,
+                              "error": str(e), "seconds": None, "states": {}, "diagnostics": {}}
+    return results
@@ -0,0 +1,138 @@
+import glob
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def fingerprint(df, horizon_days, config=None):
+    """Hash pentru seria pregătită (prep_data) + orizont + configurația modelelor."""
+    h = hashlib.sha256()
+    h.update(",".join(df.columns).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    h.update(repr((int(horizon_days), sorted((config or {}).items()))).encode())
+    return h.hexdigest()
+
+
+class ForecastCache:
+    """
+    Cache pe două niveluri pentru rezultatele pipeline-ului: memorie (LRU) și,
+    opțional, un director pe disc partajat între procese. Intrările expiră după
+    `ttl` secunde. Cheile sunt content-addressed, deci un istoric modificat nu
+    poate lovi o intrare veche; `invalidate(tag)` doar eliberează spațiul.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600, directory=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = str(directory) if directory else None
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self._counts = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0,
+                        "sets": 0, "evictions": 0, "invalidations": 0}
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def __getstate__(self):
+        # trimis către procesele din batch: doar configurația, fără intrările din memorie
+        return {"max_entries": self.max_entries, "ttl": self.ttl, "directory": self.directory}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _path(self, tag, key):
+        return os.path.join(self.directory, f"{tag}_{key}.pkl")
+
+    def _count(self, name):
+        self._counts[name] += 1
+
+    def get(self, tag, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get((tag, key))
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end((tag, key))
+                    self._count("hits")
+                    self._count("memory_hits")
+                    return value
+                del self._memory[(tag, key)]
+
+        if self.directory:
+            path = self._path(tag, key)
+            try:
+                with open(path, "rb") as fh:
+                    expires_at, value = pickle.load(fh)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+            else:
+                if expires_at > now:
+                    with self._lock:
+                        self._remember(tag, key, expires_at, value)
+                        self._count("hits")
+                        self._count("disk_hits")
+                    return value
+                self._remove(path)
+
+        with self._lock:
+            self._count("misses")
+        return None
+
+    def set(self, tag, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(tag, key, expires_at, value)
+            self._count("sets")
+
+        if self.directory:
+            path = self._path(tag, key)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                pickle.dump((expires_at, value), fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    def _remember(self, tag, key, expires_at, value):
+        self._memory[(tag, key)] = (expires_at, value)
+        self._memory.move_to_end((tag, key))
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._count("evictions")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def invalidate(self, tag):
+        with self._lock:
+            for k in [k for k in self._memory if k[0] == tag]:
+                del self._memory[k]
+            self._count("invalidations")
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, f"{tag}_*.pkl")):
+                self._remove(path)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, "*.pkl")):
+                self._remove(path)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats["entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl"] = self.ttl
+        stats["directory"] = self.directory
+        return stats
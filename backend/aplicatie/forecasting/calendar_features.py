@@ -0,0 +1,74 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import holidays
+
+# intervalul precalculat o singură dată per proces; datele din afara lui extind intervalul
+DEFAULT_YEARS = (2000, 2040)
+HOLIDAY_WINDOW = 1
+
+
+@lru_cache(maxsize=8)
+def country_holidays(country, start_year, end_year):
+    """Sărbătorile legale (dată -> nume) ca Series sortată; memoizat per proces."""
+    cal = holidays.country_holidays(country, years=range(start_year, end_year + 1))
+    days = pd.Series(dict(sorted(cal.items())), dtype=object)
+    days.index = pd.to_datetime(days.index)
+    return days
+
+
+@lru_cache(maxsize=8)
+def _calendar(country, start_year, end_year):
+    dates = pd.date_range(f"{start_year}-01-01", f"{end_year}-12-31", freq="D")
+    days = country_holidays(country, start_year, end_year)
+
+    is_holiday = dates.isin(days.index).astype(float)
+    # ziua dinainte/de după o sărbătoare (fereastra folosită și de Prophet)
+    before = np.zeros(len(dates))
+    after = np.zeros(len(dates))
+    for k in range(1, HOLIDAY_WINDOW + 1):
+        before[:-k] = np.maximum(before[:-k], is_holiday[k:])
+        after[k:] = np.maximum(after[k:], is_holiday[:-k])
+
+    features = pd.DataFrame({
+        "is_holiday": is_holiday,
+        "pre_holiday": before * (1 - is_holiday),
+        "post_holiday": after * (1 - is_holiday),
+        "day_of_week": dates.dayofweek.to_numpy(),
+        "is_weekend": (dates.dayofweek >= 5).astype(float),
+        "month": dates.month.to_numpy(),
+    }, index=dates)
+    return features
+
+
+def calendar_features(dates, country="RO"):
+    """Feature-urile de calendar pentru `dates` (istorice sau viitoare), aliniate pe poziție."""
+    dates = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+    start_year, end_year = DEFAULT_YEARS
+    if len(dates):
+        start_year = min(start_year, dates.min().year)
+        end_year = max(end_year, dates.max().year)
+
+    cal = _calendar(country, start_year, end_year)
+    pos = (dates - cal.index[0]).days.to_numpy()
+    return pd.DataFrame(cal.to_numpy()[pos], columns=cal.columns, index=dates)
+
+
+def holiday_flags(dates, country="RO"):
+    return calendar_features(dates, country)["is_holiday"].to_numpy()
+
+
+def holidays_frame(years, country="RO"):
+    """Sărbătorile pentru anii dați, în formatul `holidays` din Prophet."""
+    years = list(years)
+    days = country_holidays(country, *DEFAULT_YEARS)
+    if years and (min(years) < DEFAULT_YEARS[0] or max(years) > DEFAULT_YEARS[1]):
+        days = country_holidays(country, min(years), max(years))
+    days = days[days.index.year.isin(years)]
+    return pd.DataFrame({
+        "ds": days.index,
+        "holiday": days.to_numpy(),
+        "lower_window": 0,
+        "upper_window": HOLIDAY_WINDOW,
+    })
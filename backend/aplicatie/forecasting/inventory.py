@@ -1,4 +1,9 @@
+import numpy as np
 import pandas as pd
+
+from .spans import timed
+
+
 def max_horizon(years):
     if years < 1: return 0
     if years < 2: return 3
@@ -7,30 +12,90 @@ def max_horizon(years):
     return 12
 
 
+def _plan_arrays(codes, ds, yhat, current_stock, min_stock_level, review_period_days):
+    """
+    Nucleul vectorizat al planului. `codes` (0..n-1, grupate și sortate după ds)
+    identifică seria; current_stock/min_stock_level sunt array-uri indexate după cod.
+
+    Recursia pe perioade e stock_{k+1} = max(stock_k - demand_k, min_stock), cu forma
+    închisă end_stock_k = max(stock_0, min_stock + cummax(C)_k) - C_k, C = cumsum(demand).
+    """
+    if len(ds) == 0:
+        empty = np.empty(0)
+        return {"codes": codes[:0], "review_date": ds[:0], "stock_before": empty, "demand_next": empty,
+                "order_qty": empty, "end_stock_est": empty}
+
+    days = ds.astype("datetime64[D]").astype(np.int64)
+
+    series_start = np.r_[True, codes[1:] != codes[:-1]]
+    first_day = np.maximum.accumulate(np.where(series_start, np.arange(len(days)), 0))
+    period_id = (days - days[first_day]) // review_period_days
+
+    seg_start = np.flatnonzero(series_start | np.r_[True, period_id[1:] != period_id[:-1]])
+    demand = np.add.reduceat(yhat, seg_start)
+    seg_codes = codes[seg_start]
+
+    cum = pd.Series(demand).groupby(seg_codes).cumsum().to_numpy()
+    cummax = pd.Series(cum).groupby(seg_codes).cummax().to_numpy()
+
+    s0 = current_stock[seg_codes]
+    end_stock = np.maximum(s0, min_stock_level[seg_codes] + cummax) - cum
+    stock_before = np.where(np.r_[True, seg_codes[1:] != seg_codes[:-1]], s0, np.r_[0.0, end_stock[:-1]])
+    order = end_stock + demand - stock_before
+
+    return {
+        "codes": seg_codes,
+        "review_date": ds[seg_start],
+        "stock_before": np.round(stock_before, 1),
+        "demand_next": np.round(demand, 1),
+        "order_qty": np.round(order, 1),
+        "end_stock_est": np.round(end_stock, 1),
+    }
+
+
+@timed("order_plan")
 def generate_order_plan(forecast_df, current_stock, min_stock_level, review_period_days=14):
-    fc = forecast_df.copy()
-    fc["period_id"] = ((fc["ds"] - fc["ds"].min()).dt.days // review_period_days)
-
-    plan = fc.groupby("period_id").agg(
-        period_start=("ds", "min"),
-        total_demand=("yhat", "sum")
-    ).reset_index()
-
-    rows = []
-    stock = float(current_stock)
-
-    for _, row in plan.iterrows():
-        required = row["total_demand"] + min_stock_level
-        order = max(0, required - stock)
-        end_stock = stock + order - row["total_demand"]
-
-        rows.append({
-            "review_date": row["period_start"].date(),
-            "stock_before": round(stock, 1),
-            "demand_next": round(row["total_demand"], 1),
-            "order_qty": round(order, 1),
-            "end_stock_est": round(end_stock, 1)
-        })
-        stock = end_stock
-
-    return pd.DataFrame(rows)
\ No newline at end of file
+    fc = forecast_df.sort_values("ds", kind="stable")
+    ds = fc["ds"].to_numpy(dtype="datetime64[ns]")
+    yhat = fc["yhat"].to_numpy(dtype=float)
+
+    plan = _plan_arrays(
+        np.zeros(len(ds), dtype=np.int64), ds, yhat,
+        np.array([float(current_stock)]), np.array([float(min_stock_level)]),
+        review_period_days
+    )
+    return pd.DataFrame({
+        "review_date": pd.DatetimeIndex(plan["review_date"]).date,
+        "stock_before": plan["stock_before"],
+        "demand_next": plan["demand_next"],
+        "order_qty": plan["order_qty"],
+        "end_stock_est": plan["end_stock_est"],
+    })
+
+
+@timed("order_plan")
+def generate_order_plans(forecast_df, current_stock, min_stock_level, review_period_days=14):
+    """
+    Planuri pentru mai multe stocuri deodată. `forecast_df` e în format lung
+    (stock_id, ds, yhat); current_stock și min_stock_level sunt mapări / Series
+    stock_id -> valoare. Întoarce un singur DataFrame cu coloana stock_id și
+    review_date ca datetime64.
+    """
+    codes, stock_ids = pd.factorize(forecast_df["stock_id"])
+    order = np.lexsort((forecast_df["ds"].to_numpy(dtype="datetime64[ns]"), codes))
+    codes = codes[order]
+    ds = forecast_df["ds"].to_numpy(dtype="datetime64[ns]")[order]
+    yhat = forecast_df["yhat"].to_numpy(dtype=float)[order]
+
+    current = pd.Series(current_stock).reindex(stock_ids).fillna(0).to_numpy(dtype=float)
+    minimum = pd.Series(min_stock_level).reindex(stock_ids).fillna(0).to_numpy(dtype=float)
+
+    plan = _plan_arrays(codes, ds, yhat, current, minimum, review_period_days)
+    return pd.DataFrame({
+        "stock_id": stock_ids.to_numpy()[plan["codes"]],
+        "review_date": plan["review_date"],
+        "stock_before": plan["stock_before"],
+        "demand_next": plan["demand_next"],
+        "order_qty": plan["order_qty"],
+        "end_stock_est": plan["end_stock_est"],
+    })
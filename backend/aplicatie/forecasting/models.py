@@ -1,67 +1,226 @@
+import hashlib
+import time
+
 from prophet import Prophet
 from statsmodels.tsa.statespace.sarimax import SARIMAX
+import numpy as np
 import pandas as pd
 from .preprocessing import get_holidays_ro
+from .calendar_features import holiday_flags
+from .spans import timed
+
+PROPHET_CONFIG = {
+    "changepoint_prior_scale": 0.3,
+    "seasonality_prior_scale": 10,
+    "holidays_prior_scale": 80,
+    "seasonality_mode": "multiplicative",
+    "weekly_seasonality": True,
+    "yearly_seasonality": True,
+}
+
+SARIMA_CONFIG = {
+    "order": (1, 1, 1),
+    "seasonal_order": (0, 1, 1, 7),
+    "enforce_stationarity": False,
+    "enforce_invertibility": False,
+}
+
+# SARIMA incremental: fit complet după atâtea zile noi de la ultimul fit sau când
+# eroarea one-step pe zilele noi depășește de atâtea ori MAE-ul din fit
+SARIMA_REFIT_DAYS = 28
+SARIMA_DRIFT_FACTOR = 2.0
+
+# regresorii exogeni ai SARIMA nu apar în SARIMA_CONFIG (care merge direct în SARIMAX):
+# la orice schimbare a lor se schimbă și valoarea de aici
+SARIMA_EXOG = "is_holiday:calendar+history"
+
+# intră în cheia de cache: orice schimbare de parametri invalidează rezultatele vechi
+MODEL_CONFIG = {"prophet": PROPHET_CONFIG, "sarima": {**SARIMA_CONFIG, "exog": SARIMA_EXOG}}
+
+
+def config_version(config):
+    return hashlib.sha256(repr(sorted(config.items())).encode()).hexdigest()[:12]
+
+
+# stările salvate cu altă versiune (ex. priors schimbate) nu mai sunt folosite
+MODEL_VERSIONS = {
+    "Prophet": config_version(PROPHET_CONFIG),
+    "SARIMA": config_version(MODEL_CONFIG["sarima"]),
+}
 
 
 def run_prophet(df, horizon_days):
+    return fit_prophet(df, horizon_days)[0]
+
+
+def _prophet_init(model):
+    # parametrii MAP în formatul acceptat de Prophet.fit(init=...)
+    init = {name: float(model.params[name][0][0]) for name in ("k", "m", "sigma_obs")}
+    for name in ("delta", "beta"):
+        init[name] = np.asarray(model.params[name][0], dtype=float)
+    return init
+
+
+@timed("prophet")
+def fit_prophet(df, horizon_days, state=None):
+    """
+    Ca run_prophet, dar întoarce și parametrii antrenați. Cu o stare compatibilă
+    (aceeași versiune de config), optimizarea Stan pornește din parametrii anteriori.
+    """
     years = range(df["ds"].dt.year.min(), df["ds"].dt.year.max() + 2)
     holidays_df = get_holidays_ro(years)
+    version = config_version(PROPHET_CONFIG)
 
-    model = Prophet(
-        changepoint_prior_scale=0.3,
-        seasonality_prior_scale=10,
-        holidays=holidays_df,
-        holidays_prior_scale=80,
-        seasonality_mode="multiplicative",
-        weekly_seasonality=True,
-        yearly_seasonality=True
+    init = None
+    if state and state.get("config") == version:
+        init = state["params"]
 
-    )
+    start = time.perf_counter()
+    model = None
+    if init is not None:
+        try:
+            model = Prophet(holidays=holidays_df, **PROPHET_CONFIG)
+            model.fit(df, init=init)
+        except Exception:
+            # dimensiuni diferite (ex. sărbători/an nou în istoric): fit de la zero
+            model = None
+    warm = model is not None
+    if model is None:
+        model = Prophet(holidays=holidays_df, **PROPHET_CONFIG)
+        model.fit(df)
+    seconds = time.perf_counter() - start
 
-    model.fit(df)
     future = model.make_future_dataframe(periods=horizon_days)
     forecast = model.predict(future)
 
     fc = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].tail(horizon_days)
     fc.columns = ["ds", "yhat", "yhat_low", "yhat_high"]
-    return fc.clip(lower=0)
+    value_cols = ["yhat", "yhat_low", "yhat_high"]
+    fc[value_cols] = fc[value_cols].clip(lower=0)
+
+    cold_seconds = state.get("cold_seconds") if warm else seconds
+    return fc.reset_index(drop=True), {
+        "config": version,
+        "params": _prophet_init(model),
+        "warm": warm,
+        "fit_seconds": seconds,
+        "cold_seconds": cold_seconds,
+    }
+
+
+def _series_hash(series, exog, n):
+    h = hashlib.sha256()
+    h.update(str(series.index[0]).encode())
+    h.update(np.ascontiguousarray(series.to_numpy(dtype=float)[:n]).tobytes())
+    if exog is not None:
+        h.update(np.ascontiguousarray(exog.to_numpy(dtype=float)[:n]).tobytes())
+    return h.hexdigest()
+
+
+def _sarima_state(res, series, exog, fitted_nobs, mae, updates, fit_seconds, cold_seconds):
+    last = res.nobs - 1
+    return {
+        "config": MODEL_VERSIONS["SARIMA"],
+        "params": np.asarray(res.params),
+        "exog": exog is not None,
+        "nobs": len(series),
+        "end": series.index[-1],
+        "prefix_hash": _series_hash(series, exog, len(series)),
+        # starea prezisă pentru ultima observație: de aici reluăm filtrul la update
+        "state": res.predicted_state[:, last].copy(),
+        "state_cov": res.predicted_state_cov[:, :, last].copy(),
+        "fitted_nobs": fitted_nobs,
+        "mae": mae,
+        "updates": updates,
+        "warm": updates > 0,
+        "fit_seconds": fit_seconds,
+        "cold_seconds": cold_seconds,
+    }
+
+
+def _can_extend(state, series, exog):
+    if not state or state.get("config") != MODEL_VERSIONS["SARIMA"]:
+        return False
+    if state["exog"] != (exog is not None):
+        return False
+    k = state["nobs"]
+    if len(series) < k or series.index[k - 1] != state["end"]:
+        return False
+    if len(series) - state["fitted_nobs"] >= SARIMA_REFIT_DAYS:
+        return False
+    return _series_hash(series, exog, k) == state["prefix_hash"]
+
+
+def _extend_sarima(series, exog, state):
+    """Filtrează doar zilele noi cu parametrii salvați; None dacă se detectează drift."""
+    k = state["nobs"]
+    model = SARIMAX(
+        series.iloc[k - 1:],
+        exog=exog.iloc[k - 1:] if exog is not None else None,
+        **SARIMA_CONFIG
+    )
+    model.initialize_known(state["state"], state["state_cov"])
+    res = model.filter(state["params"])
+
+    if res.nobs > 1:
+        err = np.abs(res.forecasts_error[0, 1:]).mean()
+        if err > SARIMA_DRIFT_FACTOR * max(state["mae"], 1e-9):
+            return None
+    return res
 
 
 def run_sarima(df, horizon_days):
+    return fit_sarima(df, horizon_days)[0]
+
+
+@timed("sarima")
+def fit_sarima(df, horizon_days, state=None):
+    """
+    Ca run_sarima, dar întoarce și starea modelului (parametri + starea filtrului).
+    Dacă istoricul doar a crescut la final față de `state`, modelul e extins cu zilele
+    noi fără re-optimizare; altfel (config schimbat, istoric rescris, drift sau
+    SARIMA_REFIT_DAYS zile noi de la ultimul fit) se face fit complet.
+    """
     series = df.set_index("ds")["y"].asfreq("D").fillna(0)
 
-    exog = None
+    # sărbătorile legale din calendar + cele marcate manual în istoric
+    holiday = holiday_flags(series.index)
     if "is_holiday" in df.columns:
-        exog = df.set_index("ds")[["is_holiday"]].asfreq("D").fillna(0)
+        marked = df.set_index("ds")["is_holiday"].asfreq("D").fillna(0).to_numpy(dtype=float)
+        holiday = np.maximum(holiday, marked)
+    exog = pd.DataFrame({"is_holiday": holiday}, index=series.index)
 
-    model = SARIMAX(
-        series,
-        exog=exog,
-        order=(1, 1, 1),
-        seasonal_order=(0, 1, 1, 7),
-        enforce_stationarity=False,
-        enforce_invertibility=False
-    )
+    start = time.perf_counter()
+    res = None
+    if _can_extend(state, series, exog):
+        res = _extend_sarima(series, exog, state)
 
-    res = model.fit(disp=False)
+    if res is not None:
+        new_state = _sarima_state(res, series, exog, state["fitted_nobs"], state["mae"], state["updates"] + 1,
+                                  time.perf_counter() - start, state.get("cold_seconds"))
+    else:
+        model = SARIMAX(
+            series,
+            exog=exog,
+            **SARIMA_CONFIG
+        )
+
+        res = model.fit(disp=False)
+        mae = float(np.abs(res.resid[-56:]).mean())
+        seconds = time.perf_counter() - start
+        new_state = _sarima_state(res, series, exog, len(series), mae, 0, seconds, seconds)
 
     # Future exog (foarte important!)
-    future_exog = None
-    if exog is not None:
-        future_dates = pd.date_range(series.index.max() + pd.Timedelta(days=1),
-                                      periods=horizon_days)
-        future_exog = pd.DataFrame(
-            {"is_holiday": [1 if d in exog.index and exog.loc[d, "is_holiday"] == 1 else 0
-                            for d in future_dates]},
-            index=future_dates
-        )
+    future_dates = pd.date_range(series.index.max() + pd.Timedelta(days=1),
+                                  periods=horizon_days)
+    future_exog = pd.DataFrame({"is_holiday": holiday_flags(future_dates)}, index=future_dates)
 
     fc = res.get_forecast(steps=horizon_days, exog=future_exog)
 
+    conf = fc.conf_int()
     return pd.DataFrame({
         "ds": future_dates,
-        "yhat": fc.predicted_mean.clip(lower=0),
-        "yhat_low": fc.conf_int().iloc[:, 0].clip(lower=0),
-        "yhat_high": fc.conf_int().iloc[:, 1].clip(lower=0),
-    })
+        "yhat": fc.predicted_mean.clip(lower=0).to_numpy(),
+        "yhat_low": conf.iloc[:, 0].clip(lower=0).to_numpy(),
+        "yhat_high": conf.iloc[:, 1].clip(lower=0).to_numpy(),
+    }), new_state
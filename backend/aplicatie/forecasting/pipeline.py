@@ -1,34 +1,279 @@
+import logging
+import multiprocessing
+import threading
+import time
+from multiprocessing.connection import wait
+
+import numpy as np
+
 from .preprocessing import prep_data
-from .models import run_prophet, run_sarima
+from .models import fit_prophet, fit_sarima, MODEL_CONFIG
+from .cache import fingerprint
+from .calendar_features import calendar_features
+from .spans import span, record, timed
+
+logger = logging.getLogger(__name__)
+
+# ordinea contează: la egalitate de WAPE câștigă primul model.
+# Fiecare fitter primește (df, horizon_days, state) și întoarce (forecast, state nou).
+CANDIDATES = (
+    ("Prophet", fit_prophet),
+    ("SARIMA", fit_sarima),
+)
+
+# un model oprit devreme (vezi early_stop_margin) e totuși antrenat complet după atâtea
+# opriri consecutive, ca WAPE-ul lui din stare să nu rămână vechi la nesfârșit
+EARLY_STOP_MAX_SKIPS = 3
 
 
 def wape(y_true, y_pred):
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
     denom = y_true.sum()
-    return ((y_true - y_pred).abs().sum() / denom) if denom > 0 else 0
+    return float(np.abs(y_true - y_pred).sum() / denom) if denom > 0 else 0
+
 
+@timed("pipeline")
+def auto_forecast_pipeline(df_raw, horizon_days, cache=None, cache_tag=None,
+                           parallel=True, timeout=None, early_stop_wape=None, states=None, prepared=False,
+                           diagnostics=None, early_stop_margin=None):
+    """
+    `diagnostics` (dict, opțional) e completat cu detaliile rulării: modelul ales, WAPE și
+    durata fiecărui candidat, numărul de zile din istoric, dacă rezultatul a venit din cache.
+    """
+    started = time.perf_counter()
+    # prepared=True: df_raw vine deja din prep_data / PreparedPanel.frame
+    df = df_raw if prepared else prep_data(df_raw)
+    report = diagnostics if diagnostics is not None else {}
+    report.update(points=len(df), horizon_days=horizon_days, parallel=bool(parallel), cached=False, candidates={})
+    options = {"parallel": parallel, "timeout": timeout, "early_stop_wape": early_stop_wape, "states": states,
+               "diagnostics": report, "early_stop_margin": early_stop_margin}
+    if cache is None:
+        result = forecast_prepared(df, horizon_days, **options)
+    else:
+        with span("forecast_cache"):
+            key = fingerprint(df, horizon_days, MODEL_CONFIG)
+            hit = cache.get(cache_tag, key)
+        if hit is not None:
+            report["cached"] = True
+            result = hit
+        else:
+            result = forecast_prepared(df, horizon_days, **options)
+            if result[0] is not None:
+                cache.set(cache_tag, key, result)
 
-def auto_forecast_pipeline(df_raw, horizon_days):
-    df = prep_data(df_raw)
+    fc, wape_score, name = result
+    report["selected"] = name if fc is not None else None
+    report["wape"] = float(wape_score) if fc is not None else None
+    report["error"] = name if fc is None else None
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return result
 
+
+def forecast_prepared(df, horizon_days, parallel=True, timeout=None, early_stop_wape=None, states=None,
+                      diagnostics=None, early_stop_margin=None):
+    """
+    Antrenează modelele candidate și îl alege pe cel cu WAPE minim pe ultimele 14 zile.
+    Cu `parallel`, fiecare model rulează în propriul proces (doar dacă procesul nu are alte
+    thread-uri, vezi _can_fork); `timeout` (secunde) oprește modelele care nu termină la timp,
+    iar `early_stop_wape` oprește restul modelelor imediat ce unul a terminat cu un WAPE
+    cel mult egal cu pragul.
+    `early_stop_margin`: pre-check relativ, pe WAPE-ul din starea salvată a fiecărui model
+    (rularea anterioară). Un model încă neterminat e oprit (sau, secvențial, nici nu mai e
+    antrenat) dacă cel mai bun model terminat are WAPE * (1 + margin) < WAPE-ul lui anterior.
+    `states` (dict model -> stare) e folosit pentru update incremental și e
+    actualizat cu stările noi ale modelelor antrenate (cu WAPE-ul lor).
+    `diagnostics["candidates"]` primește, per model, status (ok/error/timeout/stopped),
+    WAPE, durata și eroarea, dacă a fost.
+    """
+    candidates = diagnostics.setdefault("candidates", {}) if diagnostics is not None else {}
     if len(df) < 14:
         return None, 0, "Insufficient Data"
 
-    fc_p, fc_s = None, None
-    wape_p, wape_s = 1e9, 1e9
+    actual = df["y"].tail(14)
+    prev_states = states or {}
+    stop = _EarlyStop(prev_states, early_stop_margin)
+    if parallel and not multiprocessing.current_process().daemon and _can_fork():
+        forecasts = _fit_parallel(df, horizon_days, actual, prev_states, timeout, early_stop_wape, candidates, stop)
+    else:
+        forecasts = _fit_sequential(df, horizon_days, prev_states, candidates, stop)
+
+    best = None
+    for name, _ in CANDIDATES:
+        if name in stop.stopped and states is not None:
+            states[name] = stop.stopped[name]
+        if name not in forecasts:
+            continue
+        fc, score, state = forecasts[name]
+        if states is not None and state is not None:
+            states[name] = {**state, "wape": score}
+        if best is None or score < best[1]:
+            best = (fc, score, name)
+
+    if best is None:
+        return None, 0, "No model converged"
+    return best
+
+
+def _can_fork():
+    """
+    fork doar dintr-un proces cu un singur thread: copilul ar moșteni lock-urile ținute de
+    celelalte (ex. server WSGI cu thread-uri), deci acolo fit-urile rulează secvențial.
+    Thread-urile marcate `fork_safe` (ex. flusher-ul de metrici) nu contează.
+    """
+    current = threading.current_thread()
+    return all(t is current or getattr(t, "fork_safe", False) for t in threading.enumerate())
+
+
+class _EarlyStop:
+    """Pre-check-ul relativ din forecast_prepared (early_stop_margin)."""
+
+    def __init__(self, states, margin):
+        self.states = states
+        self.margin = margin
+        self.best = None
+        self.stopped = {}  # model -> starea anterioară, cu contorul de opriri
+
+    def finished(self, score):
+        self.best = score if self.best is None else min(self.best, score)
 
+    def should_stop(self, name):
+        state = self.states.get(name) or {}
+        previous = state.get("wape")
+        if self.margin is None or self.best is None or previous is None:
+            return False
+        if state.get("early_stops", 0) >= EARLY_STOP_MAX_SKIPS:
+            return False
+        return self.best * (1 + self.margin) < previous
+
+    def stop(self, name):
+        state = self.states[name]
+        self.stopped[name] = {**state, "early_stops": state.get("early_stops", 0) + 1}
+
+
+def _score(actual, fc):
+    # un forecast mai scurt decât fereastra de test e evaluat doar pe zilele comune
+    n = min(len(actual), len(fc))
+    if n == 0:
+        raise ValueError("empty forecast")
+    return wape(actual.head(n), fc["yhat"].head(n))
+
+
+def _candidate(status, seconds, score=None, state=None, error=None):
+    entry = {"status": status, "seconds": round(seconds, 3), "wape": None if score is None else float(score)}
+    if state:
+        entry["warm"] = bool(state.get("warm"))
+        entry["fit_seconds"] = round(float(state.get("fit_seconds") or 0.0), 3)
+    if error:
+        entry["error"] = error
+    return entry
+
+
+def _fit_sequential(df, horizon_days, states, candidates, stop):
+    forecasts = {}
+    actual = df["y"].tail(14)
+    for name, fitter in CANDIDATES:
+        if stop.should_stop(name):
+            stop.stop(name)
+            candidates[name] = _candidate("stopped", 0.0)
+            continue
+        started = time.perf_counter()
+        try:
+            fc, state = fitter(df, horizon_days, states.get(name))
+            forecasts[name] = (fc, _score(actual, fc), state)
+            stop.finished(forecasts[name][1])
+        except Exception as e:
+            logger.warning("%s fit failed: %r", name, e, exc_info=True)
+            candidates[name] = _candidate("error", time.perf_counter() - started, error=repr(e))
+            continue
+        candidates[name] = _candidate("ok", time.perf_counter() - started, forecasts[name][1], state)
+    return forecasts
+
+
+def _process_context():
+    # fork: copiii moștenesc Prophet/statsmodels deja importate
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def _fit_worker(conn, fitter, df, horizon_days, state):
     try:
-        fc_p = run_prophet(df, horizon_days)
-        wape_p = wape(df["y"].tail(14), fc_p["yhat"].head(14))
-    except:
-        pass
+        conn.send(("ok", fitter(df, horizon_days, state)))
+    except Exception as e:
+        conn.send(("error", repr(e)))
+    finally:
+        conn.close()
 
+
+def _fit_parallel(df, horizon_days, actual, states, timeout=None, early_stop_wape=None, candidates=None,
+                  stop=None):
+    # calendarul e memoizat per proces: îl construim înainte de fork ca să-l moștenească copiii
+    calendar_features(df["ds"].iloc[[0, -1]])
+    ctx = _process_context()
+    started = time.perf_counter()
+    running = {}
+    for name, fitter in CANDIDATES:
+        recv_conn, send_conn = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_fit_worker, args=(send_conn, fitter, df, horizon_days, states.get(name)),
+                           daemon=True)
+        proc.start()
+        send_conn.close()
+        running[recv_conn] = (name, proc)
+
+    forecasts = {}
+    candidates = {} if candidates is None else candidates
+    stop = stop or _EarlyStop(states, None)
+    deadline = time.monotonic() + timeout if timeout else None
+    unfinished = "stopped"
     try:
-        fc_s = run_sarima(df, horizon_days)
-        wape_s = wape(df["y"].tail(14), fc_s["yhat"].head(14))
-    except:
-        pass
+        while running:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready = wait(list(running), timeout=remaining)
+            if not ready:
+                unfinished = "timeout"  # ce n-a terminat e abandonat
+                break
+
+            for conn in ready:
+                name, proc = running.pop(conn)
+                try:
+                    outcome, payload = conn.recv()
+                except EOFError:
+                    outcome, payload = "error", "process exited"
+                conn.close()
+                proc.join()
+                # span-urile din procesul copil se pierd: durata modelului e măsurată de aici
+                seconds = time.perf_counter() - started
+                record(name.lower(), seconds)
+                if outcome == "ok":
+                    fc, state = payload
+                    try:
+                        score = _score(actual, fc)
+                    except Exception as e:
+                        outcome, payload = "error", repr(e)
+                    else:
+                        forecasts[name] = (fc, score, state)
+                        candidates[name] = _candidate("ok", seconds, score, state)
+                        stop.finished(score)
+                if outcome != "ok":
+                    logger.warning("%s fit failed: %s", name, payload)
+                    candidates[name] = _candidate("error", seconds, error=payload)
 
-    if wape_s < wape_p:
-        return fc_s, wape_s, "SARIMA"
+            if early_stop_wape is not None and any(f[1] <= early_stop_wape for f in forecasts.values()):
+                break
+            for conn, (name, proc) in list(running.items()):
+                if stop.should_stop(name):
+                    del running[conn]
+                    proc.terminate()
+                    proc.join()
+                    conn.close()
+                    stop.stop(name)
+                    candidates[name] = _candidate("stopped", time.perf_counter() - started)
+    finally:
+        for conn, (name, proc) in running.items():
+            candidates[name] = _candidate(unfinished, time.perf_counter() - started)
+            proc.terminate()
+            proc.join()
+            conn.close()
 
-    return fc_p, wape_p, "Prophet"
+    return forecasts
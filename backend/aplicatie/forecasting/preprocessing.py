@@ -1,18 +1,15 @@
 import numpy as np
 import pandas as pd
-import holidays
+
+from .calendar_features import holidays_frame
+from .spans import timed
 
 
 def get_holidays_ro(years):
-    ro = holidays.country_holidays("RO", years=list(years))
-    return pd.DataFrame({
-        "ds": pd.to_datetime(list(ro.keys())),
-        "holiday": list(ro.values()),
-        "lower_window": 0,
-        "upper_window": 1
-    })
+    return holidays_frame(years, "RO")
 
 
+@timed("prep_data")
 def prep_data(df, date_col="ds", sales_col="y", stock_col="stock_quantity"):
     cols_map = {date_col: "ds", sales_col: "y"}
     if stock_col in df.columns:
@@ -35,6 +32,91 @@ def prep_data(df, date_col="ds", sales_col="y", stock_col="stock_quantity"):
 
     cols = ["ds", "y"]
     if "is_holiday" in df.columns:
+        df["is_holiday"] = df["is_holiday"].fillna(0).clip(upper=1).astype(float)
         cols.append("is_holiday")
 
     return df[cols]
+
+
+class PreparedPanel:
+    """
+    Rezultatul prep_data_many: `y` (și opțional `is_holiday`) sunt matrice
+    (zile x serii) pe intervalul comun `dates`; în afara intervalului propriu
+    al fiecărei serii (start/end, indici de zi) valorile sunt NaN.
+    """
+
+    def __init__(self, dates, stock_ids, y, is_holiday, start, end):
+        self.dates = dates
+        self.stock_ids = stock_ids
+        self.y = y
+        self.is_holiday = is_holiday
+        self.start = start
+        self.end = end
+        self._pos = {sid: i for i, sid in enumerate(stock_ids)}
+
+    def __len__(self):
+        return len(self.stock_ids)
+
+    def frame(self, stock_id):
+        """Seria unui stoc în formatul întors de prep_data."""
+        i = self._pos[stock_id]
+        rows = slice(self.start[i], self.end[i] + 1)
+        out = pd.DataFrame({"ds": self.dates[rows], "y": self.y[rows, i]})
+        if self.is_holiday is not None:
+            out["is_holiday"] = self.is_holiday[rows, i]
+        return out
+
+    def frames(self):
+        for sid in self.stock_ids:
+            yield sid, self.frame(sid)
+
+
+@timed("prep_data")
+def prep_data_many(df, id_col="stock_id", date_col="ds", sales_col="y", stock_col="stock_quantity",
+                   holiday_col="is_holiday"):
+    """
+    Varianta vectorizată a prep_data pentru un DataFrame lung cu mai multe serii:
+    completarea zilelor lipsă, mascarea zilelor fără stoc și imputarea cu mediana
+    mobilă centrată se fac pe toată matricea deodată.
+    """
+    codes, stock_ids = pd.factorize(df[id_col], sort=True)
+    ds = pd.to_datetime(df[date_col]).to_numpy(dtype="datetime64[D]")
+    if len(ds) == 0:
+        return PreparedPanel(pd.DatetimeIndex([]), list(stock_ids), np.empty((0, 0)), None,
+                             np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    day0 = ds.min()
+    day = (ds - day0).astype(np.int64)
+    n_days, n_series = int(day.max()) + 1, len(stock_ids)
+
+    # duplicatele (stoc, zi) se adună, ca groupby("ds").sum() din prep_data
+    sales = np.zeros((n_days, n_series))
+    np.add.at(sales, (day, codes), df[sales_col].to_numpy(dtype=float))
+    present = np.zeros((n_days, n_series), dtype=bool)
+    present[day, codes] = True
+
+    y = np.where(present, sales, np.nan)
+    if stock_col in df.columns:
+        stock = np.zeros((n_days, n_series))
+        np.add.at(stock, (day, codes), df[stock_col].to_numpy(dtype=float))
+        y[present & (stock <= 0)] = np.nan
+
+    start = np.full(n_series, n_days, dtype=np.int64)
+    np.minimum.at(start, codes, day)
+    end = np.zeros(n_series, dtype=np.int64)
+    np.maximum.at(end, codes, day)
+    rows = np.arange(n_days)[:, None]
+    in_range = (rows >= start) & (rows <= end)
+
+    median = pd.DataFrame(y).rolling(7, min_periods=1, center=True).median().to_numpy()
+    y = np.where(np.isnan(y), median, y)
+    y = np.where(in_range, np.clip(np.nan_to_num(y, nan=0.0), 0, None), np.nan)
+
+    is_holiday = None
+    if holiday_col in df.columns:
+        flags = np.zeros((n_days, n_series))
+        np.add.at(flags, (day, codes), df[holiday_col].to_numpy(dtype=float))
+        is_holiday = np.where(in_range, np.minimum(flags, 1.0), np.nan)
+
+    dates = pd.date_range(pd.Timestamp(day0), periods=n_days, freq="D")
+    return PreparedPanel(dates, list(stock_ids), y, is_holiday, start, end)
@@ -0,0 +1,64 @@
+"""
+Durate pe etape pentru cererea curentă (afișate în header-ul Server-Timing).
+Colectorul stă într-un ContextVar pornit de middleware; fără colector activ
+(batch, worker, comenzi) `span` și `timed` nu măsoară nimic.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+_recorder = ContextVar("spans", default=None)
+
+
+class SpanRecorder:
+    def __init__(self):
+        self.spans = {}  # nume -> [secunde, apeluri], în ordinea primei apariții
+
+    def add(self, name, seconds, count=1):
+        entry = self.spans.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += count
+
+    def items(self):
+        return self.spans.items()
+
+
+def start():
+    """Pornește un colector nou pentru contextul curent; întoarce (colector, token pentru stop)."""
+    recorder = SpanRecorder()
+    return recorder, _recorder.set(recorder)
+
+
+def stop(token):
+    _recorder.reset(token)
+
+
+def record(name, seconds, count=1):
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.add(name, seconds, count)
+
+
+@contextmanager
+def span(name):
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add(name, time.perf_counter() - started)
+
+
+def timed(name):
+    """Decorator: fiecare apel al funcției e înregistrat ca span `name`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,83 @@
+"""
+Istorice de vânzări sintetice, reproductibile (seed), pentru benchmark-uri:
+trend, sezonalitate săptămânală și anuală, efectul sărbătorilor legale,
+perioade fără stoc (vânzări cenzurate la 0) și SKU-uri cu cerere intermitentă.
+"""
+import numpy as np
+import pandas as pd
+
+from .calendar_features import calendar_features
+
+# profilul săptămânal (luni..duminică) scalat cu amplitudinea fiecărei serii
+WEEKLY_PROFILE = np.array([-0.15, -0.1, -0.05, 0.0, 0.15, 0.3, -0.15])
+# sărbătoare: magazin aproape închis; ziua dinainte: vârf de cumpărături
+HOLIDAY_FACTOR = 0.4
+PRE_HOLIDAY_FACTOR = 1.6
+STOCKOUTS_PER_YEAR = 2.0
+STOCKOUT_DAYS = (2, 10)
+
+
+def synthetic_panel(n_series, days, seed=0, start="2022-01-01", intermittent_share=0.2,
+                    stockouts_per_year=STOCKOUTS_PER_YEAR):
+    """
+    DataFrame lung (stock_id, ds, y, stock_quantity, is_holiday, demand) pentru
+    `n_series` serii de câte `days` zile. `demand` e cererea reală, necenzurată:
+    în zilele fără stoc `y` și `stock_quantity` sunt 0. Aceeași combinație de
+    parametri și `seed` dă mereu aceleași date.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=days, freq="D")
+    t = np.arange(days)[:, None] / 365.25
+
+    intermittent = rng.random(n_series) < intermittent_share
+    level = np.where(intermittent, rng.lognormal(0.5, 0.4, n_series), rng.lognormal(2.5, 0.6, n_series))
+    trend = rng.normal(0.0, 0.25, n_series)  # variație relativă pe an
+    weekly_amp = rng.uniform(0.3, 1.0, n_series)
+    yearly_amp = rng.uniform(0.05, 0.35, n_series)
+    yearly_phase = rng.uniform(0, 2 * np.pi, n_series)
+
+    cal = calendar_features(dates)
+    holiday = cal["is_holiday"].to_numpy()[:, None]
+    pre_holiday = cal["pre_holiday"].to_numpy()[:, None]
+    weekly = 1 + weekly_amp * WEEKLY_PROFILE[dates.dayofweek.to_numpy()][:, None]
+    yearly = 1 + yearly_amp * np.sin(2 * np.pi * t + yearly_phase)
+    calendar = np.where(holiday > 0, HOLIDAY_FACTOR, 1.0) * np.where(pre_holiday > 0, PRE_HOLIDAY_FACTOR, 1.0)
+
+    mean = level * np.clip(1 + trend * t, 0.1, None) * weekly * yearly * calendar
+    # intermitent: vânzări în puține zile, dar în cantități mai mari
+    occurrence = np.where(intermittent, rng.uniform(0.05, 0.3, n_series), 1.0)
+    sells = rng.random((days, n_series)) < occurrence
+    demand = np.where(sells, rng.poisson(mean / occurrence), 0)
+
+    out_of_stock = _stockout_mask(rng, days, n_series, stockouts_per_year)
+    sales = np.where(out_of_stock, 0, demand)
+    cover = rng.uniform(3, 15, n_series)  # zile de acoperire ale stocului de pe raft
+    stock = np.where(out_of_stock, 0, np.ceil(mean * cover) + sales + 1).astype(np.int64)
+
+    return pd.DataFrame({
+        "stock_id": np.tile(np.arange(1, n_series + 1), days),
+        "ds": np.repeat(dates.to_numpy(), n_series),
+        "y": sales.ravel(),
+        "stock_quantity": stock.ravel(),
+        "is_holiday": np.repeat(holiday[:, 0], n_series),
+        "demand": demand.ravel(),
+    }).sort_values(["stock_id", "ds"], kind="stable").reset_index(drop=True)
+
+
+def _stockout_mask(rng, days, n_series, per_year):
+    counts = rng.poisson(per_year * days / 365.25, n_series)
+    series = np.repeat(np.arange(n_series), counts)
+    first = rng.integers(0, days, len(series))
+    last = np.minimum(first + rng.integers(STOCKOUT_DAYS[0], STOCKOUT_DAYS[1] + 1, len(series)), days)
+
+    # +1 la început, -1 după sfârșit; suma cumulată > 0 înseamnă zi fără stoc
+    edges = np.zeros((days + 1, n_series), dtype=np.int64)
+    np.add.at(edges, (first, series), 1)
+    np.add.at(edges, (last, series), -1)
+    return np.cumsum(edges[:-1], axis=0) > 0
+
+
+def synthetic_sales(days, seed=0, start="2022-01-01", intermittent=False):
+    """O singură serie în formatul primit de prep_data (ds, y, stock_quantity, is_holiday, demand)."""
+    df = synthetic_panel(1, days, seed=seed, start=start, intermittent_share=1.0 if intermittent else 0.0)
+    return df.drop(columns="stock_id")
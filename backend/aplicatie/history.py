@@ -0,0 +1,79 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from .models import SalesRollup
+
+# W: săptămâni luni-duminică, M: luni calendaristice (etichetate cu prima zi)
+RESAMPLE_PERIODS = (SalesRollup.WEEK, SalesRollup.MONTH)
+
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+NPZ_CONTENT_TYPE = 'application/x-npz'
+
+
+def history_columns(stock, start=None, end=None, freq=None):
+    """
+    Istoricul unui stoc ca array-uri paralele (date = datetime64[D]).
+    Cu `freq` ('W'/'M') citește din SalesRollup perioadele întregi care se
+    suprapun cu [start, end]: vânzări însumate, stocul de la finalul perioadei,
+    zilele cu stoc 0 și numărul de zile cu date din perioadă.
+    """
+    if freq is not None:
+        return _rollup_columns(stock, start, end, freq)
+
+    qs = stock.history.all()
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    rows = list(qs.order_by('date').values_list('date', 'daily_sales', 'stock_quantity', 'is_holiday'))
+
+    df = pd.DataFrame.from_records(rows, columns=['date', 'daily_sales', 'stock_quantity', 'is_holiday'])
+    return {
+        'date': pd.to_datetime(df['date']).to_numpy(dtype='datetime64[D]'),
+        'daily_sales': df['daily_sales'].to_numpy(dtype=np.int64),
+        'stock_quantity': df['stock_quantity'].to_numpy(dtype=np.int64),
+        'is_holiday': df['is_holiday'].to_numpy(dtype=bool),
+    }
+
+
+def _rollup_columns(stock, start, end, freq):
+    qs = stock.rollups.filter(period=freq)
+    if start:
+        qs = qs.filter(last_date__gte=start)
+    if end:
+        qs = qs.filter(first_date__lte=end)
+    rows = list(qs.order_by('period_start').values_list(
+        'period_start', 'total_sales', 'end_quantity', 'stockout_days', 'days'))
+
+    df = pd.DataFrame.from_records(rows, columns=['date', 'sales', 'stock_quantity', 'stockout_days', 'days'])
+    out = {'date': pd.to_datetime(df['date']).to_numpy(dtype='datetime64[D]')}
+    for name in ('sales', 'stock_quantity', 'stockout_days', 'days'):
+        out[name] = df[name].to_numpy(dtype=np.int64)
+    return out
+
+
+def columnar_json(columns):
+    out = {name: values.tolist() for name, values in columns.items() if name != 'date'}
+    out['date'] = np.datetime_as_string(columns['date'], unit='D').tolist()
+    return out
+
+
+def to_npz(columns):
+    buf = io.BytesIO()
+    np.savez(buf, **columns)
+    return buf.getvalue()
+
+
+def to_arrow(columns):
+    """Arrow IPC stream; None dacă pyarrow nu e instalat."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
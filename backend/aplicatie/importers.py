@@ -0,0 +1,270 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+
+from .models import Stock, SalesRecord
+from .caching import invalidate_stock
+from .rollups import schedule_refresh
+from .metrics import observe_import
+
+REQUIRED_COLUMNS = {'ds', 'daily_sales', 'current_stock_quantity', 'min_stock_level'}
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def _xlsx_chunks(f, chunk_size):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(f, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(h).strip() if h is not None else '' for h in header]
+        buf = []
+        for row in rows:
+            if not any(v is not None for v in row):
+                continue
+            buf.append(row[:len(header)])
+            if len(buf) >= chunk_size:
+                yield pd.DataFrame(buf, columns=header)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=header)
+    finally:
+        wb.close()
+
+
+def _csv_chunks(f, chunk_size):
+    for chunk in pd.read_csv(f, chunksize=chunk_size, skip_blank_lines=True):
+        chunk.columns = [str(c).strip() for c in chunk.columns]
+        yield chunk
+
+
+def _parquet_chunks(f, chunk_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportFormatError('Importul Parquet necesită pachetul pyarrow.')
+    for batch in pq.ParquetFile(f).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+READERS = {
+    '.xlsx': _xlsx_chunks,
+    '.xlsm': _xlsx_chunks,
+    '.csv': _csv_chunks,
+    '.txt': _csv_chunks,
+    '.parquet': _parquet_chunks,
+}
+
+
+def iter_chunks(f, filename, chunk_size=5000):
+    """DataFrame-uri de cel mult `chunk_size` rânduri, citite incremental din fișier."""
+    ext = os.path.splitext(filename or '')[1].lower()
+    reader = READERS.get(ext)
+    if reader is None:
+        raise ImportFormatError(f'Format nesuportat: {ext or "?"}. Acceptat: xlsx, csv, parquet.')
+    return reader(f, chunk_size)
+
+
+def parse_chunk(chunk, first_row):
+    """
+    Validează vectorizat un chunk. Întoarce (DataFrame curat cu date/daily_sales/
+    stock_quantity[/is_holiday], min_stock_level maxim, nr. rânduri respinse, erori).
+    `first_row` e numărul rândului din fișier pentru primul rând din chunk.
+    """
+    rows = np.arange(first_row, first_row + len(chunk))
+    dates = pd.to_datetime(chunk['ds'], errors='coerce')
+    sales = pd.to_numeric(chunk['daily_sales'], errors='coerce')
+    qty = pd.to_numeric(chunk['current_stock_quantity'], errors='coerce')
+    min_level = pd.to_numeric(chunk['min_stock_level'], errors='coerce')
+
+    checks = [
+        ('ds', dates.isna().to_numpy(), 'dată invalidă'),
+        ('daily_sales', (sales.isna() | (sales < 0)).to_numpy(), 'număr invalid sau negativ'),
+        ('current_stock_quantity', (qty.isna() | (qty < 0)).to_numpy(), 'număr invalid sau negativ'),
+    ]
+    bad = np.zeros(len(chunk), dtype=bool)
+    errors = []
+    for column, mask, message in checks:
+        bad |= mask
+        for i in np.flatnonzero(mask)[:MAX_REPORTED_ERRORS]:
+            errors.append({'row': int(rows[i]), 'column': column,
+                           'value': str(chunk[column].iloc[i]), 'error': message})
+
+    errors.sort(key=lambda e: e['row'])
+    ok = ~bad
+    clean = pd.DataFrame({
+        'date': dates[ok].dt.date,
+        'daily_sales': sales[ok].astype(np.int64),
+        'stock_quantity': qty[ok].astype(np.int64),
+    })
+    if 'is_holiday' in chunk.columns:
+        flags = chunk['is_holiday'][ok]
+        if flags.dtype == object:
+            flags = flags.astype(str).str.strip().str.lower().isin(['1', 'true', 'da', 'yes', 'x'])
+        clean['is_holiday'] = flags.fillna(0).astype(bool)
+    # aceeași zi de mai multe ori în fișier: ultima valoare câștigă
+    clean = clean.drop_duplicates('date', keep='last')
+    return clean, min_level.max(), int(bad.sum()), errors
+
+
+def upsert_sales_records(records, update_fields=('daily_sales', 'stock_quantity'), batch_size=1000):
+    """bulk_create cu upsert pe (stock, date)."""
+    kwargs = {'update_conflicts': True, 'update_fields': list(update_fields)}
+    if connection.features.supports_update_conflicts_with_target:
+        # MySQL nu acceptă unique_fields; folosește direct cheia unică (stock, date)
+        kwargs['unique_fields'] = ['stock', 'date']
+    SalesRecord.objects.bulk_create(records, batch_size=batch_size, **kwargs)
+    return len(records)
+
+
+SALES_ROW_COLUMNS = ('stock', 'date', 'daily_sales', 'stock_quantity', 'is_holiday')
+
+
+def upsert_sales_rows(rows, update_fields=('daily_sales', 'stock_quantity'), batch_size=1000):
+    """
+    Ca upsert_sales_records, pentru tupluri (stock_id, date, daily_sales, stock_quantity, is_holiday)
+    deja validate: fără instanțe de model, un INSERT multi-rând per lot cu sufixul de upsert
+    al backend-ului (ON CONFLICT / ON DUPLICATE KEY). Folosit de ingest-ul în flux.
+    """
+    if not rows:
+        return 0
+    opts = SalesRecord._meta
+    fields = [opts.get_field(name) for name in SALES_ROW_COLUMNS]
+    ops = connection.ops
+    suffix = ops.on_conflict_suffix_sql(
+        fields, OnConflict.UPDATE,
+        [opts.get_field(name).column for name in update_fields],
+        [opts.get_field(name).column for name in ('stock', 'date')],
+    )
+    columns = ', '.join(ops.quote_name(f.column) for f in fields)
+    placeholder = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    size = max(1, min(batch_size, ops.bulk_batch_size(fields, rows)))
+
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), size):
+            chunk = rows[i:i + size]
+            params = []
+            for stock_id, day, sales, quantity, holiday in chunk:
+                params += (stock_id, ops.adapt_datefield_value(day), sales, quantity, holiday)
+            cursor.execute(
+                f'INSERT INTO {ops.quote_name(opts.db_table)} ({columns}) '
+                f'VALUES {", ".join([placeholder] * len(chunk))} {suffix}',
+                params,
+            )
+    return len(rows)
+
+
+# replace: istoricul devine exact `rows` (zilele lipsă sunt șterse)
+# patch: upsert pe datele primite; append: doar zile după ultima existentă
+HISTORY_MODES = ('replace', 'patch', 'append')
+
+
+def sync_history(stock, rows, mode='replace', batch_size=1000):
+    """
+    Aplică `rows` (date, daily_sales, stock_quantity) peste istoricul stocului
+    scriind doar diferențele. Întoarce câte rânduri au fost inserate/modificate/șterse.
+    """
+    incoming = {r['date']: (r['daily_sales'], r['stock_quantity']) for r in rows}
+    existing = stock.history.all()
+    if mode != 'replace':
+        if not incoming:
+            existing = existing.none()
+        else:
+            existing = existing.filter(date__gte=min(incoming), date__lte=max(incoming))
+    current = {d: (s, q) for d, s, q in existing.values_list('date', 'daily_sales', 'stock_quantity')}
+
+    changed = [d for d, values in incoming.items() if current.get(d) != values]
+    inserted = sum(1 for d in changed if d not in current)
+    deleted = sorted(set(current) - set(incoming)) if mode == 'replace' else []
+
+    with transaction.atomic():
+        upsert_sales_records([
+            SalesRecord(stock=stock, date=d, daily_sales=incoming[d][0], stock_quantity=incoming[d][1])
+            for d in changed
+        ], batch_size=batch_size)
+        for i in range(0, len(deleted), batch_size):
+            stock.history.filter(date__in=deleted[i:i + batch_size]).delete()
+
+    if changed:
+        # upsert-ul nu emite post_save (ștergerile sunt tratate de SalesRecordQuerySet.delete);
+        # rollup-urile doar pentru perioadele atinse
+        invalidate_stock(stock.pk)
+        schedule_refresh(stock.pk, changed)
+    return {
+        'mode': mode,
+        'inserted': inserted,
+        'updated': len(changed) - inserted,
+        'deleted': len(deleted),
+        'unchanged': len(incoming) - len(changed),
+    }
+
+
+def import_sales_file(f, filename, user, stock_name=None, stock=None, chunk_size=5000, batch_size=1000):
+    """
+    Importă istoricul dintr-un fișier xlsx/csv/parquet, pe chunk-uri, într-un stoc
+    existent (`stock`, cu upsert pe date) sau într-unul nou (`stock_name`).
+    Întoarce raportul de import; ridică ImportFormatError pentru fișiere invalide.
+    """
+    started = time.perf_counter()
+    report = {'rows_read': 0, 'rows_imported': 0, 'rows_rejected': 0, 'errors': []}
+    min_level = None
+    created = False
+
+    for chunk in iter_chunks(f, filename, chunk_size):
+        if report['rows_read'] == 0:
+            missing = REQUIRED_COLUMNS - set(chunk.columns)
+            if missing:
+                raise ImportFormatError(f'Coloane lipsă. Trebuie: {REQUIRED_COLUMNS}')
+
+        first_row = report['rows_read'] + 2  # rândul 1 e header-ul
+        report['rows_read'] += len(chunk)
+        clean, chunk_min, rejected, errors = parse_chunk(chunk, first_row)
+        report['rows_rejected'] += rejected
+        room = MAX_REPORTED_ERRORS - len(report['errors'])
+        report['errors'].extend(errors[:max(room, 0)])
+        if pd.notna(chunk_min):
+            min_level = chunk_min if min_level is None else max(min_level, chunk_min)
+        if clean.empty:
+            continue
+
+        with transaction.atomic():
+            if stock is None:
+                stock = Stock.objects.create(user=user, stock_name=stock_name,
+                                             min_stock_level=int(min_level or 0))
+                created = True
+            fields = [c for c in ('daily_sales', 'stock_quantity', 'is_holiday') if c in clean.columns]
+            records = [
+                SalesRecord(stock=stock, **row)
+                for row in clean.to_dict('records')
+            ]
+            report['rows_imported'] += upsert_sales_records(records, update_fields=fields, batch_size=batch_size)
+            # rollup-urile perioadelor atinse de chunk, la commit
+            schedule_refresh(stock.pk, clean['date'])
+
+    if report['rows_read'] == 0:
+        raise ImportFormatError('Fișierul nu conține rânduri.')
+
+    if stock is not None:
+        if min_level is not None and (created or int(min_level) != stock.min_stock_level):
+            stock.min_stock_level = int(min_level)
+            stock.save(update_fields=['min_stock_level', 'updated_at'])
+        invalidate_stock(stock.pk)
+
+    seconds = time.perf_counter() - started
+    report['errors_truncated'] = report['rows_rejected'] > len(report['errors'])
+    report['stock_id'] = stock.pk if stock is not None else None
+    report['seconds'] = round(seconds, 3)
+    observe_import('file', report['rows_imported'], report['rows_rejected'], seconds)
+    report['rows_per_second'] = round(report['rows_read'] / seconds, 1) if seconds > 0 else None
+    return report
@@ -0,0 +1,205 @@
+"""
+Ingest în flux pentru feed-urile zilnice (POS): NDJSON sau CSV cu rânduri
+(stock_id sau stock, date, daily_sales, stock_quantity[, is_holiday]) pentru
+oricâte stocuri. Corpul e citit linie cu linie și scris în loturi cu upsert.
+"""
+import csv
+import json
+import time
+from datetime import date
+
+from django.db import transaction
+
+from .models import Stock
+from .caching import invalidate_stock
+from .rollups import refresh_rollups_many
+from .importers import upsert_sales_rows, MAX_REPORTED_ERRORS
+from .metrics import observe_import
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+CSV_TYPES = ('text/csv', 'application/csv')
+
+_TRUE = {True, 1, '1', 'true', 'True', 'da'}
+_FALSE = {False, 0, '0', 'false', 'False', 'nu'}
+
+
+class IngestFormatError(Exception):
+    pass
+
+
+def _ndjson_rows(lines):
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = _loads(line)
+        except ValueError:
+            yield lineno, None, 'JSON invalid'
+            continue
+        if not isinstance(obj, dict):
+            yield lineno, None, 'rândul trebuie să fie un obiect JSON'
+            continue
+        yield lineno, obj, None
+
+
+def _csv_rows(lines):
+    text = (line.decode('utf-8', errors='replace') for line in lines)
+    reader = csv.DictReader(text)
+    if reader.fieldnames is None:
+        return
+    reader.fieldnames = [name.strip().lstrip('\ufeff') for name in reader.fieldnames]
+    for row in reader:
+        yield reader.line_num, row, None
+
+
+def _count(value, column):
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f'{column}: număr invalid')
+    try:
+        n = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{column}: număr invalid')
+    if n < 0:
+        raise ValueError(f'{column}: număr negativ')
+    return n
+
+
+class _Stocks:
+    """Stocurile utilizatorului după id și după nume, încărcate o singură dată."""
+
+    def __init__(self, user, create_missing):
+        self.user = user
+        self.create_missing = create_missing
+        self.names = {}
+        self.by_name = {}
+        self.created = []
+        for pk, name in Stock.objects.filter(user=user).order_by('id').values_list('id', 'stock_name'):
+            self.names[pk] = name
+            self.by_name.setdefault(name, pk)
+
+    def resolve(self, obj):
+        raw_id = obj.get('stock_id')
+        if raw_id not in (None, ''):
+            try:
+                pk = int(raw_id)
+            except (TypeError, ValueError):
+                raise ValueError('stock_id invalid')
+            if pk not in self.names:
+                raise ValueError(f'stocul {pk} nu există')
+            return pk
+
+        name = str(obj.get('stock') or '').strip()
+        if not name:
+            raise ValueError('lipsește stock_id sau stock')
+        pk = self.by_name.get(name)
+        if pk is None:
+            if not self.create_missing:
+                raise ValueError(f'stocul "{name}" nu există')
+            pk = Stock.objects.create(user=self.user, stock_name=name, min_stock_level=0).pk
+            self.names[pk] = name
+            self.by_name[name] = pk
+            self.created.append(pk)
+        return pk
+
+
+def _parse_row(obj, stocks):
+    stock_id = stocks.resolve(obj)
+    try:
+        day = date.fromisoformat(str(obj.get('date', '')).strip())
+    except ValueError:
+        raise ValueError('date: dată invalidă (YYYY-MM-DD)')
+    sales = _count(obj.get('daily_sales'), 'daily_sales')
+    quantity = _count(obj.get('stock_quantity'), 'stock_quantity')
+
+    holiday = obj.get('is_holiday')
+    if not isinstance(holiday, (str, int, type(None))):
+        raise ValueError('is_holiday: valoare invalidă')
+    if holiday in (None, ''):
+        holiday = None  # lipsă: valoarea existentă rămâne neschimbată
+    elif holiday in _TRUE:
+        holiday = True
+    elif holiday in _FALSE:
+        holiday = False
+    else:
+        raise ValueError('is_holiday: valoare invalidă')
+    return (stock_id, day), (sales, quantity, holiday)
+
+
+def _write(batch, batch_size, touched):
+    with_flag, without_flag = [], []
+    for (stock_id, day), (sales, quantity, holiday) in batch.items():
+        row = (stock_id, day, sales, quantity, bool(holiday))
+        (without_flag if holiday is None else with_flag).append(row)
+        touched.setdefault(stock_id, set()).add(day)
+
+    # fără instanțe de model: overhead-ul ORM-ului ar domina timpul de scriere
+    with transaction.atomic():
+        upsert_sales_rows(with_flag, update_fields=('daily_sales', 'stock_quantity', 'is_holiday'),
+                          batch_size=batch_size)
+        upsert_sales_rows(without_flag, batch_size=batch_size)
+    return len(batch)
+
+
+def ingest_sales_stream(lines, content_type, user, create_missing=False, batch_size=1000):
+    """
+    Scrie rândurile din `lines` (iterabil de linii bytes) în loturi de `batch_size`,
+    fiecare lot într-o tranzacție. Rândurile invalide sunt sărite și raportate.
+    Rollup-urile și cache-ul de prognoze sunt actualizate o singură dată per stoc, la final.
+    """
+    if content_type in NDJSON_TYPES:
+        rows = _ndjson_rows(lines)
+    elif content_type in CSV_TYPES:
+        rows = _csv_rows(lines)
+    else:
+        raise IngestFormatError('Content-Type trebuie să fie application/x-ndjson sau text/csv')
+
+    started = time.perf_counter()
+    stocks = _Stocks(user, create_missing)
+    report = {'rows_read': 0, 'rows_written': 0, 'rows_rejected': 0, 'errors': []}
+    touched = {}  # stock_id -> zilele scrise
+    batch = {}  # (stock_id, date) -> valori; ultima apariție câștigă
+
+    try:
+        for lineno, obj, error in rows:
+            report['rows_read'] += 1
+            if error is None:
+                try:
+                    key, values = _parse_row(obj, stocks)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                report['rows_rejected'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    report['errors'].append({'row': lineno, 'error': error})
+                continue
+
+            batch[key] = values
+            if len(batch) >= batch_size:
+                report['rows_written'] += _write(batch, batch_size, touched)
+                batch = {}
+        if batch:
+            report['rows_written'] += _write(batch, batch_size, touched)
+    finally:
+        # și loturile deja scrise înaintea unei erori trebuie să ajungă în rollup-uri
+        for stock_id in touched:
+            invalidate_stock(stock_id)
+        if touched:
+            refresh_rollups_many(touched)
+
+    seconds = time.perf_counter() - started
+    report['errors_truncated'] = report['rows_rejected'] > len(report['errors'])
+    # o zi trimisă de mai multe ori (în loturi diferite) e numărată o singură dată
+    report['stocks'] = [
+        {'stock_id': pk, 'stock_name': stocks.names[pk], 'rows': len(days), 'created': pk in stocks.created}
+        for pk, days in sorted(touched.items())
+    ]
+    report['seconds'] = round(seconds, 3)
+    report['rows_per_second'] = round(report['rows_read'] / seconds, 1) if seconds > 0 else None
+    observe_import('ingest', report['rows_written'], report['rows_rejected'], seconds)
+    return report
@@ -0,0 +1,122 @@
+import logging
+import time
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import ForecastJob
+from .metrics import JOBS
+from .planning import build_and_save_plan, PlanError
+
+logger = logging.getLogger(__name__)
+
+
+def claim_next_job(worker=''):
+    """Marchează cel mai vechi job `queued` drept `running`; sigur cu mai mulți workeri."""
+    while True:
+        job_id = (ForecastJob.objects
+                  .filter(status=ForecastJob.QUEUED)
+                  .order_by('created_at', 'id')
+                  .values_list('id', flat=True)
+                  .first())
+        if job_id is None:
+            return None
+        claimed = (ForecastJob.objects
+                   .filter(pk=job_id, status=ForecastJob.QUEUED)
+                   .update(status=ForecastJob.RUNNING, started_at=timezone.now(),
+                           stage='starting', worker=worker))
+        if claimed:
+            return ForecastJob.objects.get(pk=job_id)
+        # alt worker a luat job-ul între timp
+
+
+def requeue_stale_jobs(older_than):
+    """Job-urile `running` abandonate (worker oprit) mai vechi de `older_than` revin în coadă."""
+    cutoff = timezone.now() - older_than
+    return (ForecastJob.objects
+            .filter(status=ForecastJob.RUNNING, started_at__lt=cutoff)
+            .update(status=ForecastJob.QUEUED, started_at=None, progress=0, stage='', worker=''))
+
+
+def run_forecast_job(job):
+    if job.status == ForecastJob.QUEUED:
+        job.status = ForecastJob.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+    def progress(pct, stage):
+        job.progress = pct
+        job.stage = stage
+        job.save(update_fields=['progress', 'stage'])
+
+    try:
+        run, payload = build_and_save_plan(job.stock, job.months, job.review_days, progress=progress)
+    except PlanError as e:
+        job.status, job.error = ForecastJob.FAILED, str(e)
+    except Exception as e:
+        logger.exception("Forecast job %s failed", job.pk)
+        job.status, job.error = ForecastJob.FAILED, f"{type(e).__name__}: {e}"
+    else:
+        job.status, job.run, job.result = ForecastJob.DONE, run, payload
+        job.progress = 100
+
+    job.stage = ''
+    job.finished_at = timezone.now()
+    job.save()
+    JOBS.inc(status=job.status)
+    return job
+
+
+def job_status(job):
+    data = {
+        "job_id": job.pk,
+        "stock_id": job.stock_id,
+        "status": job.status,
+        "progress": job.progress,
+        "stage": job.stage,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "queued_seconds": None,
+        "run_seconds": None,
+    }
+    end = job.finished_at or timezone.now()
+    if job.started_at:
+        data["queued_seconds"] = round((job.started_at - job.created_at).total_seconds(), 3)
+        data["run_seconds"] = round((end - job.started_at).total_seconds(), 3)
+    elif job.status == ForecastJob.QUEUED:
+        data["queued_seconds"] = round((end - job.created_at).total_seconds(), 3)
+
+    if job.status == ForecastJob.DONE:
+        data["run_id"] = job.run_id
+        data.update(job.result or {})
+    elif job.status == ForecastJob.FAILED:
+        data["error"] = job.error
+    return data
+
+
+def work(worker='', poll_interval=1.0, once=False, max_jobs=None, stale_after=None, requeue_every=60.0):
+    """
+    Bucla workerului: procesează job-uri până la oprire (sau coadă goală cu `once`).
+    Cu `stale_after` (timedelta), job-urile abandonate de alți workeri sunt repuse în coadă
+    la fiecare `requeue_every` secunde, nu doar la pornire.
+    """
+    done = 0
+    last_requeue = time.monotonic()
+    while max_jobs is None or done < max_jobs:
+        close_old_connections()
+        if stale_after is not None and time.monotonic() - last_requeue >= requeue_every:
+            requeued = requeue_stale_jobs(stale_after)
+            if requeued:
+                logger.warning("%s forecast jobs abandoned for over %s requeued", requeued, stale_after)
+            last_requeue = time.monotonic()
+        job = claim_next_job(worker)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        job = run_forecast_job(job)
+        logger.info("Forecast job %s (stock %s) -> %s", job.pk, job.stock_id, job.status)
+        done += 1
+    return done
@@ -0,0 +1,248 @@
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from aplicatie.forecasting.inventory import generate_order_plan, generate_order_plans
+from aplicatie.forecasting.models import run_prophet, run_sarima
+from aplicatie.forecasting.pipeline import auto_forecast_pipeline
+from aplicatie.forecasting.preprocessing import prep_data, prep_data_many
+from aplicatie.forecasting.synthetic import synthetic_panel
+
+# etapele ieftine rulează pe toate SKU-urile; cele cu antrenare de modele doar pe --fit-skus
+DATA_STAGES = ('prep_data', 'prep_data_many', 'generate_order_plan', 'generate_order_plans')
+FIT_STAGES = ('run_prophet', 'run_sarima', 'auto_forecast_pipeline')
+STAGES = DATA_STAGES + FIT_STAGES
+HISTORY_COLUMNS = ['ds', 'y', 'stock_quantity', 'is_holiday']
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _versions():
+    versions = {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__}
+    for name in ('prophet', 'statsmodels'):
+        try:
+            versions[name] = __import__(name).__version__
+        except Exception:
+            versions[name] = None
+    return versions
+
+
+def _seasonal_naive(history, horizon):
+    # prognoza pentru etapele de plan: ultima săptămână repetată, fără antrenare
+    last = history['y'].to_numpy(dtype=float)[-7:]
+    ds = pd.date_range(history['ds'].iloc[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    return pd.DataFrame({'ds': ds, 'yhat': np.resize(last, horizon)})
+
+
+class _Scenario:
+    """Istoricele unei combinații (ani, SKU-uri), împărțite în antrenare și ultimele `horizon` zile."""
+
+    def __init__(self, years, skus, horizon, seed):
+        days = int(round(years * 365))
+        panel = synthetic_panel(skus, days + horizon, seed=seed)
+        cutoff = panel['ds'].min() + pd.Timedelta(days=days)
+        self.panel = panel[panel['ds'] < cutoff].drop(columns='demand')
+        holdout = panel[panel['ds'] >= cutoff]
+        self.actual = {sid: g['demand'].to_numpy(dtype=float) for sid, g in holdout.groupby('stock_id')}
+        self.histories = {sid: g[HISTORY_COLUMNS].reset_index(drop=True)
+                          for sid, g in self.panel.groupby('stock_id')}
+        self.prepared = {sid: prep_data(h) for sid, h in self.histories.items()}
+        last = self.panel.groupby('stock_id').tail(1).set_index('stock_id')
+        self.current_stock = last['stock_quantity'].astype(float)
+        self.min_stock = (self.panel.groupby('stock_id')['y'].mean() * 7).round()
+        self.naive = {sid: _seasonal_naive(h, horizon) for sid, h in self.prepared.items()}
+        self.naive_long = pd.concat([f.assign(stock_id=sid) for sid, f in self.naive.items()], ignore_index=True)
+
+
+class Command(BaseCommand):
+    help = ("Benchmark pentru pachetul de prognoză pe istorice sintetice: timp, memorie maximă (tracemalloc) "
+            "și WAPE pe ultimele --horizon zile, per etapă, pentru fiecare combinație ani x SKU-uri. "
+            "Memoria procesului CmdStan al Prophet și a proceselor --parallel nu e inclusă.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=float, nargs='+', default=[1, 2, 4])
+        parser.add_argument('--skus', type=int, nargs='+', default=[1, 10, 100, 1000])
+        parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+        parser.add_argument('--fit-skus', type=int, default=3,
+                            help="Câte SKU-uri se antrenează la etapele cu modele (per număr de ani).")
+        parser.add_argument('--horizon', type=int, default=28)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Rulări cronometrate pentru etapele fără antrenare (se raportează mediana).")
+        parser.add_argument('--parallel', action='store_true',
+                            help="auto_forecast_pipeline cu câte un proces per model, ca în API.")
+        parser.add_argument('--no-memory', action='store_true', help="Fără rularea suplimentară cu tracemalloc.")
+        parser.add_argument('--output', help="Fișierul JSON cu rezultatele (implicit bench_forecasting_<commit>.json).")
+        parser.add_argument('--compare', help="Rezultatele unei rulări anterioare, pentru comparație.")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Creșterea relativă de timp/memorie considerată regresie.")
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **opts):
+        for name in ('cmdstanpy', 'prophet'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+        baseline = None
+        if opts['compare']:
+            try:
+                with open(opts['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Nu pot citi {opts['compare']}: {e}")
+
+        commit = _git_commit()
+        stages = [s for s in STAGES if s in opts['stages']]
+        results = []
+        for years in opts['years']:
+            if any(s in FIT_STAGES for s in stages):
+                scenario = _Scenario(years, opts['fit_skus'], opts['horizon'], opts['seed'])
+                for stage in (s for s in stages if s in FIT_STAGES):
+                    results.append(self._run(stage, years, scenario, opts, repeat=1))
+            for skus in opts['skus']:
+                if not any(s in DATA_STAGES for s in stages):
+                    break
+                scenario = _Scenario(years, skus, opts['horizon'], opts['seed'])
+                for stage in (s for s in stages if s in DATA_STAGES):
+                    results.append(self._run(stage, years, scenario, opts, repeat=opts['repeat']))
+
+        report = {
+            'meta': {
+                'commit': commit,
+                'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'machine': platform.machine(),
+                'cpus': os.cpu_count(),
+                'versions': _versions(),
+                'seed': opts['seed'],
+                'horizon': opts['horizon'],
+                'parallel': opts['parallel'],
+            },
+            'results': results,
+        }
+        output = opts['output'] or f"bench_forecasting_{commit or 'local'}.json"
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        regressions = self._print(results, baseline, opts['threshold'])
+        self.stdout.write(f"Rezultate salvate în {output}.")
+        if regressions and opts['fail_on_regression']:
+            raise CommandError(f"{regressions} regresii față de {opts['compare']}.")
+
+    def _stage(self, stage, scenario, opts):
+        """Funcția cronometrată; la etapele cu modele întoarce prognozele per SKU."""
+        horizon = opts['horizon']
+        if stage == 'prep_data':
+            def run():
+                for history in scenario.histories.values():
+                    prep_data(history)
+            return run
+        if stage == 'prep_data_many':
+            return lambda: prep_data_many(scenario.panel)
+        if stage == 'generate_order_plan':
+            def run():
+                for sid, fc in scenario.naive.items():
+                    generate_order_plan(fc, scenario.current_stock[sid], scenario.min_stock[sid])
+            return run
+        if stage == 'generate_order_plans':
+            return lambda: generate_order_plans(scenario.naive_long, scenario.current_stock, scenario.min_stock)
+
+        fit = {
+            'run_prophet': run_prophet,
+            'run_sarima': run_sarima,
+            'auto_forecast_pipeline': lambda df, h: auto_forecast_pipeline(
+                df, h, prepared=True, parallel=opts['parallel'])[0],
+        }[stage]
+
+        def run():
+            forecasts = {}
+            for sid, df in scenario.prepared.items():
+                try:
+                    forecasts[sid] = fit(df, horizon)
+                except Exception:
+                    forecasts[sid] = None
+            return forecasts
+        return run
+
+    def _run(self, stage, years, scenario, opts, repeat):
+        run = self._stage(stage, scenario, opts)
+        timings = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            out = run()
+            timings.append(time.perf_counter() - started)
+
+        peak = None
+        if not opts['no_memory']:
+            tracemalloc.start()
+            try:
+                run()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        skus = len(scenario.histories)
+        seconds = statistics.median(timings)
+        row = {
+            'stage': stage,
+            'years': years,
+            'skus': skus,
+            'runs': len(timings),
+            'seconds': round(seconds, 4),
+            'ms_per_sku': round(seconds * 1000 / skus, 3),
+            'peak_mb': round(peak / 2 ** 20, 2) if peak is not None else None,
+            'wape': None,
+            'failed': 0,
+        }
+        if isinstance(out, dict):
+            # WAPE comun pe toate SKU-urile, față de cererea reală (necenzurată) din ultimele zile
+            err = total = 0.0
+            for sid, fc in out.items():
+                if fc is None:
+                    row['failed'] += 1
+                    continue
+                actual = scenario.actual[sid]
+                err += np.abs(actual - fc['yhat'].to_numpy(dtype=float)[:len(actual)]).sum()
+                total += actual.sum()
+            row['wape'] = round(err / total, 4) if total > 0 else None
+        return row
+
+    def _print(self, results, baseline, threshold):
+        previous = {}
+        if baseline:
+            previous = {(r['stage'], r['years'], r['skus']): r for r in baseline.get('results', [])}
+
+        regressions = 0
+        self.stdout.write(f"{'etapă':24} {'ani':>4} {'sku':>5} {'s':>9} {'ms/sku':>9} {'MB':>8} {'wape':>7}  comparație")
+        for r in results:
+            note = ''
+            old = previous.get((r['stage'], r['years'], r['skus']))
+            if old:
+                parts = []
+                for key, label in (('seconds', 'timp'), ('peak_mb', 'mem')):
+                    if old.get(key) and r[key] is not None:
+                        ratio = r[key] / old[key]
+                        flag = ' REGRESIE' if ratio > 1 + threshold else ''
+                        regressions += bool(flag)
+                        parts.append(f"{label} x{ratio:.2f}{flag}")
+                if old.get('wape') is not None and r['wape'] is not None:
+                    parts.append(f"wape {r['wape'] - old['wape']:+.4f}")
+                note = ', '.join(parts)
+            peak = r['peak_mb'] if r['peak_mb'] is not None else '-'
+            wape = r['wape'] if r['wape'] is not None else '-'
+            self.stdout.write(f"{r['stage']:24} {r['years']:>4g} {r['skus']:>5} {r['seconds']:>9} "
+                              f"{r['ms_per_sku']:>9} {peak:>8} {wape:>7}  {note}")
+        return regressions
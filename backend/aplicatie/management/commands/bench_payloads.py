@@ -0,0 +1,78 @@
+import json
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.utils.text import compress_string
+from rest_framework.utils.encoders import JSONEncoder
+
+from aplicatie.compact import compact_frame
+from aplicatie.forecasting.inventory import generate_order_plan
+from aplicatie.middleware import brotli, BROTLI_QUALITY
+from aplicatie.renderers import FastJSONRenderer
+
+
+def synthetic_forecast(days, seed=0):
+    """O prognoză cu forma celei din pipeline (ds, yhat, yhat_low, yhat_high)."""
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range('2025-01-01', periods=days, freq='D')
+    yhat = 10 + 3 * np.sin(np.arange(days) * 2 * np.pi / 7) + rng.normal(0, 1, days)
+    return pd.DataFrame({'ds': ds, 'yhat': yhat, 'yhat_low': yhat - 4, 'yhat_high': yhat + 4})
+
+
+def _drf_json(data):
+    # ce făcea JSONRenderer-ul implicit DRF (COMPACT_JSON, ensure_ascii=False)
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class Command(BaseCommand):
+    help = "Compară timpul de serializare și dimensiunea răspunsului /api/forecast/ în formatele disponibile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=12)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--json', action='store_true', help="Rezultatele ca JSON.")
+
+    def handle(self, *args, **opts):
+        fc_df = synthetic_forecast(int(opts['months'] * 30.5))
+        plan_df = generate_order_plan(fc_df, current_stock=100, min_stock_level=10, review_period_days=14)
+        renderer = FastJSONRenderer()
+
+        def records():
+            return {'forecast': fc_df.to_dict(orient='records'), 'plan': plan_df.to_dict(orient='records')}
+
+        def compact(dates):
+            return lambda: {'forecast': compact_frame(fc_df, dates=dates), 'plan': compact_frame(plan_df, dates=dates)}
+
+        variants = [
+            ('records + DRF json', records, _drf_json),
+            ('records + FastJSONRenderer', records, renderer.render),
+            ('compact iso + FastJSONRenderer', compact('iso'), renderer.render),
+            ('compact epoch + FastJSONRenderer', compact('epoch'), renderer.render),
+        ]
+
+        results = []
+        for name, build, render in variants:
+            timings = []
+            for _ in range(opts['repeat']):
+                started = time.perf_counter()
+                body = render(build())
+                timings.append(time.perf_counter() - started)
+            results.append({
+                'variant': name,
+                'rows': len(fc_df),
+                'median_ms': round(statistics.median(timings) * 1000, 3),
+                'bytes': len(body),
+                'gzip_bytes': len(compress_string(body)),
+                'br_bytes': len(brotli.compress(body, quality=BROTLI_QUALITY)) if brotli else None,
+            })
+
+        if opts['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'format':36} {'ms':>9} {'bytes':>9} {'gzip':>9} {'br':>9}")
+        for r in results:
+            br = r['br_bytes'] if r['br_bytes'] is not None else '-'
+            self.stdout.write(f"{r['variant']:36} {r['median_ms']:>9} {r['bytes']:>9} {r['gzip_bytes']:>9} {br:>9}")
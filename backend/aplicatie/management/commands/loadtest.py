@@ -0,0 +1,349 @@
+import importlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, transaction
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from aplicatie.forecasting.inventory import generate_order_plans
+from aplicatie.forecasting.synthetic import synthetic_panel
+from aplicatie.importers import upsert_sales_rows
+from aplicatie.models import Stock, ForecastRun, ReorderPlan
+from aplicatie.rollups import rebuild_rollups
+
+USER_PREFIX = 'loadtest_'
+IMPORT_DAYS = 90
+
+# nume -> (metodă, cale); {stock} e un stoc aleator al utilizatorului.
+# Proxy-ul Flask nu are GET /api/forecast/, deci forecast rulează doar direct pe Django.
+ENDPOINTS = {
+    'stocks': ('GET', '/api/stocks/'),
+    'summary': ('GET', '/api/stocks/summary/'),
+    'history': ('GET', '/api/stocks/{stock}/history/?resample=W'),
+    'alerts': ('GET', '/api/alerts/?upcoming=1'),
+    'forecast': ('GET', '/api/forecast/?product_id={stock}&months=1'),
+    'import': ('POST', '/api/import-stocks/'),
+}
+FLASK_ENDPOINTS = ('stocks', 'summary', 'history', 'alerts', 'import')
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class _CountingApp:
+    """Aplicația WSGI Django care numără cererile și query-urile SQL per rută."""
+
+    def __init__(self, app):
+        self.app = app
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+
+    def __call__(self, environ, start_response):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        # corpul e consumat aici ca să prindă și query-urile din răspunsurile streaming
+        with connection.execute_wrapper(count):
+            response = self.app(environ, start_response)
+            try:
+                body = list(response)
+            finally:
+                response.close()
+
+        try:
+            route = resolve(environ.get('PATH_INFO', '/')).route
+        except Resolver404:
+            route = None
+        with self.lock:
+            entry = self.stats.setdefault(route, [0, 0])
+            entry[0] += 1
+            entry[1] += queries
+        return body
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def _start_django(app):
+    server = ThreadedWSGIServer(('127.0.0.1', 0), _QuietHandler)
+    server.set_app(app)
+    return server, _serve(server)
+
+
+def _start_flask(django_url):
+    from werkzeug.serving import make_server
+
+    # upstream.py citește DJANGO_API_URL la import
+    os.environ['DJANGO_API_URL'] = django_url
+    sys.path.insert(0, str(settings.BASE_DIR.parent / 'flask'))
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    flask_app = importlib.import_module('app').app
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+    return server, _serve(server)
+
+
+def _seed(users, stocks, years, seed):
+    User.objects.filter(username__startswith=USER_PREFIX).delete()
+    User.objects.bulk_create([User(username=f'{USER_PREFIX}{i}', password='!') for i in range(users)])
+    accounts = list(User.objects.filter(username__startswith=USER_PREFIX).order_by('id'))
+    Stock.objects.bulk_create([
+        Stock(user=u, stock_name=f'Produs {j + 1}', min_stock_level=0)
+        for u in accounts for j in range(stocks)
+    ])
+    stock_ids = list(Stock.objects.filter(user__in=accounts).order_by('id').values_list('id', flat=True))
+
+    days = int(round(years * 365))
+    start = timezone.localdate() - timedelta(days=days)
+    panel = synthetic_panel(len(stock_ids), days, seed=seed, start=start.isoformat())
+    panel['stock_id'] = np.asarray(stock_ids)[panel['stock_id'].to_numpy() - 1]
+    rows = list(zip(panel['stock_id'].tolist(), panel['ds'].dt.date, panel['y'].tolist(),
+                    panel['stock_quantity'].tolist(), (panel['is_holiday'] > 0).tolist()))
+    with transaction.atomic():
+        upsert_sales_rows(rows, batch_size=5000)
+    rebuild_rollups(stock_ids)
+
+    # un run cu plan per stoc, ca /api/alerts/ să aibă ce pagina
+    recent = panel[panel['ds'] > panel['ds'].max() - pd.Timedelta(days=28)]
+    level = recent.groupby('stock_id')['y'].mean()
+    current = panel.groupby('stock_id')['stock_quantity'].last()
+    horizon = pd.date_range(timezone.localdate(), periods=91, freq='D')
+    forecast = pd.DataFrame({
+        'stock_id': np.repeat(level.index.to_numpy(), len(horizon)),
+        'ds': np.tile(horizon.to_numpy(), len(level)),
+        'yhat': np.repeat(level.to_numpy(), len(horizon)),
+    })
+    plans = generate_order_plans(forecast, current, (level * 7).round())
+    runs = {r.stock_id: r for r in ForecastRun.objects.bulk_create(
+        [ForecastRun(stock_id=sid, months=3, review_days=14) for sid in stock_ids])}
+    if any(r.pk is None for r in runs.values()):
+        runs = {r.stock_id: r for r in ForecastRun.objects.filter(stock_id__in=stock_ids)}
+    names = dict(Stock.objects.filter(pk__in=stock_ids).values_list('id', 'stock_name'))
+    ReorderPlan.objects.bulk_create([
+        ReorderPlan(run=runs[p.stock_id], stock_name=names[p.stock_id], review_date=p.review_date.date(),
+                    stock_before=p.stock_before, demand_next=p.demand_next, order_qty=p.order_qty)
+        for p in plans.itertuples()
+    ], batch_size=2000)
+    return len(rows)
+
+
+def _import_bodies(count, seed):
+    """Fișiere CSV (ultimele IMPORT_DAYS zile) pentru /api/import-stocks/, ca multipart."""
+    bodies = []
+    end = timezone.localdate()
+    for i in range(count):
+        df = synthetic_panel(1, IMPORT_DAYS, seed=seed + i,
+                             start=(end - timedelta(days=IMPORT_DAYS)).isoformat())
+        csv = pd.DataFrame({
+            'ds': df['ds'].dt.strftime('%Y-%m-%d'),
+            'daily_sales': df['y'],
+            'current_stock_quantity': df['stock_quantity'],
+            'min_stock_level': 10,
+        }).to_csv(index=False).encode()
+        bodies.append(csv)
+    return bodies
+
+
+def _multipart(fields, filename, content):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: text/csv\r\n\r\n'.encode() + content + b'\r\n'
+    )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def _percentiles(latencies):
+    if not latencies:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {'p50_ms': round(p50, 1), 'p95_ms': round(p95, 1), 'p99_ms': round(p99, 1)}
+
+
+class Command(BaseCommand):
+    help = ("Load test local: populează o bază SQLite cu utilizatori x stocuri x ani de istoric, pornește "
+            "API-ul Django și proxy-ul Flask în proces și raportează throughput, latențe p50/p95/p99, "
+            "query-uri SQL per cerere și rata de erori per endpoint. "
+            "Rulare: manage.py loadtest --settings=backend.loadtest_settings")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--stocks', type=int, default=20, help="Stocuri per utilizator.")
+        parser.add_argument('--years', type=float, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-seed', action='store_true', help="Folosește datele din rularea anterioară.")
+        parser.add_argument('--target', choices=['django', 'flask', 'both'], default='both')
+        parser.add_argument('--endpoints', nargs='+', choices=list(ENDPOINTS), default=list(ENDPOINTS))
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200, help="Cereri per endpoint.")
+        parser.add_argument('--warmup', type=int, default=0,
+                            help="Cereri nemăsurate per endpoint înainte de măsurare (ex. primul fit la forecast).")
+        parser.add_argument('--timeout', type=float, default=120)
+        parser.add_argument('--output', help="Rezultatele și ca JSON în acest fișier.")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Load test-ul rulează doar pe SQLite: --settings=backend.loadtest_settings")
+        for name in ('cmdstanpy', 'prophet'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+        call_command('migrate', interactive=False, verbosity=0)
+        with connection.cursor() as cursor:
+            # WAL: citirile nu mai sunt blocate de importurile concurente
+            cursor.execute('PRAGMA journal_mode=WAL')
+
+        if not opts['no_seed']:
+            started = time.perf_counter()
+            rows = _seed(opts['users'], opts['stocks'], opts['years'], opts['seed'])
+            self.stdout.write(f"Populat: {opts['users']} utilizatori x {opts['stocks']} stocuri, "
+                              f"{rows} rânduri de istoric în {time.perf_counter() - started:.1f}s.")
+
+        accounts = list(User.objects.filter(username__startswith=USER_PREFIX).order_by('id'))
+        if not accounts:
+            raise CommandError("Nu există date de test; rulează fără --no-seed.")
+        stocks = {u.pk: list(Stock.objects.filter(user=u).order_by('id').values_list('id', flat=True))
+                  for u in accounts}
+        tokens = [(u, RefreshToken.for_user(u)) for u in accounts]
+        connection.close()  # serverul deschide conexiuni proprii, per fir
+
+        app = _CountingApp(get_wsgi_application())
+        django_server, django_url = _start_django(app)
+        servers = [django_server]
+        targets = {'django': django_url}
+        if opts['target'] in ('flask', 'both'):
+            flask_server, targets['flask'] = _start_flask(django_url)
+            servers.append(flask_server)
+        if opts['target'] == 'flask':
+            del targets['django']
+
+        bodies = _import_bodies(8, opts['seed'])
+        results = []
+        try:
+            for target, base_url in targets.items():
+                for name in opts['endpoints']:
+                    if target == 'flask' and name not in FLASK_ENDPOINTS:
+                        continue
+                    results.append(self._run(target, base_url, name, tokens, stocks, bodies, app, opts))
+        finally:
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+
+        self._print(results)
+        if opts['output']:
+            with open(opts['output'], 'w') as f:
+                json.dump({'options': {k: opts[k] for k in ('users', 'stocks', 'years', 'seed', 'concurrency',
+                                                             'requests', 'warmup')},
+                           'results': results}, f, indent=2)
+            self.stdout.write(f"Rezultate salvate în {opts['output']}.")
+
+    def _request(self, target, base_url, name, tokens, stocks, bodies, i, seed, timeout):
+        rng = random.Random(seed * 1_000_003 + i)
+        user, refresh = rng.choice(tokens)
+        stock_id = rng.choice(stocks[user.pk])
+        method, path = ENDPOINTS[name]
+        headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip'}
+        if target == 'flask':
+            headers['Cookie'] = f'access_token={refresh.access_token}; refresh_token={refresh}'
+        else:
+            headers['Authorization'] = f'Bearer {refresh.access_token}'
+
+        data = None
+        if name == 'import':
+            data, headers['Content-Type'] = _multipart({'stock_id': stock_id}, 'istoric.csv', rng.choice(bodies))
+        req = urllib.request.Request(base_url + path.format(stock=stock_id), data=data, headers=headers,
+                                     method=method)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as r:
+                r.read()
+                status = r.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        except OSError as e:
+            return time.perf_counter() - started, None, str(e)
+        return time.perf_counter() - started, status, None
+
+    def _run(self, target, base_url, name, tokens, stocks, bodies, app, opts):
+        def call(i):
+            return self._request(target, base_url, name, tokens, stocks, bodies, i, opts['seed'], opts['timeout'])
+
+        with ThreadPoolExecutor(opts['concurrency']) as pool:
+            list(pool.map(call, range(-opts['warmup'], 0)))
+            app.reset()
+            started = time.perf_counter()
+            outcomes = list(pool.map(call, range(opts['requests'])))
+            elapsed = time.perf_counter() - started
+
+        latencies = [seconds for seconds, _, _ in outcomes]
+        failed = [(status, error) for _, status, error in outcomes if status is None or status >= 400]
+        statuses = {}
+        for _, status, error in outcomes:
+            key = str(status) if status is not None else 'error'
+            statuses[key] = statuses.get(key, 0) + 1
+
+        # query-urile rutei Django din spatele endpoint-ului (și când trece prin proxy)
+        route = resolve(ENDPOINTS[name][1].split('?')[0].format(stock=1)).route
+        upstream, queries = app.stats.get(route, (0, 0))
+        return {
+            'target': target,
+            'endpoint': name,
+            'requests': len(outcomes),
+            'seconds': round(elapsed, 3),
+            'rps': round(len(outcomes) / elapsed, 1) if elapsed > 0 else None,
+            **_percentiles(latencies),
+            'mean_ms': round(float(np.mean(latencies)) * 1000, 1) if latencies else None,
+            'error_rate': round(len(failed) / len(outcomes), 4) if outcomes else None,
+            'statuses': statuses,
+            'first_error': next((f"{s or ''} {e or ''}".strip() for s, e in failed), None),
+            'django_requests': upstream,
+            'queries_per_request': round(queries / upstream, 2) if upstream else None,
+        }
+
+    def _print(self, results):
+        self.stdout.write(f"{'țintă':7} {'endpoint':9} {'cereri':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} "
+                          f"{'query/c':>8} {'erori':>6}")
+        for r in results:
+            q = r['queries_per_request'] if r['queries_per_request'] is not None else '-'
+            self.stdout.write(f"{r['target']:7} {r['endpoint']:9} {r['requests']:>6} {r['rps']:>7} "
+                              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {q:>8} "
+                              f"{r['error_rate']:>6.1%}")
+            if r['first_error']:
+                self.stdout.write(f"        prima eroare: {r['first_error']}")
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from aplicatie.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Reconstruiește rollup-urile (SalesRollup) și snapshot-urile (StockSnapshot) din istoric."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stock', type=int, action='append', dest='stocks',
+                            help="Doar stocul dat (se poate repeta).")
+
+    def handle(self, *args, **opts):
+        started = time.perf_counter()
+        count = rebuild_rollups(opts['stocks'])
+        self.stdout.write(f"Rollup-uri reconstruite pentru {count} stocuri în {time.perf_counter() - started:.1f}s.")
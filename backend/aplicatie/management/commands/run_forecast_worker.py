@@ -0,0 +1,38 @@
+import os
+import socket
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from aplicatie.jobs import work, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Procesează job-urile de prognoză din coada ForecastJob."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Oprește workerul când coada e goală.")
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help="Secunde între verificări când coada e goală.")
+        parser.add_argument('--max-jobs', type=int, default=None)
+        parser.add_argument('--stale-after', type=int, default=3600,
+                            help="Job-urile `running` mai vechi de atâtea secunde revin în coadă "
+                                 "(la pornire și apoi periodic).")
+        parser.add_argument('--requeue-every', type=float, default=60.0,
+                            help="Secunde între verificările job-urilor abandonate.")
+
+    def handle(self, *args, **opts):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        stale_after = timedelta(seconds=opts['stale_after'])
+        requeued = requeue_stale_jobs(stale_after)
+        if requeued:
+            self.stdout.write(f"{requeued} job-uri abandonate repuse în coadă.")
+
+        self.stdout.write(f"Worker {worker} pornit.")
+        try:
+            done = work(worker=worker, poll_interval=opts['poll'], once=opts['once'], max_jobs=opts['max_jobs'],
+                        stale_after=stale_after, requeue_every=opts['requeue_every'])
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(f"{done} job-uri procesate.")
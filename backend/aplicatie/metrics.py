@@ -0,0 +1,261 @@
+"""
+Metrici în format text Prometheus, fără dependențe externe.
+
+Fiecare proces își ține contoarele și histogramele în memorie. Cu METRICS_DIR setat
+(deploy cu mai mulți workeri, ex. gunicorn), fiecare proces își scrie periodic starea
+în METRICS_DIR/metrics_<pid>.json, iar /metrics adună fișierele tuturor proceselor.
+Directorul trebuie golit la pornirea serviciului, ca în prometheus_client.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+FIT_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300)
+IMPORT_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+FLUSH_INTERVAL = 1.0
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labels):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            values = self.registry.values(self)
+            values[key] = values.get(key, 0) + amount
+        self.registry.changed()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, labels, buckets):
+        super().__init__(registry, name, help_text, labels)
+        self.buckets = tuple(float(b) for b in buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)  # `le`: valoarea egală cu limita intră în bucket
+        with self.registry.lock:
+            values = self.registry.values(self)
+            entry = values.get(key)
+            if entry is None:
+                entry = values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+        self.registry.changed()
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self._values = {}
+        self._pid = os.getpid()
+        self._dirty = False
+        self._flusher = None
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(self, name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self, name, help_text, labels, buckets))
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _check_fork(self):
+        # după fork (workeri gunicorn cu --preload) procesul copil pornește de la zero
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._values = {}
+            self._flusher = None
+
+    def values(self, metric):
+        self._check_fork()
+        return self._values.setdefault(metric.name, {})
+
+    # --- agregarea între procese ---
+
+    def directory(self):
+        return getattr(settings, 'METRICS_DIR', None)
+
+    def changed(self):
+        self._dirty = True
+        if self._flusher is None and self.directory():
+            with self.lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                    # nu ține lock-uri folosite de fit-urile din procesele copil (pipeline._can_fork)
+                    self._flusher.fork_safe = True
+                    self._flusher.start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(FLUSH_INTERVAL)
+            if self._dirty:
+                self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            self._check_fork()
+            self._dirty = False
+            return {name: [[list(key), value] for key, value in values.items()]
+                    for name, values in self._values.items()}
+
+    def flush(self):
+        directory = self.directory()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics_{os.getpid()}.json')
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def collect(self):
+        """Valorile tuturor proceselor (sau doar ale procesului curent, fără METRICS_DIR)."""
+        directory = self.directory()
+        if not directory:
+            return self.snapshot()
+        self.flush()
+        merged = {}
+        for path in glob.glob(os.path.join(directory, 'metrics_*.json')):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # fișier scris chiar acum de alt proces: îl prindem la următorul scrape
+            for name, items in data.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = merged.setdefault(name, {})
+                for key, value in items:
+                    key = tuple(key)
+                    values[key] = _merge(metric, values.get(key), value)
+        return {name: [[list(key), value] for key, value in values.items()] for name, values in merged.items()}
+
+
+def _merge(metric, current, value):
+    if current is None:
+        return value
+    if metric.kind == 'counter':
+        return current + value
+    return [[a + b for a, b in zip(current[0], value[0])], current[1] + value[1], current[2] + value[2]]
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, key, extra=()):
+    pairs = list(zip(names, key)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(registry, extra=()):
+    """Formatul text Prometheus 0.0.4. `extra`: metrici calculate la scrape (nume, tip, help, [(labels, valoare)])."""
+    data = registry.collect()
+    lines = []
+    for name, metric in registry.metrics.items():
+        lines.append(f'# HELP {name} {metric.help}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(data.get(name, []), key=lambda item: item[0]):
+            if metric.kind == 'counter':
+                lines.append(f'{name}{_labels(metric.labels, key)} {_number(value)}')
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, n in zip(metric.buckets + (float('inf'),), counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{_labels(metric.labels, key, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(metric.labels, key)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(metric.labels, key)} {count}')
+    for name, kind, help_text, samples in extra:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            pairs = _labels([k for k, _ in labels], [v for _, v in labels])
+            lines.append(f'{name}{pairs} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'Durata cererilor HTTP, per rută.', ('method', 'route'))
+REQUESTS = registry.counter(
+    'http_requests_total', 'Cereri HTTP, per rută și cod de răspuns.', ('method', 'route', 'status'))
+FIT_SECONDS = registry.histogram(
+    'forecast_fit_duration_seconds', 'Durata fit-ului per model candidat.', ('model', 'status'), FIT_BUCKETS)
+PIPELINE_SECONDS = registry.histogram(
+    'forecast_pipeline_duration_seconds', 'Durata pipeline-ului de prognoză (inclusiv cache).', ('cached',),
+    FIT_BUCKETS)
+PIPELINE_RUNS = registry.counter(
+    'forecast_pipeline_runs_total', 'Rulări ale pipeline-ului de prognoză, după rezultat.', ('result',))
+CANDIDATE_FAILURES = registry.counter(
+    'forecast_candidate_failures_total', 'Modele candidate eșuate / oprite la timeout.', ('model', 'status'))
+CACHE_LOOKUPS = registry.counter(
+    'forecast_cache_lookups_total', 'Căutări în cache-ul de prognoze (hit/miss).', ('result',))
+JOBS = registry.counter(
+    'forecast_jobs_total', 'Job-uri de prognoză terminate, după status.', ('status',))
+IMPORT_ROWS = registry.counter(
+    'import_rows_total', 'Rânduri de istoric importate / respinse.', ('source', 'result'))
+IMPORT_SECONDS = registry.histogram(
+    'import_duration_seconds', 'Durata importurilor de istoric.', ('source',), IMPORT_BUCKETS)
+
+
+def observe_forecast(diagnostics):
+    """Metricile unei rulări auto_forecast_pipeline, din diagnosticul ei."""
+    if not diagnostics or 'seconds' not in diagnostics:
+        PIPELINE_RUNS.inc(result='failed')  # pipeline-ul nici n-a terminat (ex. worker mort)
+        return
+    cached = bool(diagnostics.get('cached'))
+    CACHE_LOOKUPS.inc(result='hit' if cached else 'miss')
+    PIPELINE_SECONDS.observe(diagnostics['seconds'], cached=str(cached).lower())
+    PIPELINE_RUNS.inc(result='ok' if diagnostics.get('selected') else 'failed')
+    for model, candidate in (diagnostics.get('candidates') or {}).items():
+        FIT_SECONDS.observe(candidate.get('seconds') or 0.0, model=model, status=candidate.get('status'))
+        if candidate.get('status') != 'ok':
+            CANDIDATE_FAILURES.inc(model=model, status=candidate.get('status'))
+
+
+def observe_import(source, imported, rejected, seconds):
+    IMPORT_ROWS.inc(imported, source=source, result='imported')
+    if rejected:
+        IMPORT_ROWS.inc(rejected, source=source, result='rejected')
+    IMPORT_SECONDS.observe(seconds, source=source)
@@ -0,0 +1,167 @@
+import cProfile
+import os
+import random
+import re
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from .forecasting import spans
+from .metrics import REQUEST_SECONDS, REQUESTS
+
+try:
+    import brotli
+except ImportError:  # dependință opțională: fără ea comprimăm doar cu gzip
+    brotli = None
+
+try:
+    from pyinstrument import Profiler as InstrumentProfiler
+except ImportError:  # dependință opțională: fără ea profilăm doar cu cProfile
+    InstrumentProfiler = None
+
+re_accepts_br = _lazy_re_compile(r"\bbr\b")
+
+# calitate medie: aproape cât nivelul maxim ca dimensiune, de zeci de ori mai rapidă
+BROTLI_QUALITY = 5
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Brotli pentru răspunsurile complete când clientul îl acceptă și pachetul e instalat,
+    altfel gzip (GZipMiddleware, inclusiv pentru răspunsurile streaming).
+    """
+
+    def process_response(self, request, response):
+        ae = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if (brotli is None or response.streaming or not re_accepts_br.search(ae)
+                or response.has_header("Content-Encoding") or len(response.content) < 200):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        # ETag slab după comprimare, ca în GZipMiddleware
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+
+def _time_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        spans.record("db", time.perf_counter() - started)
+
+
+def _server_timing(recorder, total):
+    parts = []
+    for name, (seconds, count) in recorder.items():
+        part = f"{name};dur={seconds * 1000:.1f}"
+        if name == "db":
+            part += f';desc="{count} queries"'
+        elif count > 1:
+            part += f';desc="{count}x"'
+        parts.append(part)
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """
+    Durata cererii pe etape (span-urile din forecasting.spans, query-urile SQL, total)
+    în header-ul Server-Timing. Cu PROFILE_REQUESTS activ, o fracțiune din cereri rulează
+    sub profiler, iar profilul e salvat doar dacă cererea a depășit pragul.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "SERVER_TIMING", True)
+        self.profile = getattr(settings, "PROFILE_REQUESTS", None) or {}
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder, token = spans.start()
+        profiler = self._start_profiler()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(_time_query):
+                response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - started
+            if profiler is not None:
+                profiler.stop()
+            spans.stop(token)
+
+        response.headers["Server-Timing"] = _server_timing(recorder, total)
+        if profiler is not None and total * 1000 >= self.profile.get("threshold_ms", 1000):
+            profiler.save(self.profile.get("directory") or "profiles", request.path, total)
+        return response
+
+    def _start_profiler(self):
+        if not self.profile.get("enabled") or random.random() >= self.profile.get("sample_rate", 0.0):
+            return None
+        use_pyinstrument = self.profile.get("engine") == "pyinstrument" and InstrumentProfiler is not None
+        profiler = _Profiler(use_pyinstrument)
+        try:
+            profiler.start()
+        except ValueError:
+            return None  # alt profiler e deja activ (ex. cerere concurentă, Python 3.12+)
+        return profiler
+
+
+class MetricsMiddleware:
+    """Durata și numărul cererilor per rută (șablonul din urls.py, nu path-ul concret), pentru /metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        route = "/" + match.route if match is not None else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route)
+        REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+        return response
+
+
+class _Profiler:
+    """cProfile (.prof, pentru pstats/snakeviz) sau pyinstrument (.html)."""
+
+    def __init__(self, use_pyinstrument):
+        self.profiler = InstrumentProfiler() if use_pyinstrument else cProfile.Profile()
+        self.html = use_pyinstrument
+
+    def start(self):
+        if self.html:
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.html:
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+
+    def save(self, directory, path, seconds):
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_")[:60] or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(seconds * 1000)}ms-{slug}-{os.getpid()}"
+        if self.html:
+            with open(os.path.join(directory, name + ".html"), "w") as f:
+                f.write(self.profiler.output_html())
+        else:
+            self.profiler.dump_stats(os.path.join(directory, name + ".prof"))
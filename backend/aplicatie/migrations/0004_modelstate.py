@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicatie', '0003_forecastjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=20)),
+                ('config_version', models.CharField(max_length=12)),
+                ('state', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='model_states', to='aplicatie.stock')),
+            ],
+            options={
+                'unique_together': {('stock', 'model_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicatie', '0004_modelstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelstate',
+            name='fit_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='modelstate',
+            name='fits',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='modelstate',
+            name='run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='model_states', to='aplicatie.forecastrun'),
+        ),
+        migrations.AddField(
+            model_name='modelstate',
+            name='saved_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='modelstate',
+            name='warm',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='modelstate',
+            name='warm_fits',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
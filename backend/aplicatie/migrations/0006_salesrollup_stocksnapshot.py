@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicatie', '0005_modelstate_run_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='aplicatie.stock')),
+                ('first_date', models.DateField(blank=True, null=True)),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('days', models.PositiveIntegerField(default=0)),
+                ('total_sales', models.BigIntegerField(default=0)),
+                ('stockout_days', models.PositiveIntegerField(default=0)),
+                ('latest_sales', models.PositiveIntegerField(default=0)),
+                ('latest_quantity', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('W', 'Week'), ('M', 'Month')], max_length=1)),
+                ('period_start', models.DateField()),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('days', models.PositiveIntegerField()),
+                ('total_sales', models.BigIntegerField()),
+                ('stockout_days', models.PositiveIntegerField()),
+                ('end_quantity', models.PositiveIntegerField()),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='aplicatie.stock')),
+            ],
+            options={
+                'ordering': ['period_start'],
+                'unique_together': {('stock', 'period', 'period_start')},
+            },
+        ),
+    ]
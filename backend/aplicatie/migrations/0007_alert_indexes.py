@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicatie', '0006_salesrollup_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='forecastrun',
+            index=models.Index(fields=['stock', 'run_at'], name='aplicatie_f_stock_i_f79ff9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reorderplan',
+            index=models.Index(fields=['run', 'review_date'], name='aplicatie_r_run_id_867cd8_idx'),
+        ),
+    ]
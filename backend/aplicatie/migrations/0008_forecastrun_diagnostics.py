@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicatie', '0007_alert_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastrun',
+            name='cached',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='forecastrun',
+            name='data_points',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='forecastrun',
+            name='diagnostics',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='forecastrun',
+            name='fit_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='forecastrun',
+            name='model_name',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='forecastrun',
+            name='wape',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,81 @@
+import pickle
+
+from django.db.models import Count, Sum, Avg, Q
+
+from .models import ModelState
+from .forecasting.models import MODEL_VERSIONS
+from .forecasting.spans import timed
+
+
+@timed("model_states")
+def load_states(stock_ids):
+    """
+    {stock_id: {model_name: state}} pentru stocurile date, într-un singur query.
+    Stările salvate cu altă versiune de config sunt șterse.
+    """
+    states = {sid: {} for sid in stock_ids}
+    stale = []
+    for row in ModelState.objects.filter(stock_id__in=stock_ids).values('id', 'stock_id', 'model_name',
+                                                                         'config_version', 'state'):
+        if row['config_version'] != MODEL_VERSIONS.get(row['model_name']):
+            stale.append(row['id'])
+            continue
+        try:
+            states[row['stock_id']][row['model_name']] = pickle.loads(bytes(row['state']))
+        except Exception:
+            # stare coruptă/incompatibilă: modelul face fit complet și o rescrie
+            continue
+    if stale:
+        ModelState.objects.filter(pk__in=stale).delete()
+    return states
+
+
+@timed("model_states")
+def save_states(stock_id, states, previous=None, run=None):
+    """Salvează stările noi; cele identice cu `previous` (ex. rezultat din cache) sunt ignorate."""
+    previous = previous or {}
+    for model_name, state in states.items():
+        if state is None or state is previous.get(model_name):
+            continue
+        obj, _ = ModelState.objects.get_or_create(
+            stock_id=stock_id,
+            model_name=model_name,
+            defaults={'config_version': state.get('config', ''), 'state': b''}
+        )
+        obj.config_version = state.get('config', '')
+        obj.state = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        if state.get('early_stops'):
+            # model oprit devreme (pipeline.early_stop_margin): aceeași stare, doar contorul de opriri
+            obj.save(update_fields=['config_version', 'state'])
+            continue
+        fit_seconds = state.get('fit_seconds') or 0.0
+        warm = bool(state.get('warm'))
+        obj.run = run
+        obj.fit_seconds = fit_seconds
+        obj.warm = warm
+        obj.fits += 1
+        if warm:
+            obj.warm_fits += 1
+            obj.saved_seconds += max(0.0, (state.get('cold_seconds') or 0.0) - fit_seconds)
+        obj.save()
+
+
+def store_report(user=None):
+    qs = ModelState.objects.all()
+    if user is not None:
+        qs = qs.filter(stock__user=user)
+    rows = (qs.values('model_name')
+            .annotate(entries=Count('id'),
+                      stale=Count('id', filter=~Q(config_version__in=list(MODEL_VERSIONS.values()))),
+                      fits=Sum('fits'),
+                      warm_fits=Sum('warm_fits'),
+                      saved_seconds=Sum('saved_seconds'),
+                      avg_fit_seconds=Avg('fit_seconds'))
+            .order_by('model_name'))
+    return [
+        {**row,
+         'version': MODEL_VERSIONS.get(row['model_name']),
+         'saved_seconds': round(row['saved_seconds'] or 0.0, 3),
+         'avg_fit_seconds': round(row['avg_fit_seconds'] or 0.0, 3)}
+        for row in rows
+    ]
@@ -9,6 +9,19 @@ from openpyxl.chart.trendline import Trendline
 from django.contrib.auth.models import User
 import os,time
 from django.utils.text import slugify
+from django.db.models import OuterRef, Subquery
+
+
+class StockQuerySet(models.QuerySet):
+    def with_latest(self):
+        """Adnotează ultima zi din istoric (latest_date/sales/quantity) în același query."""
+        last = SalesRecord.objects.filter(stock=OuterRef('pk')).order_by('-date')
+        return self.annotate(
+            latest_date=Subquery(last.values('date')[:1]),
+            latest_sales=Subquery(last.values('daily_sales')[:1]),
+            latest_quantity=Subquery(last.values('stock_quantity')[:1]),
+        )
+
 
 class Stock(models.Model):
     user = models.ForeignKey(
@@ -23,9 +36,24 @@ class Stock(models.Model):
     created_at =            models.DateTimeField(auto_now_add=True)
     updated_at             = models.DateTimeField(auto_now=True)
     is_active              = models.BooleanField(default=True)
+
+    objects = StockQuerySet.as_manager()
+
     def __str__(self):
         return self.stock_name
 
+class SalesRecordQuerySet(models.QuerySet):
+    def delete(self):
+        """Ștergere în bloc: o invalidare de cache și un refresh de rollup-uri per stoc."""
+        changes = {}
+        for stock_id, day in self.values_list('stock_id', 'date'):
+            changes.setdefault(stock_id, []).append(day)
+        result = super().delete()
+        from .signals import history_deleted
+        history_deleted(changes)
+        return result
+
+
 class SalesRecord(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -43,16 +71,132 @@ class SalesRecord(models.Model):
     daily_sales     = models.PositiveIntegerField()
     stock_quantity  = models.PositiveIntegerField()
     is_holiday = models.BooleanField(default=False)
+
+    # fără receiver post_delete: ștergerea unui stoc șterge istoricul direct în SQL
+    # (fast delete), iar ștergerile explicite trec prin queryset-ul / delete() de aici
+    objects = SalesRecordQuerySet.as_manager()
+
     class Meta:
         unique_together = ('stock','date')
         ordering        = ['date']
 
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .signals import history_deleted
+        history_deleted({self.stock_id: [self.date]})
+        return result
+
+
+class SalesRollup(models.Model):
+    """Totaluri săptămânale/lunare per stoc, întreținute incremental de rollups.refresh_rollups."""
+    WEEK, MONTH = 'W', 'M'
+    PERIOD_CHOICES = [(WEEK, 'Week'), (MONTH, 'Month')]
+
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='rollups')
+    period = models.CharField(max_length=1, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    first_date = models.DateField()
+    last_date = models.DateField()
+    days = models.PositiveIntegerField()
+    total_sales = models.BigIntegerField()
+    stockout_days = models.PositiveIntegerField()
+    end_quantity = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('stock', 'period', 'period_start')
+        ordering = ['period_start']
+
+
+class StockSnapshot(models.Model):
+    """Starea curentă a istoricului unui stoc (interval, totaluri, ultima zi)."""
+    stock = models.OneToOneField(Stock, on_delete=models.CASCADE, primary_key=True, related_name='snapshot')
+    first_date = models.DateField(null=True, blank=True)
+    last_date = models.DateField(null=True, blank=True)
+    days = models.PositiveIntegerField(default=0)
+    total_sales = models.BigIntegerField(default=0)
+    stockout_days = models.PositiveIntegerField(default=0)
+    latest_sales = models.PositiveIntegerField(default=0)
+    latest_quantity = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def history_years(self):
+        if not self.first_date:
+            return 0.0
+        return (self.last_date - self.first_date).days / 365.0
+
 
 class ForecastRun(models.Model):
     stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='forecast_runs')
     run_at = models.DateTimeField(auto_now_add=True)
     months = models.IntegerField()
     review_days = models.IntegerField()
+    # diagnosticul pipeline-ului: modelul ales, WAPE-ul lui, zilele de istoric și durata;
+    # `diagnostics` are detaliile per candidat (status, WAPE, durată, eroare)
+    model_name = models.CharField(max_length=20, blank=True, default='')
+    wape = models.FloatField(null=True, blank=True)
+    data_points = models.PositiveIntegerField(null=True, blank=True)
+    fit_seconds = models.FloatField(null=True, blank=True)
+    cached = models.BooleanField(default=False)
+    diagnostics = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # ultimul run per stoc (alerte cu latest=1)
+            models.Index(fields=['stock', 'run_at']),
+        ]
+
+class ModelState(models.Model):
+    """Starea serializată a unui model antrenat (parametri Prophet, parametri + filtru SARIMA), per stoc."""
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='model_states')
+    model_name = models.CharField(max_length=20)
+    config_version = models.CharField(max_length=12)
+    state = models.BinaryField()
+    run = models.ForeignKey('ForecastRun', on_delete=models.SET_NULL, related_name='model_states',
+                            null=True, blank=True)
+    fit_seconds = models.FloatField(default=0)
+    warm = models.BooleanField(default=False)
+    fits = models.PositiveIntegerField(default=0)
+    warm_fits = models.PositiveIntegerField(default=0)
+    saved_seconds = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('stock', 'model_name')
+
+    def __str__(self):
+        return f"{self.model_name} state for {self.stock_id}"
+
+
+class ForecastJob(models.Model):
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                             related_name='forecast_jobs', null=True, blank=True)
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='forecast_jobs')
+    months = models.IntegerField(null=True, blank=True)
+    review_days = models.IntegerField(default=14)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    progress = models.PositiveSmallIntegerField(default=0)
+    stage = models.CharField(max_length=20, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    result = models.JSONField(null=True, blank=True)
+    run = models.ForeignKey(ForecastRun, on_delete=models.SET_NULL, related_name='jobs', null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Job {self.pk} ({self.stock_id}): {self.status}"
 
 class ReorderPlan(models.Model):
     run = models.ForeignKey(ForecastRun, on_delete=models.CASCADE, related_name='plans',null = True, blank = True)
@@ -69,6 +213,9 @@ class ReorderPlan(models.Model):
 
     class Meta:
         ordering = ['review_date']
+        indexes = [
+            models.Index(fields=['run', 'review_date']),
+        ]
         verbose_name = "Plan de reaprovizionare"
         verbose_name_plural = "Planuri de reaprovizionare"
 
@@ -0,0 +1,15 @@
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+
+
+class StockSummaryPagination(PageNumberPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class AlertsCursorPagination(CursorPagination):
+    # cele mai noi run-uri primele, planul fiecărui run în ordinea datelor
+    ordering = ('-run_id', 'review_date', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
@@ -0,0 +1,226 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ForecastRun, ReorderPlan
+from .caching import get_forecast_cache
+from .model_store import load_states, save_states
+from .forecasting.pipeline import auto_forecast_pipeline
+from .forecasting.inventory import generate_order_plan, max_horizon
+from .forecasting.spans import timed
+from .metrics import observe_forecast
+
+
+class PlanError(Exception):
+    pass
+
+
+def pipeline_options():
+    return {
+        "parallel": getattr(settings, 'FORECAST_PARALLEL_FITS', True),
+        "timeout": getattr(settings, 'FORECAST_MODEL_TIMEOUT', None),
+        "early_stop_wape": getattr(settings, 'FORECAST_EARLY_STOP_WAPE', None),
+        "early_stop_margin": getattr(settings, 'FORECAST_EARLY_STOP_MARGIN', None),
+    }
+
+
+def allowed_months(df):
+    years = (df['ds'].max() - df['ds'].min()).days / 365.0
+    return max_horizon(years)
+
+
+def snapshot_months(snapshot):
+    # aceeași regulă ca allowed_months, din StockSnapshot, fără să citim istoricul
+    return max_horizon(snapshot.history_years())
+
+
+@timed("history")
+def load_history(stock):
+    qs_hist = stock.history.all().values('date', 'daily_sales', 'stock_quantity', 'is_holiday')
+    df = pd.DataFrame(qs_hist).rename(columns={'date': 'ds', 'daily_sales': 'y'})
+    if not df.empty:
+        df['ds'] = pd.to_datetime(df['ds'])
+    return df
+
+
+def run_fields(diagnostics):
+    """Câmpurile ForecastRun din diagnosticul întors de auto_forecast_pipeline."""
+    if not diagnostics:
+        return {}
+    return {
+        'model_name': diagnostics.get('selected') or '',
+        'wape': diagnostics.get('wape'),
+        'data_points': diagnostics.get('points'),
+        'fit_seconds': diagnostics.get('seconds'),
+        'cached': bool(diagnostics.get('cached')),
+        'diagnostics': diagnostics,
+    }
+
+
+@timed("save_plan")
+@transaction.atomic
+def save_plan(stock, months, review_days, plan_df, diagnostics=None):
+    run = ForecastRun.objects.create(
+        stock=stock,
+        months=months,
+        review_days=review_days,
+        **run_fields(diagnostics)
+    )
+
+    objs = []
+    for row in plan_df.to_dict('records'):
+        objs.append(ReorderPlan(
+            run=run,
+            review_date=row['review_date'],
+            stock_before=row['stock_before'],
+            demand_next=row['demand_next'],
+            order_qty=row['order_qty'],
+            stock_name=stock.stock_name
+        ))
+    ReorderPlan.objects.bulk_create(objs)
+    return run
+
+
+def plan_summary(plan_df, wape, model_name, min_stock):
+    total_order = plan_df["order_qty"].sum() if not plan_df.empty else 0.0
+    accuracy_pct = round(max(0.0, (1 - float(wape)) * 100), 1)
+    return {
+        "model": model_name,
+        "accuracy_pct": accuracy_pct,
+        "min_stock_level_used": min_stock,
+        "total_order_qty": round(float(total_order), 2),
+    }
+
+
+def build_and_save_plan(stock, months=None, review_days=14, progress=None):
+    """
+    Prognoză + plan de reaprovizionare salvat pentru un stoc.
+    `progress(pct, stage)` e apelat între etape (folosit de job queue).
+    Întoarce (run, payload) sau ridică PlanError.
+    """
+    progress = progress or (lambda pct, stage: None)
+
+    progress(5, "loading")
+    df = load_history(stock)
+    if df.empty:
+        raise PlanError('Nu există istoric.')
+
+    allowed = allowed_months(df)
+    months = allowed if months is None else min(int(months), allowed)
+    horizon_days = int(months * 30.5)
+    if horizon_days <= 0:
+        raise PlanError('Istoric insuficient pentru forecast.')
+
+    progress(20, "fitting")
+    previous = load_states([stock.pk])[stock.pk]
+    states = dict(previous)
+    diagnostics = {}
+    fc_df, wape, model_name = auto_forecast_pipeline(
+        df, horizon_days=horizon_days, cache=get_forecast_cache(), cache_tag=stock.pk,
+        states=states, diagnostics=diagnostics, **pipeline_options()
+    )
+    observe_forecast(diagnostics)
+    if fc_df is None:
+        raise PlanError('Prognoza a eșuat. Verifică datele.')
+
+    progress(80, "planning")
+    last_rec = stock.history.order_by('-date').first()
+    initial_stock = last_rec.stock_quantity if last_rec else 0
+    min_stock = stock.min_stock_level
+
+    plan_df = generate_order_plan(
+        fc_df,
+        current_stock=initial_stock,
+        min_stock_level=min_stock,
+        review_period_days=review_days
+    )
+
+    progress(90, "saving")
+    run = save_plan(stock, months, review_days, plan_df, diagnostics)
+    save_states(stock.pk, states, previous, run=run)
+
+    plan = plan_df.to_dict(orient="records")
+    for row in plan:
+        row['review_date'] = row['review_date'].isoformat()
+    return run, {
+        "plan": plan,
+        "summary": plan_summary(plan_df, wape, model_name, min_stock),
+        "diagnostics": diagnostics,
+    }
+
+
+# lungimea istoricului (zile) după care sunt grupate duratele în raport
+HISTORY_BUCKETS = ((365, '<1y'), (730, '1-2y'), (1460, '2-4y'), (None, '4y+'))
+
+
+def _history_bucket(points):
+    for limit, label in HISTORY_BUCKETS:
+        if limit is None or points < limit:
+            return label
+
+
+def _distribution(seconds):
+    p50, p90 = np.percentile(seconds, [50, 90])
+    return {
+        'p50_seconds': round(float(p50), 3),
+        'p90_seconds': round(float(p90), 3),
+        'max_seconds': round(float(max(seconds)), 3),
+        'total_seconds': round(float(sum(seconds)), 3),
+    }
+
+
+def diagnostics_report(user, days=30, stock_id=None, slowest=10):
+    """
+    Distribuția duratelor de fit din run-urile ultimelor `days` zile, pe model și
+    lungimea istoricului: per run (modelul ales, fără rezultatele din cache) și per
+    candidat (din diagnostics), plus run-urile cele mai scumpe.
+    """
+    runs = (ForecastRun.objects
+            .filter(stock__user=user, run_at__gte=timezone.now() - timedelta(days=days),
+                    fit_seconds__isnull=False)
+            .order_by('-fit_seconds'))
+    if stock_id is not None:
+        runs = runs.filter(stock_id=stock_id)
+    rows = list(runs.values('id', 'stock_id', 'stock__stock_name', 'run_at', 'model_name', 'wape',
+                            'data_points', 'fit_seconds', 'cached', 'diagnostics'))
+
+    selected, candidates = {}, {}
+    for row in rows:
+        bucket = _history_bucket(row['data_points'] or 0)
+        if not row['cached']:
+            entry = selected.setdefault((row['model_name'] or '-', bucket), {'seconds': [], 'wape': []})
+            entry['seconds'].append(row['fit_seconds'])
+            if row['wape'] is not None:
+                entry['wape'].append(row['wape'])
+        for name, c in ((row['diagnostics'] or {}).get('candidates') or {}).items():
+            entry = candidates.setdefault((name, bucket), {'seconds': [], 'statuses': {}})
+            entry['seconds'].append(c.get('seconds') or 0.0)
+            entry['statuses'][c.get('status')] = entry['statuses'].get(c.get('status'), 0) + 1
+
+    order = {label: i for i, (_, label) in enumerate(HISTORY_BUCKETS)}
+    return {
+        'days': days,
+        'runs': len(rows),
+        'cached_runs': sum(1 for row in rows if row['cached']),
+        'by_model': [
+            {'model': model, 'history': bucket, 'runs': len(entry['seconds']),
+             'mean_wape': round(float(np.mean(entry['wape'])), 4) if entry['wape'] else None,
+             **_distribution(entry['seconds'])}
+            for (model, bucket), entry in sorted(selected.items(), key=lambda kv: (kv[0][0], order[kv[0][1]]))
+        ],
+        'candidates': [
+            {'model': model, 'history': bucket, 'fits': len(entry['seconds']), 'statuses': entry['statuses'],
+             **_distribution(entry['seconds'])}
+            for (model, bucket), entry in sorted(candidates.items(), key=lambda kv: (kv[0][0], order[kv[0][1]]))
+        ],
+        'slowest': [
+            {'run_id': row['id'], 'stock_id': row['stock_id'], 'stock_name': row['stock__stock_name'],
+             'run_at': row['run_at'], 'model': row['model_name'], 'data_points': row['data_points'],
+             'seconds': round(row['fit_seconds'], 3), 'cached': row['cached']}
+            for row in rows[:slowest]
+        ],
+    }
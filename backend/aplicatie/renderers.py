@@ -0,0 +1,32 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .forecasting.spans import timed
+
+try:
+    import orjson
+except ImportError:  # dependință opțională: fără ea rămâne encoderul DRF
+    orjson = None
+
+_fallback = JSONEncoder()
+
+
+def _default(obj):
+    # tipurile pe care orjson nu le știe (Decimal, Timestamp, lazy strings, ...) ca în DRF
+    return _fallback.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer cu orjson (inclusiv array-uri/scalari numpy), când e instalat.
+    Cererile cu indentare (ex. `Accept: application/json; indent=4`) merg pe encoderul DRF.
+    """
+    options = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    @timed("render")
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_default, option=self.options)
@@ -0,0 +1,216 @@
+import threading
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import Min, Max, Sum
+from django.utils import timezone
+
+from .models import Stock, SalesRecord, SalesRollup, StockSnapshot
+
+# stock_id -> set de date modificate (None = rebuild complet), per thread, golit la commit
+_pending = threading.local()
+
+SNAPSHOT_FIELDS = ['first_date', 'last_date', 'days', 'total_sales', 'stockout_days',
+                   'latest_sales', 'latest_quantity', 'updated_at']
+
+
+def _week_start(ds):
+    return ds - pd.to_timedelta(ds.dt.dayofweek, unit='D')
+
+
+def _month_start(ds):
+    return ds.dt.to_period('M').dt.start_time
+
+
+def _as_date(value):
+    if isinstance(value, datetime):  # inclusiv pd.Timestamp
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def _periods(dates):
+    """Începuturile săptămânilor (luni) și lunilor care conțin `dates`, ca date Python."""
+    days = {_as_date(d) for d in dates}
+    weeks = frozenset(d - timedelta(days=d.weekday()) for d in days)
+    months = frozenset(d.replace(day=1) for d in days)
+    return weeks, months
+
+
+def _month_end(month_start):
+    return (month_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def _aggregate(df, period, key, starts):
+    part = df[df[key].isin(pd.to_datetime(list(starts)))]
+    if part.empty:
+        return []
+    agg = part.groupby(['stock_id', key], sort=False).agg(
+        first_date=('ds', 'min'),
+        last_date=('ds', 'max'),
+        days=('ds', 'size'),
+        total_sales=('daily_sales', 'sum'),
+        stockout_days=('stockout', 'sum'),
+        end_quantity=('stock_quantity', 'last'),
+    )
+    return [
+        SalesRollup(
+            stock_id=int(stock_id),
+            period=period,
+            period_start=start.date(),
+            first_date=first.date(),
+            last_date=last.date(),
+            days=int(days),
+            total_sales=int(total),
+            stockout_days=int(stockout),
+            end_quantity=int(end),
+        )
+        for (stock_id, start), first, last, days, total, stockout, end in zip(
+            agg.index, agg['first_date'], agg['last_date'], agg['days'],
+            agg['total_sales'], agg['stockout_days'], agg['end_quantity'])
+    ]
+
+
+def refresh_rollups(stock_id, dates=None):
+    """
+    Recalculează rollup-urile stocului pentru săptămânile/lunile care conțin `dates`
+    (toate, dacă dates e None) și apoi snapshot-ul. Citește din istoric doar intervalul
+    perioadelor afectate.
+    """
+    refresh_rollups_many({stock_id: dates})
+
+
+@transaction.atomic
+def refresh_rollups_many(changes):
+    """
+    Ca refresh_rollups, pentru {stock_id: dates} dintr-o dată: stocurile cu aceleași
+    perioade afectate (ex. feed-ul zilnic, aceeași zi pentru toate) sunt recalculate
+    împreună, cu un număr fix de query-uri.
+    """
+    groups = {}
+    for stock_id, dates in changes.items():
+        if dates is None:
+            key = ('all', stock_id)  # rebuild complet: câte un stoc, istoricul poate fi mare
+        elif not dates:
+            continue
+        else:
+            key = _periods(dates)
+        groups.setdefault(key, []).append(stock_id)
+
+    for key, stock_ids in groups.items():
+        if key[0] == 'all':
+            _refresh_group(stock_ids, None, None)
+        else:
+            _refresh_group(stock_ids, *key)
+    refreshed = [stock_id for stock_ids in groups.values() for stock_id in stock_ids]
+    if refreshed:
+        refresh_snapshots(refreshed)
+
+
+def _refresh_group(stock_ids, weeks, months):
+    records = SalesRecord.objects.filter(stock_id__in=stock_ids)
+    rollups = SalesRollup.objects.filter(stock_id__in=stock_ids)
+
+    if weeks is not None:
+        lo = min(min(weeks), min(months))
+        hi = max(max(weeks) + timedelta(days=6), _month_end(max(months)))
+        records = records.filter(date__gte=lo, date__lte=hi)
+        rollups.filter(period=SalesRollup.WEEK, period_start__in=list(weeks)).delete()
+        rollups.filter(period=SalesRollup.MONTH, period_start__in=list(months)).delete()
+    else:
+        rollups.delete()
+
+    rows = list(records.order_by('stock_id', 'date').values_list('stock_id', 'date', 'daily_sales', 'stock_quantity'))
+    df = pd.DataFrame.from_records(rows, columns=['stock_id', 'ds', 'daily_sales', 'stock_quantity'])
+    df['ds'] = pd.to_datetime(df['ds'])
+    df['stockout'] = df['stock_quantity'] == 0
+    df['week'] = _week_start(df['ds'])
+    df['month'] = _month_start(df['ds'])
+    if weeks is None:
+        weeks, months = set(df['week']), set(df['month'])
+
+    SalesRollup.objects.bulk_create(
+        _aggregate(df, SalesRollup.WEEK, 'week', weeks) + _aggregate(df, SalesRollup.MONTH, 'month', months)
+    )
+
+
+def refresh_snapshot(stock_id):
+    refresh_snapshots([stock_id])
+
+
+def refresh_snapshots(stock_ids):
+    # totalurile din rollup-urile lunare (câteva rânduri pe an), ultima zi din istoric (index)
+    totals = {
+        row['stock_id']: row
+        for row in (SalesRollup.objects
+                    .filter(stock_id__in=stock_ids, period=SalesRollup.MONTH)
+                    .values('stock_id')
+                    .annotate(first_date=Min('first_date'), last_date=Max('last_date'), days=Sum('days'),
+                              total_sales=Sum('total_sales'), stockout_days=Sum('stockout_days')))
+    }
+    latest = Stock.objects.filter(pk__in=stock_ids).with_latest().values_list('pk', 'latest_sales', 'latest_quantity')
+
+    snapshots = []
+    for stock_id, latest_sales, latest_quantity in latest:
+        t = totals.get(stock_id, {})
+        snapshots.append(StockSnapshot(
+            stock_id=stock_id,
+            first_date=t.get('first_date'),
+            last_date=t.get('last_date'),
+            days=t.get('days') or 0,
+            total_sales=t.get('total_sales') or 0,
+            stockout_days=t.get('stockout_days') or 0,
+            latest_sales=latest_sales or 0,
+            latest_quantity=latest_quantity or 0,
+        ))
+    kwargs = {'update_conflicts': True, 'update_fields': SNAPSHOT_FIELDS}
+    if connection.features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = ['stock']  # MySQL: cheia primară, implicit
+    StockSnapshot.objects.bulk_create(snapshots, **kwargs)
+    # istoricul s-a schimbat: stocul apare ca modificat (folosit de listări / cache-uri HTTP)
+    Stock.objects.filter(pk__in=stock_ids).update(updated_at=timezone.now())
+
+
+def schedule_refresh(stock_id, dates=None):
+    """
+    Programează refresh_rollups la commit-ul tranzacției curente (imediat în autocommit).
+    Modificările din aceeași tranzacție sunt comasate într-un singur refresh_rollups_many.
+    """
+    pending = _pending.__dict__.setdefault('stocks', {})
+    if dates is None or pending.get(stock_id, set()) is None:
+        pending[stock_id] = None
+    else:
+        pending.setdefault(stock_id, set()).update(dates)
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    # primul callback de la commit procesează toate stocurile în așteptare, împreună
+    changes = _pending.__dict__.pop('stocks', None)
+    if not changes:
+        return
+    existing = set(Stock.objects.filter(pk__in=list(changes)).values_list('pk', flat=True))
+    refresh_rollups_many({pk: dates for pk, dates in changes.items() if pk in existing})
+
+
+def get_snapshot(stock):
+    """Snapshot-ul stocului; pentru stocurile fără rollup-uri e construit la prima cerere."""
+    snapshot = getattr(stock, 'snapshot', None)
+    if snapshot is None:
+        refresh_rollups(stock.pk)
+        snapshot = StockSnapshot.objects.get(pk=stock.pk)
+        stock.snapshot = snapshot
+    return snapshot
+
+
+def rebuild_rollups(stock_ids=None):
+    stocks = Stock.objects.order_by('pk')
+    if stock_ids:
+        stocks = stocks.filter(pk__in=stock_ids)
+    count = 0
+    for stock_id in stocks.values_list('pk', flat=True).iterator():
+        refresh_rollups(stock_id)
+        count += 1
+    return count
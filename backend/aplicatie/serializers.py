@@ -1,7 +1,12 @@
+from collections import Counter
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db.models import Max
 from .models import Stock,SalesRecord,ReorderPlan,ForecastRun
 from rest_framework.fields import CurrentUserDefault, HiddenField
+from .rollups import schedule_refresh, get_snapshot
+from .importers import sync_history, HISTORY_MODES
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -36,6 +41,8 @@ class StockWithHistorySerializer(serializers.ModelSerializer):
     daily_sales_quantity   = serializers.SerializerMethodField()
     current_stock_quantity = serializers.SerializerMethodField()
     history                = SalesRecordSerializer(many=True, required=False)
+    # cum e aplicat `history` la update (vezi importers.sync_history)
+    history_mode           = serializers.ChoiceField(choices=HISTORY_MODES, default='replace', write_only=True)
     user = HiddenField(default=CurrentUserDefault())
     class Meta:
         model  = Stock
@@ -47,19 +54,44 @@ class StockWithHistorySerializer(serializers.ModelSerializer):
             'daily_sales_quantity',
             'current_stock_quantity',
             'history',
+            'history_mode',
             'is_active',
         )
         read_only_fields = ('id', 'user')
 
+    # raportul ultimului update al istoricului (None dacă `history` n-a fost trimis)
+    history_changes = None
+
+    # cu Stock.objects.with_latest() valorile vin din adnotări, fără query per stoc
     def get_daily_sales_quantity(self, obj):
+        if hasattr(obj, 'latest_sales'):
+            return obj.latest_sales or 0
         last = obj.history.order_by('-date').first()
         return last.daily_sales if last else 0
 
     def get_current_stock_quantity(self, obj):
+        if hasattr(obj, 'latest_quantity'):
+            return obj.latest_quantity or 0
         last = obj.history.order_by('-date').first()
         return last.stock_quantity if last else 0
 
+    def validate(self, attrs):
+        history = attrs.get('history')
+        if not history:
+            return attrs
+        dates = Counter(rec['date'] for rec in history)
+        duplicates = sorted(str(d) for d, n in dates.items() if n > 1)
+        if duplicates:
+            raise serializers.ValidationError({'history': f'Date duplicate: {", ".join(duplicates[:10])}'})
+        if attrs.get('history_mode') == 'append' and self.instance is not None:
+            last = self.instance.history.aggregate(last=Max('date'))['last']
+            if last is not None and min(dates) <= last:
+                raise serializers.ValidationError(
+                    {'history': f'În modul append datele trebuie să fie după {last:%Y-%m-%d}.'})
+        return attrs
+
     def create(self, validated_data):
+        validated_data.pop('history_mode', None)
         history_data = validated_data.pop('history', [])
         stock = Stock.objects.create(**validated_data)
 
@@ -72,29 +104,64 @@ class StockWithHistorySerializer(serializers.ModelSerializer):
             ) for rec in history_data
         ]
         SalesRecord.objects.bulk_create(records)
+        schedule_refresh(stock.pk)
         return stock
 
     def update(self, instance, validated_data):
         history_data = validated_data.pop('history', None)
+        mode = validated_data.pop('history_mode', 'replace')
 
         for attr, val in validated_data.items():
             setattr(instance, attr, val)
         instance.save()
 
         if history_data is not None:
-            instance.history.all().delete()
-            new = [
-                SalesRecord(
-                    stock=instance,
-                    date=rec['date'],
-                    daily_sales=rec['daily_sales'],
-                    stock_quantity=rec['stock_quantity']
-                ) for rec in history_data
-            ]
-            SalesRecord.objects.bulk_create(new)
+            # doar diferențele: zilele neschimbate rămân (și cache-urile lor valide)
+            self.history_changes = sync_history(instance, history_data, mode)
 
         return instance
 
+class StockSummarySerializer(serializers.ModelSerializer):
+    """
+    Varianta ușoară pentru listări: valorile agregate vin din StockSnapshot,
+    iar `history` apare doar dacă e cerut explicit în `fields`.
+    """
+    daily_sales_quantity   = serializers.IntegerField(source='snapshot.latest_sales', read_only=True)
+    current_stock_quantity = serializers.IntegerField(source='snapshot.latest_quantity', read_only=True)
+    first_date             = serializers.DateField(source='snapshot.first_date', format="%Y-%m-%d", read_only=True)
+    last_date              = serializers.DateField(source='snapshot.last_date', format="%Y-%m-%d", read_only=True)
+    history_days           = serializers.IntegerField(source='snapshot.days', read_only=True)
+    stockout_days          = serializers.IntegerField(source='snapshot.stockout_days', read_only=True)
+    history                = SalesRecordSerializer(many=True, read_only=True)
+
+    class Meta:
+        model  = Stock
+        fields = (
+            'id',
+            'stock_name',
+            'min_stock_level',
+            'daily_sales_quantity',
+            'current_stock_quantity',
+            'first_date',
+            'last_date',
+            'history_days',
+            'stockout_days',
+            'is_active',
+            'updated_at',
+            'history',
+        )
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = set(fields) if fields else set(self.Meta.fields) - {'history'}
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
+
+    def to_representation(self, instance):
+        get_snapshot(instance)
+        return super().to_representation(instance)
+
+
 class ReorderPlanSerializer(serializers.ModelSerializer):
     stock_name = serializers.CharField(
         source='run.stock.stock_name',
@@ -123,5 +190,6 @@ class ForecastRunSerializer(serializers.ModelSerializer):
     user = HiddenField(default=CurrentUserDefault())
     class Meta:
         model = ForecastRun
-        fields = ('id','run_at','months','review_days','user')
-        read_only_fields = ('id', 'user')
\ No newline at end of file
+        fields = ('id','run_at','months','review_days','user',
+                  'model_name','wape','data_points','fit_seconds','cached')
+        read_only_fields = ('id', 'user', 'model_name', 'wape', 'data_points', 'fit_seconds', 'cached')
\ No newline at end of file
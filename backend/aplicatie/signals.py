@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Stock, SalesRecord
+from .caching import invalidate_stock
+from .rollups import schedule_refresh
+
+
+@receiver(post_save, sender=SalesRecord)
+def sales_record_changed(sender, instance, **kwargs):
+    invalidate_stock(instance.stock_id)
+    schedule_refresh(instance.stock_id, [instance.date])
+
+
+def history_deleted(changes):
+    """Apelat de SalesRecord.delete / queryset.delete cu {stock_id: date șterse}."""
+    for stock_id, dates in changes.items():
+        invalidate_stock(stock_id)
+        schedule_refresh(stock_id, dates)
+
+
+@receiver(post_delete, sender=Stock)
+def stock_deleted(sender, instance, **kwargs):
+    # istoricul, rollup-urile și snapshot-ul dispar în cascadă, fără lucru per rând
+    invalidate_stock(instance.pk)
@@ -1,3 +1,924 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .compact import compact_frame, compact_options
+from .forecasting import calendar_features, pipeline
+from .forecasting.cache import ForecastCache, fingerprint
+from .forecasting import models as forecast_models
+from .forecasting.models import (fit_prophet, fit_sarima, config_version, SARIMA_CONFIG, SARIMA_REFIT_DAYS,
+                                 MODEL_CONFIG, MODEL_VERSIONS)
+from .forecasting.inventory import generate_order_plan, generate_order_plans
+from .forecasting.batch import batch_forecast
+from .forecasting.preprocessing import prep_data, prep_data_many
+from .forecasting.synthetic import synthetic_panel
+from .models import Stock, SalesRecord, SalesRollup, StockSnapshot, ForecastRun, ForecastJob, ReorderPlan, ModelState
+from .planning import save_plan, build_and_save_plan, PlanError
+from .rollups import refresh_rollups
+from . import caching
+from .ingest import ingest_sales_stream
+from .jobs import claim_next_job, run_forecast_job, work
+from .model_store import load_states, save_states
+
+
+class StockListingQueryCountTests(TestCase):
+    """Listările de stocuri trebuie să ruleze un număr fix de query-uri, indiferent de câte stocuri sunt."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('u', 'u@example.com', 'p')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.add_stocks(3)
+
+    def add_stocks(self, n, days=5):
+        start = date(2024, 1, 1)
+        for i in range(n):
+            stock = Stock.objects.create(user=self.user, stock_name=f's{i}', min_stock_level=5)
+            SalesRecord.objects.bulk_create([
+                SalesRecord(stock=stock, date=start + timedelta(days=d), daily_sales=d, stock_quantity=10 + d)
+                for d in range(days)
+            ])
+            refresh_rollups(stock.pk)
+
+    def test_summary_query_count_is_constant(self):
+        # ETag + COUNT pentru paginare + lista cu snapshot-ul (select_related)
+        with self.assertNumQueries(3):
+            resp = self.client.get('/api/stocks/summary/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['count'], 3)
+
+        self.add_stocks(10)
+        with self.assertNumQueries(3):
+            resp = self.client.get('/api/stocks/summary/')
+        self.assertEqual(resp.data['count'], 13)
+
+    def test_summary_latest_values_without_history(self):
+        resp = self.client.get('/api/stocks/summary/')
+        row = resp.data['results'][0]
+        self.assertNotIn('history', row)
+        self.assertEqual(row['daily_sales_quantity'], 4)
+        self.assertEqual(row['current_stock_quantity'], 14)
+        self.assertEqual(row['last_date'], '2024-01-05')
+
+    def test_summary_field_selection(self):
+        with self.assertNumQueries(4):
+            resp = self.client.get('/api/stocks/summary/?fields=id,stock_name,history&page_size=2')
+        self.assertEqual(resp.data['count'], 3)
+        self.assertEqual(len(resp.data['results']), 2)
+        row = resp.data['results'][0]
+        self.assertEqual(set(row), {'id', 'stock_name', 'history'})
+        self.assertEqual(len(row['history']), 5)
+
+        resp = self.client.get('/api/stocks/summary/?fields=nope')
+        self.assertEqual(resp.status_code, 400)
+
+    def test_manage_stocks_query_count_is_constant(self):
+        # ETag + stocurile adnotate + istoricul prefetch-uit
+        with self.assertNumQueries(3):
+            resp = self.client.get('/api/stocks/')
+        self.assertEqual(len(resp.data), 3)
+        self.assertEqual(resp.data[0]['current_stock_quantity'], 14)
+
+        self.add_stocks(10)
+        with self.assertNumQueries(3):
+            self.client.get('/api/stocks/')
+
+    def test_unchanged_listing_returns_304(self):
+        etag = self.client.get('/api/stocks/summary/')['ETag']
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/stocks/summary/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b'')
+
+        record = SalesRecord.objects.filter(stock__user=self.user).first()
+        record.daily_sales += 1
+        with self.captureOnCommitCallbacks(execute=True):
+            record.save()  # semnalul reîmprospătează snapshot-ul și Stock.updated_at
+        resp = self.client.get('/api/stocks/summary/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+
+
+    def test_server_timing_header(self):
+        resp = self.client.get('/api/stocks/summary/')
+        timing = resp['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="3 queries"', timing)
+        self.assertIn('render;dur=', timing)
+        self.assertTrue(timing.split(', ')[-1].startswith('total;dur='))
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('u', 'u@example.com', 'p')
+        self.stock = Stock.objects.create(user=user, stock_name='s', min_stock_level=5)
+        start = date(2024, 1, 1)
+        SalesRecord.objects.bulk_create([
+            SalesRecord(stock=self.stock, date=start + timedelta(days=d), daily_sales=d % 7, stock_quantity=d % 3)
+            for d in range(120)
+        ])
+        refresh_rollups(self.stock.pk)
+
+    def rollups(self):
+        return (sorted(self.stock.rollups.values_list('period', 'period_start', 'days', 'total_sales',
+                                                      'stockout_days', 'end_quantity')),
+                StockSnapshot.objects.filter(pk=self.stock.pk).values().get())
+
+    def test_incremental_refresh_matches_rebuild(self):
+        changed = [date(2024, 1, 31), date(2024, 2, 1), date(2024, 4, 29)]
+        SalesRecord.objects.filter(stock=self.stock, date__in=changed).update(daily_sales=50, stock_quantity=0)
+        SalesRecord.objects.filter(stock=self.stock, date=date(2024, 3, 3)).delete()
+        refresh_rollups(self.stock.pk, changed + [date(2024, 3, 3)])
+        incremental = self.rollups()
+
+        refresh_rollups(self.stock.pk)
+        full = self.rollups()
+        self.assertEqual(incremental[0], full[0])
+        self.assertEqual(incremental[1]['total_sales'], full[1]['total_sales'])
+        self.assertEqual(full[1]['days'], 119)
+        self.assertEqual(full[1]['latest_quantity'], 0)  # 2024-04-29 e ultima zi
+
+
+
+class StockHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('u', 'u@example.com', 'p')
+        self.stock = Stock.objects.create(user=self.user, stock_name='s', min_stock_level=5)
+        SalesRecord.objects.bulk_create([
+            SalesRecord(stock=self.stock, date=date(2024, 1, 1) + timedelta(days=d), daily_sales=d % 7,
+                        stock_quantity=d % 3, is_holiday=d == 0)
+            for d in range(120)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/stocks/{self.stock.pk}/history/'
+
+    def test_daily_range(self):
+        data = self.client.get(self.url, {'from': '2024-01-10', 'to': '2024-01-20'}).json()
+        self.assertEqual((data['resample'], data['count']), ('D', 11))
+        self.assertEqual(data['columns']['date'][0], '2024-01-10')
+        self.assertEqual(data['columns']['date'][-1], '2024-01-20')
+        self.assertEqual(data['columns']['daily_sales'][:3], [2, 3, 4])
+        self.assertEqual(self.client.get(self.url).json()['columns']['is_holiday'][:2], [True, False])
+
+    def test_resample_returns_whole_periods(self):
+        # rollup-urile lipsesc: view-ul le construiește
+        weeks = self.client.get(self.url, {'resample': 'W', 'from': '2024-01-10', 'to': '2024-01-20'}).json()
+        self.assertEqual(weeks['columns']['date'], ['2024-01-08', '2024-01-15'])
+        self.assertEqual(weeks['columns']['days'], [7, 7])
+
+        months = self.client.get(self.url, {'resample': 'M'}).json()
+        self.assertEqual(months['columns']['date'], ['2024-01-01', '2024-02-01', '2024-03-01', '2024-04-01'])
+        self.assertEqual(months['columns']['sales'][0], sum(d % 7 for d in range(31)))
+        self.assertEqual(months['columns']['stockout_days'][0], sum(d % 3 == 0 for d in range(31)))
+        self.assertEqual(sum(months['columns']['days']), 120)
+
+    def test_npz_and_arrow(self):
+        resp = self.client.get(self.url, {'output': 'npz', 'to': '2024-01-05'})
+        self.assertEqual(resp['Content-Type'], 'application/x-npz')
+        arrays = np.load(io.BytesIO(resp.content))
+        self.assertEqual(arrays['date'].dtype, np.dtype('datetime64[D]'))
+        self.assertEqual(arrays['daily_sales'].tolist(), [0, 1, 2, 3, 4])
+
+        with mock.patch('aplicatie.views.to_arrow', return_value=None):
+            self.assertEqual(self.client.get(self.url, {'output': 'arrow'}).status_code, 406)
+
+    def test_invalid_params(self):
+        for params in ({'from': '2024-13-01'}, {'to': 'ieri'}, {'resample': 'Y'}, {'output': 'csv'}):
+            resp = self.client.get(self.url, params)
+            self.assertEqual(resp.status_code, 400, params)
+            self.assertIn('error', resp.json())
+
+        other = User.objects.create_user('o', 'o@example.com', 'p')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+class CompactPayloadTests(TestCase):
+    def test_columns_dates_and_rounding(self):
+        df = pd.DataFrame({'ds': pd.to_datetime(['1970-01-02', '2024-03-01']), 'yhat': [1.23456, 2.0], 'qty': [1, 2]})
+        out = compact_frame(df, dates='epoch', decimals=1)
+        self.assertEqual(out['length'], 2)
+        self.assertEqual(out['columns'], {'ds': [1, 19783], 'yhat': [1.2, 2.0], 'qty': [1, 2]})
+        self.assertEqual(compact_frame(df)['columns']['ds'], ['1970-01-02', '2024-03-01'])
+
+        self.assertIsNone(compact_options({}))
+        with self.assertRaises(ValueError):
+            compact_options({'compact': '1', 'dates': 'unix'})
+
+
+class SyntheticHistoryTests(TestCase):
+    def test_seeded_panel_with_stockouts(self):
+        df = synthetic_panel(20, 730, seed=3)
+        self.assertTrue(df.equals(synthetic_panel(20, 730, seed=3)))
+        self.assertEqual(len(df), 20 * 730)
+
+        out = df['stock_quantity'] == 0
+        self.assertTrue(out.any())
+        self.assertTrue((df.loc[out, 'y'] == 0).all())
+        self.assertTrue((df['y'] <= df['demand']).all())
+        self.assertGreater(df['is_holiday'].sum(), 0)
+
+
+
+class PrepDataManyTests(TestCase):
+    def test_matches_prep_data_per_stock(self):
+        panel = synthetic_panel(4, 120, seed=7).drop(columns=['demand'])
+        # serii decalate: fiecare începe și se termină în altă zi, cu goluri
+        parts = []
+        for k, (sid, df) in enumerate(panel.groupby('stock_id')):
+            df = df.iloc[10 * k: len(df) - 7 * k]
+            parts.append(df.drop(df.index[5 + k::17]))
+        long = pd.concat(parts, ignore_index=True)
+        # duplicate (stoc, zi): prep_data le adună
+        long = pd.concat([long, long.iloc[[3, 50, 200]]], ignore_index=True).sample(frac=1, random_state=1)
+
+        prepared = prep_data_many(long)
+        self.assertEqual(prepared.stock_ids, sorted(long['stock_id'].unique()))
+        for sid, df in long.groupby('stock_id'):
+            expected = prep_data(df.drop(columns=['stock_id'])).reset_index(drop=True)
+            pd.testing.assert_frame_equal(prepared.frame(sid), expected, check_dtype=False)
+
+    def test_empty_frame(self):
+        prepared = prep_data_many(pd.DataFrame({'stock_id': [], 'ds': [], 'y': [], 'stock_quantity': []}))
+        self.assertEqual(len(prepared), 0)
+        self.assertEqual(list(prepared.frames()), [])
+
+
+class CalendarFeaturesTests(TestCase):
+    def test_default_range_and_extension(self):
+        cal = calendar_features.calendar_features(['2024-12-24', '2024-12-25', '2024-12-27', '2024-12-28'])
+        self.assertEqual(cal['is_holiday'].tolist(), [0, 1, 0, 0])
+        self.assertEqual(cal['pre_holiday'].tolist(), [1, 0, 0, 0])
+        self.assertEqual(cal['post_holiday'].tolist(), [0, 0, 1, 0])
+        self.assertEqual(cal['is_weekend'].tolist(), [0, 0, 0, 1])
+
+        # în afara 2000-2040 intervalul e extins, nu indexat greșit
+        outside = calendar_features.holiday_flags(['1998-12-25', '1998-12-28', '2045-01-01'])
+        self.assertEqual(outside.tolist(), [1, 0, 1])
+        frame = calendar_features.holidays_frame([1998, 2045])
+        self.assertEqual(set(frame['ds'].dt.year), {1998, 2045})
+        self.assertEqual(calendar_features.holiday_flags([]).tolist(), [])
+
+    def test_flags_match_prophet_holidays(self):
+        dates = pd.date_range('2023-01-01', '2024-12-31', freq='D')
+        flagged = dates[calendar_features.holiday_flags(dates) == 1]
+        frame = calendar_features.holidays_frame([2023, 2024])
+        self.assertEqual(list(flagged), sorted(frame['ds']))
+        self.assertTrue((frame['upper_window'] == calendar_features.HOLIDAY_WINDOW).all())
+
+    def test_calendar_shared_by_prophet_and_sarima(self):
+        calendar_features.country_holidays.cache_clear()
+        calendar_features._calendar.cache_clear()
+        with mock.patch.object(calendar_features.holidays, 'country_holidays',
+                               wraps=calendar_features.holidays.country_holidays) as build:
+            forecast_models.get_holidays_ro([2023, 2024])  # Prophet
+            forecast_models.holiday_flags(pd.date_range('2023-01-01', periods=400))  # SARIMA
+            forecast_models.get_holidays_ro([2025])
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(calendar_features.country_holidays.cache_info().misses, 1)
+
+class HistorySyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('u', 'u@example.com', 'p')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.stock = Stock.objects.create(user=self.user, stock_name='s', min_stock_level=5)
+        SalesRecord.objects.bulk_create([
+            SalesRecord(stock=self.stock, date=date(2024, 1, 1) + timedelta(days=d), daily_sales=d, stock_quantity=10)
+            for d in range(10)
+        ])
+
+    def test_patch_writes_only_the_diff(self):
+        history = [{'date': str(r.date), 'daily_sales': r.daily_sales, 'stock_quantity': r.stock_quantity}
+                   for r in self.stock.history.order_by('date')]
+        ids = dict(self.stock.history.values_list('date', 'id'))
+        history[3]['daily_sales'] = 99
+        history = history[:-1] + [{'date': '2024-01-20', 'daily_sales': 1, 'stock_quantity': 1}]
+
+        resp = self.client.patch(f'/api/stocks/{self.stock.pk}/', {'history': history}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['history_changes'],
+                         {'mode': 'replace', 'inserted': 1, 'updated': 1, 'deleted': 1, 'unchanged': 8})
+        # rândurile neschimbate nu sunt rescrise
+        self.assertEqual(self.stock.history.get(date=date(2024, 1, 1)).id, ids[date(2024, 1, 1)])
+        self.assertFalse(self.stock.history.filter(date=date(2024, 1, 10)).exists())
+
+        resp = self.client.patch(f'/api/stocks/{self.stock.pk}/', {
+            'history_mode': 'append', 'history': [{'date': '2024-01-05', 'daily_sales': 1, 'stock_quantity': 1}],
+        }, format='json')
+        self.assertEqual(resp.status_code, 400)
+
+
+class IngestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('u', 'u@example.com', 'p')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.a = Stock.objects.create(user=self.user, stock_name='a', min_stock_level=5)
+
+    def test_ndjson_rows_for_many_stocks(self):
+        lines = [f'{{"stock_id": {self.a.pk}, "date": "2024-01-{d:02d}", "daily_sales": {d}, "stock_quantity": 3}}'
+                 for d in range(1, 29)]
+        lines += ['{"stock": "b", "date": "2024-01-02", "daily_sales": 1, "stock_quantity": 0, "is_holiday": 1}',
+                  'nu e json',
+                  '{"stock": "lipsa", "date": "2024-01-02", "daily_sales": 1, "stock_quantity": 0}']
+        resp = self.client.post('/api/stocks/ingest/', '\n'.join(lines), content_type='application/x-ndjson')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['rows_written'], 28)
+        self.assertEqual([e['row'] for e in resp.data['errors']], [29, 30, 31])
+        self.assertEqual(self.a.history.count(), 28)
+
+        resp = self.client.post('/api/stocks/ingest/?create_missing=1', '\n'.join(lines[-3:]),
+                                content_type='application/x-ndjson')
+        self.assertEqual([s['created'] for s in resp.data['stocks']], [True, True])
+        b = Stock.objects.get(user=self.user, stock_name='b')
+        self.assertTrue(b.history.get().is_holiday)
+
+        # rollup-urile calculate împreună pentru mai multe stocuri = rebuild per stoc
+        batched = sorted(SalesRollup.objects.values_list('stock_id', 'period', 'period_start', 'total_sales'))
+        for stock in Stock.objects.all():
+            refresh_rollups(stock.pk)
+        self.assertEqual(batched, sorted(SalesRollup.objects.values_list('stock_id', 'period', 'period_start',
+                                                                         'total_sales')))
+
+
+    def test_repeated_days_are_counted_once_per_stock(self):
+        lines = [f'{{"stock_id": {self.a.pk}, "date": "2024-01-0{d}", "daily_sales": {n}, "stock_quantity": 3}}'
+                 .encode() for n, d in enumerate([1, 2, 1, 3, 1, 2])]
+        report = ingest_sales_stream(lines, 'application/x-ndjson', self.user, batch_size=2)
+        self.assertEqual(report['stocks'][0]['rows'], 3)
+        self.assertEqual(self.a.history.count(), 3)
+        self.assertEqual(self.a.history.get(date=date(2024, 1, 1)).daily_sales, 4)  # ultima apariție
+
+class ForecastDiagnosticsTests(TestCase):
+    def test_failed_candidate_is_reported(self):
+        def broken(df, horizon_days, state=None):
+            raise RuntimeError('nu converge')
+
+        def naive(df, horizon_days, state=None):
+            ds = pd.date_range(df['ds'].iloc[-1] + pd.Timedelta(days=1), periods=horizon_days)
+            return pd.DataFrame({'ds': ds, 'yhat': float(df['y'].mean())}), None
+
+        df = synthetic_panel(1, 60, seed=1).drop(columns=['stock_id', 'demand'])
+        diagnostics = {}
+        with mock.patch.object(pipeline, 'CANDIDATES', (('Broken', broken), ('Naive', naive))), \
+                self.assertLogs(pipeline.logger, 'WARNING'):
+            fc, wape, name = pipeline.auto_forecast_pipeline(df, 14, parallel=False, diagnostics=diagnostics)
+
+        self.assertEqual(name, 'Naive')
+        self.assertEqual(diagnostics['selected'], 'Naive')
+        self.assertEqual(diagnostics['points'], 60)
+        self.assertEqual(diagnostics['candidates']['Broken']['status'], 'error')
+        self.assertIn('nu converge', diagnostics['candidates']['Broken']['error'])
+        self.assertEqual(diagnostics['candidates']['Naive']['wape'], wape)
+
+    def test_report_groups_fit_times(self):
+        user = User.objects.create_user('u', 'u@example.com', 'p')
+        stock = Stock.objects.create(user=user, stock_name='s', min_stock_level=0)
+        plan = pd.DataFrame(columns=['review_date', 'stock_before', 'demand_next', 'order_qty'])
+        for seconds, points in ((2.0, 400), (4.0, 500), (9.0, 1500)):
+            save_plan(stock, 3, 14, plan, {
+                'selected': 'Prophet', 'wape': 0.2, 'points': points, 'seconds': seconds, 'cached': False,
+                'candidates': {'Prophet': {'status': 'ok', 'seconds': seconds},
+                               'SARIMA': {'status': 'timeout', 'seconds': seconds}},
+            })
+        save_plan(stock, 3, 14, plan)  # run fără diagnostic (dinainte de migrare)
+        self.assertEqual(ForecastRun.objects.filter(model_name='Prophet').count(), 3)
+
+        client = APIClient()
+        client.force_authenticate(user)
+        data = client.get('/api/forecast/diagnostics/').json()
+        self.assertEqual(data['runs'], 3)
+        by_model = {(r['model'], r['history']): r for r in data['by_model']}
+        self.assertEqual(by_model[('Prophet', '1-2y')]['runs'], 2)
+        self.assertEqual(by_model[('Prophet', '1-2y')]['max_seconds'], 4.0)
+        sarima = [r for r in data['candidates'] if r['model'] == 'SARIMA']
+        self.assertEqual(sum(r['statuses']['timeout'] for r in sarima), 3)
+        self.assertEqual(data['slowest'][0]['seconds'], 9.0)
+
+
+class MetricsTests(TestCase):
+    @override_settings(METRICS_TOKEN='secret')
+    def test_prometheus_text(self):
+        user = User.objects.create_user('u', 'u@example.com', 'p')
+        stock = Stock.objects.create(user=user, stock_name='s', min_stock_level=0)
+        ForecastJob.objects.create(user=user, stock=stock)
+        client = APIClient()
+        client.force_authenticate(user)
+        client.get('/api/stocks/summary/')
+
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        resp = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertTrue(resp['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = resp.content.decode()
+        self.assertIn('# TYPE http_requests_total counter', text)
+        self.assertIn('http_requests_total{method="GET",route="/api/stocks/summary/",status="200"}', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="/api/stocks/summary/",le="+Inf"}',
+                      text)
+        self.assertIn('forecast_jobs_queue{status="queued"} 1', text)
+
+
+def _loop_order_plan(fc, current_stock, min_stock_level, review_period_days):
+    # implementarea inițială (iterrows), referință pentru varianta vectorizată
+    fc = fc.assign(period_id=(fc["ds"] - fc["ds"].min()).dt.days // review_period_days)
+    rows, stock = [], float(current_stock)
+    for _, row in fc.groupby("period_id").agg(period_start=("ds", "min"), total_demand=("yhat", "sum")).iterrows():
+        order = max(0, row["total_demand"] + min_stock_level - stock)
+        end_stock = stock + order - row["total_demand"]
+        rows.append([row["period_start"].date(), round(stock, 1), round(row["total_demand"], 1),
+                     round(order, 1), round(end_stock, 1)])
+        stock = end_stock
+    return pd.DataFrame(rows, columns=["review_date", "stock_before", "demand_next", "order_qty", "end_stock_est"])
+
+
+class OrderPlanTests(TestCase):
+    def test_matches_loop_implementation(self):
+        rng = np.random.default_rng(7)
+        for days, review, current, minimum in ((365, 14, 50, 20), (30, 7, 0, 5), (10, 14, 500, 0)):
+            fc = pd.DataFrame({'ds': pd.date_range('2024-01-01', periods=days),
+                               'yhat': rng.gamma(2.0, 3.0, days)})
+            expected = _loop_order_plan(fc, current, minimum, review)
+            pd.testing.assert_frame_equal(generate_order_plan(fc, current, minimum, review), expected,
+                                          check_dtype=False)
+
+    def test_empty_forecast(self):
+        empty = pd.DataFrame({'ds': pd.to_datetime([]), 'yhat': []})
+        self.assertTrue(generate_order_plan(empty, 10, 5).empty)
+        self.assertTrue(generate_order_plans(empty.assign(stock_id=[]), {}, {}).empty)
+
+
+class AlertsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('u', 'u@example.com', 'p')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.a = Stock.objects.create(user=self.user, stock_name='a', min_stock_level=0)
+        self.b = Stock.objects.create(user=self.user, stock_name='b', min_stock_level=0)
+
+    def _run(self, stock, start, orders):
+        plan = pd.DataFrame({'review_date': [start + timedelta(days=14 * i) for i in range(len(orders))],
+                             'stock_before': 0.0, 'demand_next': 1.0, 'order_qty': orders})
+        return save_plan(stock, 3, 14, plan)
+
+    def test_cursor_pages_and_filters(self):
+        today = date.today()
+        old = self._run(self.a, today - timedelta(days=60), [1, 0, 2])
+        other = self._run(self.b, today, [0, 3])
+        latest = self._run(self.a, today - timedelta(days=14), [5, 0, 1])
+
+        seen, url = [], '/api/alerts/?page_size=3'
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data['results']), 3)
+            seen += data['results']
+            url = data['next']
+        ids = [r['id'] for r in seen]
+        self.assertEqual(sorted(ids), sorted(ReorderPlan.objects.values_list('id', flat=True)))
+        self.assertEqual([r['run_id'] for r in seen], [latest.pk] * 3 + [other.pk] * 2 + [old.pk] * 3)
+
+        def fetch(query):
+            return [(r['run_id'], r['review_date'], r['order_qty']) for r in
+                    self.client.get('/api/alerts/?' + query).json()['results']]
+
+        self.assertTrue(all(d >= today.isoformat() for _, d, _ in fetch('upcoming=1')))
+        self.assertEqual(len(fetch('upcoming=1')), 4)
+        self.assertEqual(len(fetch('nonzero=1')), 5)
+        self.assertTrue(all(q > 0 for _, _, q in fetch('nonzero=1')))
+        self.assertEqual({r for r, _, _ in fetch(f'stock={self.b.pk}')}, {other.pk})
+        self.assertEqual({r for r, _, _ in fetch('latest=1')}, {latest.pk, other.pk})
+        self.assertEqual(fetch(f'latest=1&nonzero=1&stock={self.a.pk}'),
+                         [(latest.pk, (today - timedelta(days=14)).isoformat(), 5.0),
+                          (latest.pk, (today + timedelta(days=14)).isoformat(), 1.0)])
+        self.assertEqual(self.client.get('/api/alerts/?stock=abc').status_code, 400)
+
+    def test_etag_tracks_stock_name(self):
+        self._run(self.a, date(2024, 1, 1), [1, 0])
+        etag = self.client.get('/api/alerts/')['ETag']
+        self.assertEqual(self.client.get('/api/alerts/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.patch(f'/api/stocks/{self.a.pk}/', {'stock_name': 'redenumit'}, format='json')
+        resp = self.client.get('/api/alerts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual({r['stock_name'] for r in resp.json()['results']}, {'redenumit'})
+
+
+class PlanHorizonTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('u', 'u@example.com', 'p')
+        self.stock = Stock.objects.create(user=self.user, stock_name='s', min_stock_level=5)
+        SalesRecord.objects.bulk_create([
+            SalesRecord(stock=self.stock, date=date(2023, 1, 1) + timedelta(days=d), daily_sales=d % 7,
+                        stock_quantity=10)
+            for d in range(400)
+        ])
+        refresh_rollups(self.stock.pk)
+
+    def test_months_below_one_rejected(self):
+        with self.assertRaisesMessage(PlanError, 'Istoric insuficient'):
+            build_and_save_plan(self.stock, months=0)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for body in ({'months': 0}, {'months': -2}, {'months': 'trei'}, {'review_days': 'x'},
+                     {'review_days': 0}, {'months': 3, 'review_days': 1.5}):
+            resp = client.post(f'/api/forecast/{self.stock.pk}/', body, format='json')
+            self.assertEqual(resp.status_code, 400, body)
+        self.assertFalse(self.stock.forecast_jobs.exists())
+
+
+class ForecastJobTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('u', 'u@example.com', 'p')
+        self.stock = Stock.objects.create(user=user, stock_name='s', min_stock_level=0)
+        self.run = save_plan(self.stock, 3, 14, pd.DataFrame(columns=['review_date', 'stock_before',
+                                                                      'demand_next', 'order_qty']))
+        self.jobs = [ForecastJob.objects.create(stock=self.stock, months=3) for _ in range(2)]
+
+    def test_claims_oldest_and_finishes(self):
+        def fake_plan(stock, months, review_days, progress):
+            progress(50, 'fitting')
+            self.assertEqual(ForecastJob.objects.get(pk=self.jobs[0].pk).stage, 'fitting')
+            return self.run, {'plan': [], 'summary': None}
+
+        job = claim_next_job('w1')
+        self.assertEqual((job.pk, job.status, job.worker), (self.jobs[0].pk, ForecastJob.RUNNING, 'w1'))
+        with mock.patch('aplicatie.jobs.build_and_save_plan', side_effect=fake_plan):
+            job = run_forecast_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.stage, job.run_id), (ForecastJob.DONE, 100, '', self.run.pk))
+        self.assertEqual(job.result, {'plan': [], 'summary': None})
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(claim_next_job('w2').pk, self.jobs[1].pk)
+        self.assertIsNone(claim_next_job('w2'))
+
+    def test_failures_are_recorded(self):
+        errors = [PlanError('Nu există istoric.'), RuntimeError('boom')]
+        with mock.patch('aplicatie.jobs.build_and_save_plan', side_effect=errors), \
+                self.assertLogs('aplicatie.jobs', 'ERROR'):
+            self.assertEqual(work(once=True), 2)
+        first, second = (ForecastJob.objects.get(pk=j.pk) for j in self.jobs)
+        self.assertEqual((first.status, first.error), (ForecastJob.FAILED, 'Nu există istoric.'))
+        self.assertEqual((second.status, second.error), (ForecastJob.FAILED, 'RuntimeError: boom'))
+        self.assertIsNone(first.run_id)
+        self.assertIsNotNone(first.started_at)
+
+    def test_stale_jobs_requeued_while_working(self):
+        ForecastJob.objects.filter(pk=self.jobs[0].pk).update(
+            status=ForecastJob.RUNNING, started_at=timezone.now() - timedelta(hours=2), worker='mort')
+        ForecastJob.objects.filter(pk=self.jobs[1].pk).update(status=ForecastJob.DONE)
+        with mock.patch('aplicatie.jobs.build_and_save_plan', return_value=(self.run, {'plan': []})):
+            self.assertEqual(work(once=True), 0)
+            with self.assertLogs('aplicatie.jobs', 'WARNING'):
+                self.assertEqual(work('w1', once=True, stale_after=timedelta(hours=1), requeue_every=0), 1)
+        job = ForecastJob.objects.get(pk=self.jobs[0].pk)
+        self.assertEqual((job.status, job.worker), (ForecastJob.DONE, 'w1'))
+
+
+class CandidateScoringTests(TestCase):
+    def test_short_and_empty_forecasts(self):
+        def short(df, horizon_days, state=None):
+            return pd.DataFrame({'ds': pd.date_range('2024-01-01', periods=5), 'yhat': 1.0}), None
+
+        def empty(df, horizon_days, state=None):
+            return pd.DataFrame({'ds': pd.to_datetime([]), 'yhat': []}), None
+
+        df = synthetic_panel(1, 60, seed=1).drop(columns=['stock_id', 'demand'])
+        for parallel in (False, True):
+            diagnostics = {}
+            with mock.patch.object(pipeline, 'CANDIDATES', (('Empty', empty), ('Short', short))), \
+                    self.assertLogs(pipeline.logger, 'WARNING'):
+                fc, wape, name = pipeline.auto_forecast_pipeline(df, 7, parallel=parallel, diagnostics=diagnostics)
+            self.assertEqual(name, 'Short')
+            self.assertEqual(wape, pipeline.wape(df['y'].tail(14).head(5), [1.0] * 5))
+            self.assertEqual(diagnostics['candidates']['Empty']['status'], 'error')
+
+
+class ForecastCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.df = synthetic_panel(1, 60, seed=2).drop(columns=['stock_id', 'demand'])
+
+    def test_hit_miss_and_disk_tier(self):
+        cache = ForecastCache(max_entries=1, directory=self.directory)
+        key = fingerprint(self.df, 30, {'Prophet': 1})
+        self.assertNotEqual(key, fingerprint(self.df, 31, {'Prophet': 1}))
+        self.assertNotEqual(key, fingerprint(self.df, 30, {'Prophet': 2}))
+        changed = self.df.copy()
+        changed.loc[5, 'y'] += 1
+        self.assertNotEqual(key, fingerprint(changed, 30, {'Prophet': 1}))
+
+        self.assertIsNone(cache.get(1, key))
+        cache.set(1, key, 'rezultat')
+        self.assertEqual(cache.get(1, key), 'rezultat')
+        cache.set(2, key, 'altul')  # max_entries=1: intrarea 1 iese din memorie, rămâne pe disc
+        self.assertEqual(cache.get(1, key), 'rezultat')
+        stats = cache.stats()
+        self.assertEqual((stats['misses'], stats['memory_hits'], stats['disk_hits'], stats['evictions']),
+                         (1, 1, 1, 2))
+
+        other = ForecastCache(directory=self.directory)  # alt proces / repornire
+        self.assertEqual(other.get(2, key), 'altul')
+        other.invalidate(2)
+        self.assertIsNone(cache.get(2, key))
+        self.assertEqual(cache.get(1, key), 'rezultat')
+
+    def test_invalidated_by_history_changes(self):
+        user = User.objects.create_user('u', 'u@example.com', 'p')
+        stock = Stock.objects.create(user=user, stock_name='s', min_stock_level=0)
+        cache = ForecastCache(directory=self.directory)
+        with mock.patch.object(caching, '_forecast_cache', cache):
+            cache.set(stock.pk, 'k', 'vechi')
+            cache.set(stock.pk + 1, 'k', 'alt stoc')
+            SalesRecord.objects.create(stock=stock, date=date(2024, 1, 1), daily_sales=1, stock_quantity=1)
+            self.assertIsNone(cache.get(stock.pk, 'k'))
+            self.assertIsNone(ForecastCache(directory=self.directory).get(stock.pk, 'k'))
+            self.assertEqual(cache.get(stock.pk + 1, 'k'), 'alt stoc')
+
+
+class SarimaExtensionTests(TestCase):
+    def setUp(self):
+        self.df = synthetic_panel(1, 400, seed=4).drop(columns=['stock_id', 'demand'])
+
+    def test_extension_matches_full_refit(self):
+        _, state = fit_sarima(self.df.iloc[:-7], 28)
+
+        # starea trece prin ModelState, ca între două cereri
+        user = User.objects.create_user('u', 'u@example.com', 'p')
+        stock = Stock.objects.create(user=user, stock_name='s', min_stock_level=0)
+        save_states(stock.pk, {'SARIMA': state})
+        state = load_states([stock.pk])[stock.pk]['SARIMA']
+
+        extended, new_state = fit_sarima(self.df, 28, state)
+        self.assertTrue(new_state['warm'])
+        self.assertEqual((new_state['updates'], new_state['nobs'], new_state['fitted_nobs']), (1, 400, 393))
+        refit, _ = fit_sarima(self.df, 28)
+        self.assertTrue((extended['ds'] == refit['ds']).all())
+        self.assertLess(pipeline.wape(refit['yhat'], extended['yhat']), 0.05)
+
+    def test_refit_after_threshold_or_drift(self):
+        _, state = fit_sarima(self.df.iloc[:-SARIMA_REFIT_DAYS], 28)
+        _, new_state = fit_sarima(self.df, 28, state)
+        self.assertFalse(new_state['warm'])
+        self.assertEqual(new_state['fitted_nobs'], 400)
+
+        _, state = fit_sarima(self.df.iloc[:-7], 28)
+        drifted = self.df.copy()
+        drifted.loc[drifted.index[-7:], 'y'] *= 20
+        _, new_state = fit_sarima(drifted, 28, state)
+        self.assertFalse(new_state['warm'])
+        self.assertEqual(new_state['updates'], 0)
+
+    def test_states_before_calendar_exog_are_dropped(self):
+        # stările / cache-ul de dinainte de exog-ul din calendar aveau versiunea doar din SARIMA_CONFIG
+        user = User.objects.create_user('u', 'u@example.com', 'p')
+        stock = Stock.objects.create(user=user, stock_name='s', min_stock_level=0)
+        save_states(stock.pk, {'SARIMA': {'config': config_version(SARIMA_CONFIG)}})
+        self.assertEqual(load_states([stock.pk]), {stock.pk: {}})
+        self.assertNotEqual(fingerprint(self.df, 28, MODEL_CONFIG),
+                            fingerprint(self.df, 28, {**MODEL_CONFIG, 'sarima': SARIMA_CONFIG}))
+
+
+@override_settings(IMPORT_CHUNK_SIZE=3)
+class SalesImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('u', 'u@example.com', 'p')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _post(self, rows, **data):
+        body = 'ds,daily_sales,current_stock_quantity,min_stock_level\n' + '\n'.join(rows) + '\n'
+        upload = SimpleUploadedFile('istoric.csv', body.encode(), content_type='text/csv')
+        return self.client.post('/api/import-stocks/', {'file': upload, **data}, format='multipart')
+
+    def test_chunked_import_and_upsert(self):
+        rows = [f'2024-01-{d:02d},{d},10,4' for d in range(1, 8)]
+        rows[3] = '2024-01-04,-1,10,4'
+        resp = self._post(rows, stock_name='csv')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual((resp.data['rows_read'], resp.data['rows_imported'], resp.data['rows_rejected']), (7, 6, 1))
+        self.assertEqual(resp.data['errors'], [{'row': 5, 'column': 'daily_sales', 'value': '-1',
+                                                'error': 'număr invalid sau negativ'}])
+        stock = Stock.objects.get(pk=resp.data['stock_id'])
+        self.assertEqual(stock.min_stock_level, 4)
+        self.assertFalse(stock.history.filter(date=date(2024, 1, 4)).exists())
+
+        # același stoc: zilele existente sunt actualizate, cele noi adăugate
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self._post(['2024-01-02,20,5,6', '2024-01-04,4,10,6', '2024-01-08,8,10,6'], stock_id=stock.pk)
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['rows_imported'], 3)
+        self.assertEqual(stock.history.count(), 8)
+        self.assertEqual(stock.history.get(date=date(2024, 1, 2)).daily_sales, 20)
+        stock.refresh_from_db()
+        self.assertEqual((stock.min_stock_level, stock.snapshot.days), (6, 8))
+
+
+class HistoryDeleteTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('u', 'u@example.com', 'p')
+        self.stock = Stock.objects.create(user=user, stock_name='s', min_stock_level=0)
+        SalesRecord.objects.bulk_create([
+            SalesRecord(stock=self.stock, date=date(2023, 1, 1) + timedelta(days=d), daily_sales=1, stock_quantity=1)
+            for d in range(500)
+        ])
+        refresh_rollups(self.stock.pk)
+
+    def test_stock_delete_skips_per_row_work(self):
+        with mock.patch('aplicatie.signals.invalidate_stock') as invalidate, \
+                CaptureQueriesContext(connection) as queries, \
+                self.captureOnCommitCallbacks() as callbacks:
+            stock_id = self.stock.pk
+            self.stock.delete()
+        invalidate.assert_called_once_with(stock_id)
+        self.assertEqual(callbacks, [])
+        # fast delete: istoricul nu e încărcat rând cu rând
+        self.assertFalse([q for q in queries.captured_queries
+                          if q['sql'].startswith('SELECT') and 'aplicatie_salesrecord' in q['sql']])
+        self.assertFalse(SalesRecord.objects.exists())
+
+    def test_queryset_and_row_delete_refresh_once_per_stock(self):
+        with mock.patch('aplicatie.signals.invalidate_stock') as invalidate, \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.stock.history.filter(date__gte=date(2024, 1, 1)).delete()
+        invalidate.assert_called_once_with(self.stock.pk)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(StockSnapshot.objects.get(pk=self.stock.pk).days, 365)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stock.history.get(date=date(2023, 12, 31)).delete()
+        snapshot = StockSnapshot.objects.get(pk=self.stock.pk)
+        self.assertEqual((snapshot.days, snapshot.last_date), (364, date(2023, 12, 30)))
+
+
+def _naive_fit(df, horizon_days, state=None):
+    ds = pd.date_range(df['ds'].iloc[-1] + pd.Timedelta(days=1), periods=horizon_days)
+    return pd.DataFrame({'ds': ds, 'yhat': float(df['y'].tail(28).mean())}), None
+
+
+@mock.patch.object(pipeline, 'CANDIDATES', (('Naive', _naive_fit),))
+class BatchForecastTests(TestCase):
+    def _job(self, stock_id, history):
+        return {'stock_id': stock_id, 'history': history, 'horizon_days': 30, 'current_stock': 10,
+                'min_stock_level': 5, 'review_days': 14}
+
+    def test_pool_keeps_order_and_reports_failures(self):
+        panel = synthetic_panel(2, 120, seed=5).drop(columns=['demand'])
+        jobs = [self._job(sid, df.drop(columns=['stock_id'])) for sid, df in panel.groupby('stock_id')]
+        jobs.insert(1, self._job(98, panel.head(5).drop(columns=['stock_id'])))
+        jobs.append(self._job(99, pd.DataFrame({'y': [1, 2]})))  # fără coloana ds: prep_data ridică
+
+        results = batch_forecast(jobs, max_workers=2)
+        self.assertEqual([r['stock_id'] for r in results], [j['stock_id'] for j in jobs])
+        self.assertEqual([r['status'] for r in results], ['ok', 'failed', 'ok', 'failed'])
+        self.assertEqual(results[1]['error'], 'Insufficient Data')
+        self.assertIn('ds', results[3]['error'])
+        self.assertEqual(results[0]['model'], 'Naive')
+        self.assertEqual(list(results[0]['plan'].columns)[:2], ['review_date', 'stock_before'])
+        for r in results:
+            self.assertIsInstance(r['seconds'], float)
+            self.assertGreaterEqual(r['seconds'], 0)
+
+    @override_settings(FORECAST_BATCH_WORKERS=1)
+    def test_view_validates_input(self):
+        user = User.objects.create_user('u', 'u@example.com', 'p')
+        stock = Stock.objects.create(user=user, stock_name='s', min_stock_level=0)
+        SalesRecord.objects.bulk_create([
+            SalesRecord(stock=stock, date=date(2023, 1, 1) + timedelta(days=d), daily_sales=d % 5, stock_quantity=9)
+            for d in range(400)
+        ])
+        client = APIClient()
+        client.force_authenticate(user)
+        for body in ({'stock_ids': ['abc']}, {'stock_ids': [stock.pk], 'review_days': 'x'},
+                     {'stock_ids': [stock.pk], 'months': 0}, {'stock_ids': [stock.pk], 'months': 'trei'}):
+            self.assertEqual(client.post('/api/forecast/batch/', body, format='json').status_code, 400, body)
+
+        with mock.patch('aplicatie.views.get_forecast_cache', return_value=None):
+            resp = client.post('/api/forecast/batch/', {'stock_ids': [str(stock.pk)], 'save': 'false'}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['results'][0]['status'], 'ok')
+        self.assertFalse(ForecastRun.objects.exists())
+
+
+def _naive_fit_with_state(df, horizon_days, state=None):
+    return _naive_fit(df, horizon_days)[0], {'warm': False}
+
+
+class ProphetWarmStartTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('u', 'u@example.com', 'p')
+        self.stock = Stock.objects.create(user=user, stock_name='s', min_stock_level=0)
+
+    def test_second_fit_starts_from_saved_params(self):
+        df = synthetic_panel(1, 760, seed=6).drop(columns=['stock_id', 'demand'])
+        original = forecast_models.Prophet.fit
+        with mock.patch.object(forecast_models.Prophet, 'fit', autospec=True, side_effect=original) as fit, \
+                self.assertLogs('cmdstanpy', 'INFO'):
+            _, cold = fit_prophet(df.iloc[:-7], 28)
+            save_states(self.stock.pk, {'Prophet': cold})
+            state = load_states([self.stock.pk])[self.stock.pk]['Prophet']
+            _, warm = fit_prophet(df, 28, state)
+
+        self.assertNotIn('init', fit.call_args_list[0].kwargs)
+        self.assertEqual(set(fit.call_args_list[1].kwargs['init']), {'k', 'm', 'sigma_obs', 'delta', 'beta'})
+        self.assertFalse(cold['warm'])
+        self.assertTrue(warm['warm'])
+        self.assertEqual(warm['cold_seconds'], cold['fit_seconds'])
+
+        save_states(self.stock.pk, {'Prophet': {**warm, 'fit_seconds': 0.25, 'cold_seconds': 1.0}})
+        row = ModelState.objects.get(stock=self.stock, model_name='Prophet')
+        self.assertEqual((row.fits, row.warm_fits, row.saved_seconds), (2, 1, 0.75))
+
+    @mock.patch.object(pipeline, 'CANDIDATES', (('Naive', _naive_fit_with_state),))
+    def test_public_forecast_does_not_write_states(self):
+        SalesRecord.objects.bulk_create([
+            SalesRecord(stock=self.stock, date=date(2023, 1, 1) + timedelta(days=d), daily_sales=d % 5, stock_quantity=9)
+            for d in range(400)
+        ])
+        url = f'/api/forecast/?product_id={self.stock.pk}&months=1'
+        with mock.patch('aplicatie.views.get_forecast_cache', return_value=None):
+            self.assertEqual(APIClient().get(url).status_code, 200)
+            self.assertFalse(ModelState.objects.exists())
+
+            client = APIClient()
+            client.force_authenticate(self.stock.user)
+            self.assertEqual(client.get(url).status_code, 200)
+        self.assertTrue(ModelState.objects.filter(stock=self.stock, model_name='Naive').exists())
+
+
+def _slow_fit(df, horizon_days, state=None):
+    time.sleep(30)
+    return _naive_fit(df, horizon_days)[0], {'warm': False}
+
+
+class EarlyStopTests(TestCase):
+    candidates = (('Naive', _naive_fit_with_state), ('Slow', _slow_fit))
+
+    def setUp(self):
+        self.df = synthetic_panel(1, 120, seed=3).drop(columns=['stock_id', 'demand'])
+
+    def _run(self, states, parallel=True, margin=0.5):
+        diagnostics = {}
+        with mock.patch.object(pipeline, 'CANDIDATES', self.candidates):
+            started = time.monotonic()
+            result = pipeline.auto_forecast_pipeline(self.df, 14, parallel=parallel, states=states,
+                                                     diagnostics=diagnostics, early_stop_margin=margin)
+        return result, diagnostics['candidates'], time.monotonic() - started
+
+    def test_clearly_worse_model_is_stopped(self):
+        self.assertTrue(pipeline._can_fork())
+        for parallel in (True, False):
+            states = {'Slow': {'wape': 10.0}}
+            (fc, score, name), candidates, seconds = self._run(states, parallel)
+            self.assertEqual(name, 'Naive')
+            self.assertEqual(candidates['Slow']['status'], 'stopped')
+            self.assertLess(seconds, 10)
+            self.assertEqual(states['Slow'], {'wape': 10.0, 'early_stops': 1})
+            self.assertEqual(states['Naive']['wape'], score)
+
+    def test_close_or_repeatedly_stopped_model_is_not_stopped(self):
+        for states, margin in (({'Slow': {'wape': 0.25}}, 0.5),
+                               ({'Slow': {'wape': 10.0, 'early_stops': pipeline.EARLY_STOP_MAX_SKIPS}}, 0.5),
+                               ({'Slow': {'wape': 10.0}}, None)):
+            stop = pipeline._EarlyStop(states, margin)
+            stop.finished(0.2)
+            self.assertFalse(stop.should_stop('Slow'))
+        stop = pipeline._EarlyStop({'Slow': {'wape': 0.25}}, 0.5)
+        self.assertFalse(stop.should_stop('Slow'))  # nimic terminat încă
+
+    def test_threads_force_sequential_fits(self):
+        release = threading.Event()
+        worker = threading.Thread(target=release.wait, daemon=True)
+        worker.start()
+        try:
+            self.assertFalse(pipeline._can_fork())
+            with mock.patch.object(pipeline, '_fit_parallel') as parallel:
+                (fc, score, name), candidates, _ = self._run({'Slow': {'wape': 10.0}})
+            parallel.assert_not_called()
+            self.assertEqual(candidates['Slow']['status'], 'stopped')
+        finally:
+            release.set()
+            worker.join()
+
+    def test_stopped_state_keeps_fit_accounting(self):
+        user = User.objects.create_user('u', 'u@example.com', 'p')
+        stock = Stock.objects.create(user=user, stock_name='s', min_stock_level=0)
+        state = {'config': MODEL_VERSIONS['SARIMA'], 'warm': False, 'wape': 10.0}
+        save_states(stock.pk, {'SARIMA': state})
+        save_states(stock.pk, {'SARIMA': {**state, 'early_stops': 1}})
+        row = ModelState.objects.get(stock=stock, model_name='SARIMA')
+        self.assertEqual(row.fits, 1)
+        self.assertEqual(load_states([stock.pk])[stock.pk]['SARIMA']['early_stops'], 1)
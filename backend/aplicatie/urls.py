@@ -6,15 +6,24 @@ from django.conf.urls.static import static
 from . import views
 urlpatterns = [
     path('', home, name="home"),
+    path('metrics', views.metrics_view, name='metrics'),
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path('api/register/', create_user, name='create_user'),
     path('api/stocks/', views.manage_stocks, name='manage_stocks'),
     path('api/stocks/<int:pk>/', StockDetail.as_view()),
+    path('api/stocks/summary/', views.stocks_summary, name='stocks_summary'),
+    path('api/stocks/ingest/', views.ingest_sales, name='ingest_sales'),
+    path('api/stocks/<int:pk>/history/', views.stock_history, name='stock_history'),
     path('api/stocks/create-history/', views.create_stock_with_history, name='create-stock-history'),
     path('api/forecast/', views.forecast_view, name='forecast'),
     path('api/import-stocks/', views.import_stocks, name='import_stocks'),
     path('api/forecast/<int:stock_id>/', views.generate_and_save_plan, name='forecast_and_save'),
+    path('api/forecast/batch/', views.batch_forecast_view, name='forecast_batch'),
+    path('api/forecast/cache/', views.forecast_cache_view, name='forecast_cache'),
+    path('api/forecast/models/', views.model_store_view, name='forecast_model_store'),
+    path('api/forecast/diagnostics/', views.forecast_diagnostics, name='forecast_diagnostics'),
+    path('api/forecast/jobs/<int:job_id>/', views.forecast_job_status, name='forecast_job_status'),
     path('api/alerts/', views.alerts, name='api-alerts'),
     path('api/alerts/<int:pk>/', alerts_del, name='alerts-detail'),
     path('api/alerts/run/<int:run_id>/', alerts_del, name='alerts-delete-run'),
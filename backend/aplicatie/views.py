@@ -1,3 +1,6 @@
+import hmac
+import time
+
 import numpy as np
 import pandas as pd
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
@@ -8,16 +11,36 @@ from rest_framework.decorators import api_view, permission_classes, parser_class
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponse
+from django.views.decorators.http import condition
 from django.utils.dateparse import parse_date
-from django.db.models import Max
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.conf import settings
 from rest_framework.generics import RetrieveUpdateDestroyAPIView
 from django.utils import timezone
 from django.contrib.auth.models import User
-from .serializers import UserSerializer, StockWithHistorySerializer, ReorderPlanSerializer
-from .models import Stock, SalesRecord, ReorderPlan, ForecastRun, UserProfile
+from .serializers import UserSerializer, StockWithHistorySerializer, StockSummarySerializer, ReorderPlanSerializer
+from .pagination import StockSummaryPagination, AlertsCursorPagination
+from .models import Stock, SalesRecord, ReorderPlan, ForecastRun, ForecastJob, UserProfile
 
 from .forecasting.pipeline import auto_forecast_pipeline
-from .forecasting.inventory import generate_order_plan, max_horizon
+from .forecasting.inventory import generate_order_plan
+from .forecasting.batch import batch_forecast
+from .forecasting.preprocessing import prep_data_many
+from .forecasting.spans import span
+from .metrics import observe_forecast, registry, render as render_metrics
+from .caching import get_forecast_cache
+from .planning import (pipeline_options, allowed_months, snapshot_months, save_plan, plan_summary,
+                       diagnostics_report)
+from .rollups import get_snapshot
+from .jobs import run_forecast_job, job_status
+from .model_store import load_states, save_states, store_report
+from .importers import import_sales_file, ImportFormatError
+from .ingest import ingest_sales_stream, IngestFormatError
+from .compact import compact_options, compact_frame, compact_records
+from .etags import stock_list_etag, stock_etag, stock_last_modified, alerts_etag, forecast_etag
+from .history import (history_columns, columnar_json, to_npz, to_arrow,
+                      RESAMPLE_PERIODS, NPZ_CONTENT_TYPE, ARROW_CONTENT_TYPE)
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     permission_classes = [AllowAny]
@@ -59,6 +82,19 @@ def home(request):
     return HttpResponse("<h1>Bine ai venit la EasyStock!</h1><p>Autentifică-te pentru a continua.</p>")
 
 
+def metrics_view(request):
+    """Metrici în format Prometheus; coada de job-uri e citită din DB la fiecare scrape."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Neautorizat.', status=401, content_type='text/plain; charset=utf-8')
+
+    counts = dict(ForecastJob.objects.filter(status__in=[ForecastJob.QUEUED, ForecastJob.RUNNING])
+                  .order_by().values_list('status').annotate(n=Count('id')))
+    queue = [((('status', s),), counts.get(s, 0)) for s in (ForecastJob.QUEUED, ForecastJob.RUNNING)]
+    extra = [('forecast_jobs_queue', 'gauge', 'Job-uri de prognoză în așteptare / în lucru.', queue)]
+    return HttpResponse(render_metrics(registry, extra), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @api_view(['POST'])
 @parser_classes([JSONParser])
 @permission_classes([AllowAny])
@@ -73,9 +109,13 @@ def create_user(request):
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@condition(etag_func=stock_list_etag)
 def manage_stocks(request):
     if request.method == 'GET':
-        stocks = Stock.objects.filter(user=request.user).order_by('id')
+        stocks = (Stock.objects.filter(user=request.user)
+                  .with_latest()
+                  .prefetch_related('history')
+                  .order_by('id'))
         serializer = StockWithHistorySerializer(stocks, many=True)
         return Response(serializer.data)
 
@@ -94,6 +134,96 @@ class StockDetail(RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return Stock.objects.filter(user=self.request.user).order_by('id')
 
+    def get(self, request, *args, **kwargs):
+        return condition(etag_func=stock_etag, last_modified_func=stock_last_modified)(super().get)(
+            request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self.history_changes = serializer.history_changes
+
+    def update(self, request, *args, **kwargs):
+        # PATCH cu `history`: răspunsul spune câte rânduri au fost atinse
+        self.history_changes = None
+        response = super().update(request, *args, **kwargs)
+        if self.history_changes is not None:
+            response.data['history_changes'] = self.history_changes
+        return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@condition(etag_func=stock_list_etag)
+def stocks_summary(request):
+    """
+    Lista stocurilor fără istoric, paginată (?page=, ?page_size=).
+    ?fields=id,stock_name,... alege câmpurile; `history` doar la cerere.
+    """
+    fields = [f.strip() for f in request.query_params.get('fields', '').split(',') if f.strip()]
+    unknown = set(fields) - set(StockSummarySerializer.Meta.fields)
+    if unknown:
+        return Response({'error': f'Câmpuri necunoscute: {sorted(unknown)}'}, status=400)
+
+    stocks = Stock.objects.filter(user=request.user).select_related('snapshot').order_by('id')
+    if 'history' in fields:
+        stocks = stocks.prefetch_related('history')
+
+    paginator = StockSummaryPagination()
+    page = paginator.paginate_queryset(stocks, request)
+    serializer = StockSummarySerializer(page, many=True, fields=fields or None)
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@condition(etag_func=stock_etag, last_modified_func=stock_last_modified)
+def stock_history(request, pk):
+    """
+    Istoricul unui stoc în format columnar.
+    ?from=&to= (YYYY-MM-DD), ?resample=W|M, ?output=json|npz|arrow
+    Cu resample, se întorc perioadele întregi (din rollup-uri) care se suprapun cu intervalul.
+    """
+    stock = get_object_or_404(Stock, pk=pk, user=request.user)
+
+    bounds = {}
+    for param in ('from', 'to'):
+        raw = request.query_params.get(param)
+        if raw:
+            try:
+                bounds[param] = parse_date(raw)
+            except ValueError:
+                bounds[param] = None
+            if bounds[param] is None:
+                return Response({'error': f'Dată invalidă pentru {param}: {raw}'}, status=400)
+
+    freq = request.query_params.get('resample') or None
+    if freq is not None and freq not in RESAMPLE_PERIODS:
+        return Response({'error': 'resample trebuie să fie W sau M'}, status=400)
+    if freq is not None:
+        get_snapshot(stock)  # construiește rollup-urile dacă lipsesc
+
+    output = request.query_params.get('output', 'json')
+    columns = history_columns(stock, bounds.get('from'), bounds.get('to'), freq)
+
+    if output == 'npz':
+        resp = HttpResponse(to_npz(columns), content_type=NPZ_CONTENT_TYPE)
+        resp['Content-Disposition'] = f'attachment; filename="history_{stock.pk}.npz"'
+        return resp
+    if output == 'arrow':
+        payload = to_arrow(columns)
+        if payload is None:
+            return Response({'error': 'Formatul arrow nu e disponibil pe server (lipsește pyarrow).'}, status=406)
+        return HttpResponse(payload, content_type=ARROW_CONTENT_TYPE)
+    if output != 'json':
+        return Response({'error': 'output trebuie să fie json, npz sau arrow'}, status=400)
+
+    return Response({
+        'stock_id': stock.pk,
+        'resample': freq or 'D',
+        'count': len(columns['date']),
+        'columns': columnar_json(columns),
+    })
+
 
 @api_view(['DELETE'])
 @permission_classes([AllowAny])
@@ -115,10 +245,16 @@ def create_stock_with_history(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@condition(etag_func=forecast_etag)
 def forecast_view(request):
+    """?compact=1&dates=iso|epoch&decimals=N: forecast și plan pe coloane (vezi compact.py)."""
     pid = request.query_params.get('product_id')
     if pid is None:
         return Response({"detail": "Trebuie să trimiți product_id."}, status=400)
+    try:
+        compact = compact_options(request.query_params)
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=400)
 
     try:
         stock = Stock.objects.get(pk=pid)
@@ -128,161 +264,379 @@ def forecast_view(request):
     months = int(request.query_params.get('months', 3))
     review_days = int(request.query_params.get('review_days', 14))
 
-    qs = stock.history.all().order_by('date')
-    if not qs.exists():
+    snapshot = get_snapshot(stock)
+    if not snapshot.days:
         return Response({"detail": "Nu există istoric pentru acest produs."}, status=400)
 
-    df = pd.DataFrame.from_records(qs.values('date', 'daily_sales', 'stock_quantity'))
-    df = df.rename(columns={'date': 'ds', 'daily_sales': 'y', 'stock_quantity': 'stock_quantity'})
-
-    years_data = (df['ds'].max().year - df['ds'].min().year + (df['ds'].max().month - df['ds'].min().month) / 12)
-    allowed = max_horizon(years_data)
+    allowed = snapshot_months(snapshot)
     horizon_months = min(months, allowed)
     horizon_days = int(horizon_months * 30.5)
 
     if horizon_days <= 0:
         return Response({"detail": "Istoric insuficient pentru forecast."}, status=400)
 
-    fc_df, wape, model_name = auto_forecast_pipeline(df, horizon_days=horizon_days)
+    with span('history'):
+        qs = stock.history.all().order_by('date')
+        df = pd.DataFrame.from_records(qs.values('date', 'daily_sales', 'stock_quantity'))
+        df = df.rename(columns={'date': 'ds', 'daily_sales': 'y', 'stock_quantity': 'stock_quantity'})
+
+    previous = load_states([stock.pk])[stock.pk]
+    states = dict(previous)
+    diagnostics = {}
+    fc_df, wape, model_name = auto_forecast_pipeline(
+        df, horizon_days=horizon_days, cache=get_forecast_cache(), cache_tag=stock.pk,
+        states=states, diagnostics=diagnostics, **pipeline_options()
+    )
+    observe_forecast(diagnostics)
 
     if fc_df is None:
         return Response({"detail": "Eroare la generarea prognozei (date insuficiente/incorecte)."}, status=400)
+    # endpoint public: stările modelelor sunt scrise doar pentru proprietarul stocului
+    if request.user.is_authenticated and stock.user_id == request.user.pk:
+        save_states(stock.pk, states, previous)
 
 
-    initial_stock = qs.last().stock_quantity
+    initial_stock = snapshot.latest_quantity
     min_stock = stock.min_stock_level
 
     plan_df = generate_order_plan(fc_df, initial_stock, min_stock, review_period_days=review_days)
 
+    with span('serialize'):
+        if compact:
+            forecast, plan = compact_frame(fc_df, **compact), compact_frame(plan_df, **compact)
+        else:
+            forecast, plan = fc_df.to_dict(orient="records"), plan_df.to_dict(orient="records")
+
     return Response({
         "model": model_name,
         "horizon_months": horizon_months,
         "accuracy_wape": f"{wape:.2%}",
-        "forecast": fc_df.rename(columns={"yhat": "yhat"}).to_dict(orient="records"),
-        "plan": plan_df.to_dict(orient="records")
+        "forecast": forecast,
+        "plan": plan
     })
 
 
+def _int_param(data, name, default=None, minimum=1):
+    """Întreg >= `minimum` din body; ValueError cu mesajul pentru răspunsul 400."""
+    value = data.get(name)
+    if value is None:
+        return default
+    try:
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError
+        value = int(value)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or value < minimum:
+        raise ValueError(f'{name} trebuie să fie un număr întreg >= {minimum}.')
+    return value
+
+
+def _with_compact_plan(data, compact):
+    if compact and 'plan' in data:
+        data = {**data, 'plan': compact_records(data['plan'], compact)}
+    return data
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def generate_and_save_plan(request, stock_id):
     stock = get_object_or_404(Stock, pk=stock_id, user=request.user)
+    try:
+        compact = compact_options(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
 
-    qs_hist = stock.history.all().values('date', 'daily_sales', 'stock_quantity','is_holiday')
-    df = pd.DataFrame(qs_hist).rename(columns={'date': 'ds', 'daily_sales': 'y'})
-    df['ds'] = pd.to_datetime(df['ds'])
-
-    if df.empty:
+    snapshot = get_snapshot(stock)
+    if not snapshot.days:
         return Response({'error': 'Nu există istoric.'}, status=400)
+    if snapshot_months(snapshot) <= 0:
+        return Response({'error': 'Istoric insuficient pentru forecast.'}, status=400)
 
-    years = (df['ds'].max() - df['ds'].min()).days / 365.0
-    allowed = max_horizon(years)
-    months = min(int(request.data.get('months', allowed)), allowed)
-    horizon_days = int(months * 30.5)
-    review_days = int(request.data.get('review_days', 14))
-
-    fc_df, wape, model_name = auto_forecast_pipeline(df, horizon_days=horizon_days)
-
-    if fc_df is None:
-        return Response({'error': 'Prognoza a eșuat. Verifică datele.'}, status=400)
-
-    last_rec = stock.history.order_by('-date').first()
-    initial_stock = last_rec.stock_quantity if last_rec else 0
-    min_stock = stock.min_stock_level
-
-    plan_df = generate_order_plan(
-        fc_df,
-        current_stock=initial_stock,
-        min_stock_level=min_stock,
-        review_period_days=review_days
-    )
+    try:
+        months = _int_param(request.data, 'months')
+        review_days = _int_param(request.data, 'review_days', 14)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
 
-    run = ForecastRun.objects.create(
+    job = ForecastJob.objects.create(
+        user=request.user,
         stock=stock,
         months=months,
         review_days=review_days
     )
 
-    objs = []
-    for row in plan_df.to_dict('records'):
-        objs.append(ReorderPlan(
-            run=run,
-            review_date=row['review_date'],
-            stock_before=row['stock_before'],
-            demand_next=row['demand_next'],
-            order_qty=row['order_qty'],
-            stock_name=stock.stock_name
-        ))
-    ReorderPlan.objects.bulk_create(objs)
-
-    total_order = plan_df["order_qty"].sum() if not plan_df.empty else 0.0
-    accuracy_pct = round(max(0.0, (1 - float(wape)) * 100), 1)
+    if not getattr(settings, 'FORECAST_JOBS_ASYNC', True):
+        run_forecast_job(job)
+        job.refresh_from_db()
+        if job.status == ForecastJob.FAILED:
+            return Response({'error': job.error}, status=400)
+        return Response(_with_compact_plan(job.result, compact), status=status.HTTP_201_CREATED)
+
+    status_url = f"/api/forecast/jobs/{job.pk}/"
+    if compact:
+        status_url += '?' + request.query_params.urlencode()
+    return Response({
+        "job_id": job.pk,
+        "status": job.status,
+        "status_url": status_url,
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def forecast_job_status(request, job_id):
+    job = get_object_or_404(ForecastJob, pk=job_id, user=request.user)
+    try:
+        compact = compact_options(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    return Response(_with_compact_plan(job_status(job), compact))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_forecast_view(request):
+    """
+    Prognoză + plan pentru mai multe stocuri într-un singur request.
+    Body: {"stock_ids": [..]} sau {"all": true} (toate stocurile active),
+    opțional months, review_days, save (implicit true).
+    """
+    stocks = Stock.objects.filter(user=request.user).order_by('id')
+    if request.data.get('all'):
+        stocks = stocks.filter(is_active=True)
+    else:
+        ids = request.data.get('stock_ids')
+        if not isinstance(ids, list) or not ids:
+            return Response({'error': 'Trimite stock_ids (listă) sau all=true.'}, status=400)
+        try:
+            ids = [_int_param({'stock_ids': i}, 'stock_ids') for i in ids]
+        except ValueError:
+            return Response({'error': 'stock_ids trebuie să conțină doar id-uri numerice.'}, status=400)
+        stocks = stocks.filter(pk__in=ids)
+
+    try:
+        months_req = _int_param(request.data, 'months')
+        review_days = _int_param(request.data, 'review_days', 14)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    save = request.data.get('save', True) in ('1', 'true', True)
+
+    stocks = {s.pk: s for s in stocks.select_related('snapshot')}
+    if not stocks:
+        return Response({'error': 'Niciun produs găsit.'}, status=404)
+
+    # stocurile cu istoric insuficient (după snapshot) nu mai sunt citite deloc
+    results = {}
+    for stock_id, stock in stocks.items():
+        if snapshot_months(get_snapshot(stock)) <= 0:
+            results[stock_id] = {'stock_id': stock_id, 'status': 'failed', 'error': 'Istoric insuficient.', 'seconds': 0.0}
+
+    # tot istoricul într-un singur query, apoi împărțit pe stoc
+    qs_hist = (SalesRecord.objects
+               .filter(stock_id__in=[pk for pk in stocks if pk not in results])
+               .order_by('stock_id', 'date')
+               .values('stock_id', 'date', 'daily_sales', 'stock_quantity', 'is_holiday'))
+    with span('history'):
+        hist = pd.DataFrame.from_records(qs_hist, columns=['stock_id', 'date', 'daily_sales', 'stock_quantity', 'is_holiday'])
+        hist = hist.rename(columns={'date': 'ds', 'daily_sales': 'y'})
+        hist['ds'] = pd.to_datetime(hist['ds'])
+
+    # pregătirea seriilor (zile lipsă, stock-out, mediană mobilă) pentru toate stocurile deodată
+    panel = prep_data_many(hist)
+    last_stock = hist.groupby('stock_id')['stock_quantity'].last()
+
+    states = load_states(list(stocks))
+    jobs, months_by_stock = [], {}
+    for stock_id, df in panel.frames():
+        allowed = allowed_months(df)
+        months = allowed if months_req is None else min(months_req, allowed)
+        if months <= 0:
+            results[stock_id] = {'stock_id': stock_id, 'status': 'failed', 'error': 'Istoric insuficient.', 'seconds': 0.0}
+            continue
+        months_by_stock[stock_id] = months
+        jobs.append({
+            'stock_id': stock_id,
+            'history': df,
+            'prepared': True,
+            'horizon_days': int(months * 30.5),
+            'current_stock': int(last_stock[stock_id]),
+            'min_stock_level': stocks[stock_id].min_stock_level,
+            'review_days': review_days,
+            'states': states.get(stock_id, {}),
+        })
 
+    started = time.perf_counter()
+    workers = getattr(settings, 'FORECAST_BATCH_WORKERS', None)
+    # modelele rulează în pool: span-urile lor nu ajung aici, doar durata totală
+    with span('batch_forecast'):
+        for res in batch_forecast(jobs, max_workers=workers, cache=get_forecast_cache()):
+            results[res['stock_id']] = res
+            observe_forecast(res.get('diagnostics'))
+    elapsed = time.perf_counter() - started
+
+    with transaction.atomic():
+        out = []
+        for stock_id, stock in stocks.items():
+            res = results.get(stock_id) or {'stock_id': stock_id, 'status': 'failed', 'error': 'Nu există istoric.', 'seconds': 0.0}
+            item = {
+                'stock_id': stock_id,
+                'stock_name': stock.stock_name,
+                'status': res['status'],
+                'seconds': res['seconds'],
+            }
+            if res['status'] == 'ok':
+                plan_df = res['plan']
+                item['horizon_months'] = months_by_stock[stock_id]
+                item['plan'] = plan_df.to_dict(orient="records")
+                item['summary'] = plan_summary(plan_df, res['wape'], res['model'], stock.min_stock_level)
+                item['diagnostics'] = res.get('diagnostics')
+                run = None
+                if save:
+                    run = save_plan(stock, months_by_stock[stock_id], review_days, plan_df, res.get('diagnostics'))
+                    item['run_id'] = run.pk
+                save_states(stock_id, res['states'], run=run)
+            else:
+                item['error'] = res['error']
+            out.append(item)
+
+    failed = sum(1 for item in out if item['status'] != 'ok')
     return Response({
-        "plan": plan_df.to_dict(orient="records"),
+        "results": out,
         "summary": {
-            "model": model_name,
-            "accuracy_pct": accuracy_pct,
-            "min_stock_level_used": min_stock,
-            "total_order_qty": round(total_order, 2),
+            "requested": len(out),
+            "succeeded": len(out) - failed,
+            "failed": failed,
+            "seconds": round(elapsed, 3),
         }
-    }, status=status.HTTP_201_CREATED)
+    }, status=status.HTTP_201_CREATED if save else status.HTTP_200_OK)
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def forecast_cache_view(request):
+    cache = get_forecast_cache()
+    if request.method == 'DELETE':
+        if not request.user.is_staff:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        cache.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(cache.stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def model_store_view(request):
+    return Response({"models": store_report(request.user)})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def forecast_diagnostics(request):
+    """Durata fit-urilor pe model și lungimea istoricului (?days=30, ?stock=<id>)."""
+    try:
+        days = int(request.query_params.get('days', 30))
+        stock_id = request.query_params.get('stock')
+        stock_id = int(stock_id) if stock_id else None
+    except ValueError:
+        return Response({'error': 'days și stock trebuie să fie numerice'}, status=400)
+    if not 1 <= days <= 365:
+        return Response({'error': 'days trebuie să fie între 1 și 365'}, status=400)
+    return Response(diagnostics_report(request.user, days=days, stock_id=stock_id))
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser, FormParser])
 def import_stocks(request):
     name = request.data.get('stock_name')
+    stock_id = request.data.get('stock_id')
     f = request.FILES.get('file')
-    if not name or not f:
+    if not f or not (name or stock_id):
         return Response({'error': 'Lipsește stock_name sau fișier'}, status=400)
 
-    try:
-        df = pd.read_excel(f, engine='openpyxl')
-    except Exception as e:
-        return Response({'error': f'Nu am putut citi Excel: {e}'}, status=400)
+    # cu stock_id, istoricul se adaugă/suprascrie (upsert pe dată) într-un stoc existent
+    stock = None
+    if stock_id:
+        stock = get_object_or_404(Stock, pk=stock_id, user=request.user)
 
-    required = {'ds', 'daily_sales', 'current_stock_quantity', 'min_stock_level'}
-    if not required.issubset(set(df.columns)):
-        return Response(
-            {'error': f'Coloane lipsă. Trebuie: {required}'},
-            status=400
+    try:
+        report = import_sales_file(
+            f, f.name, request.user, stock_name=name, stock=stock,
+            chunk_size=getattr(settings, 'IMPORT_CHUNK_SIZE', 5000),
+            batch_size=getattr(settings, 'IMPORT_BATCH_SIZE', 1000),
         )
+    except ImportFormatError as e:
+        return Response({'error': str(e)}, status=400)
+    except Exception as e:
+        return Response({'error': f'Nu am putut citi fișierul: {e}'}, status=400)
 
-    min_lvl = int(df['min_stock_level'].max())
-    stock = Stock.objects.create(
-        user=request.user,
-        stock_name=name,
-        min_stock_level=min_lvl
-    )
+    if not report['rows_imported']:
+        return Response({'error': 'Niciun rând valid în fișier.', **report}, status=400)
+    return Response({'message': 'Import reușit!', **report}, status=status.HTTP_201_CREATED)
 
-    records = []
-    for _, row in df.iterrows():
-        ds = row['ds']
-        if hasattr(ds, 'date'):
-            ds = ds.date()
-        else:
-            ds = parse_date(str(ds))
 
-        records.append(SalesRecord(
-            stock=stock,
-            date=ds,
-            daily_sales=int(row['daily_sales']),
-            stock_quantity=int(row['current_stock_quantity'])
-        ))
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def ingest_sales(request):
+    """
+    Ingest în flux pentru mai multe stocuri: corp NDJSON (application/x-ndjson) sau CSV (text/csv)
+    cu stock_id|stock, date, daily_sales, stock_quantity[, is_holiday]; vezi ingest.py.
+    ?create_missing=1 creează stocurile necunoscute (după nume).
+    """
+    # request.stream, nu request.data: corpul nu e încărcat întreg în memorie
+    stream = request.stream
+    if stream is None:
+        return Response({'error': 'Corpul cererii lipsește (e nevoie de Content-Length).'}, status=400)
+
+    content_type = request.content_type.split(';')[0].strip().lower()
+    try:
+        report = ingest_sales_stream(
+            stream, content_type, request.user,
+            create_missing=request.query_params.get('create_missing') in ('1', 'true'),
+            batch_size=getattr(settings, 'IMPORT_BATCH_SIZE', 1000),
+        )
+    except IngestFormatError as e:
+        return Response({'error': str(e)}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
 
-    SalesRecord.objects.bulk_create(records)
-    return Response({'message': 'Import reușit!'}, status=status.HTTP_201_CREATED)
+    if not report['rows_written']:
+        return Response({'error': 'Niciun rând valid.', **report}, status=400)
+    return Response(report, status=status.HTTP_201_CREATED)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@condition(etag_func=alerts_etag)
 def alerts(request):
+    """
+    Planurile de reaprovizionare, paginate cu cursor (?cursor=, ?page_size=).
+    Filtre: upcoming=1 (review_date >= azi), nonzero=1 (order_qty > 0),
+    stock=<id>, latest=1 (doar ultimul run al fiecărui stoc).
+    """
+    params = request.query_params
     plans = (ReorderPlan.objects
              .filter(run__stock__user=request.user)
-             .order_by('-created_at'))
-    serializer = ReorderPlanSerializer(plans, many=True)
-    return Response(serializer.data)
+             .select_related('run__stock'))
+
+    if params.get('upcoming') in ('1', 'true'):
+        plans = plans.filter(review_date__gte=timezone.localdate())
+    if params.get('nonzero') in ('1', 'true'):
+        plans = plans.filter(order_qty__gt=0)
+    if params.get('stock'):
+        try:
+            plans = plans.filter(run__stock_id=int(params['stock']))
+        except ValueError:
+            return Response({'error': 'stock trebuie să fie un id numeric'}, status=400)
+    if params.get('latest') in ('1', 'true'):
+        last_run = (ForecastRun.objects
+                    .filter(stock=OuterRef('run__stock'))
+                    .order_by('-run_at', '-id')
+                    .values('id')[:1])
+        plans = plans.filter(run_id=Subquery(last_run))
+
+    paginator = AlertsCursorPagination()
+    page = paginator.paginate_queryset(plans, request)
+    serializer = ReorderPlanSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['DELETE'])
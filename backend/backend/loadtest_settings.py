@@ -0,0 +1,21 @@
+"""
+Setări pentru load test-ul local (manage.py loadtest): aceleași ca settings.py,
+dar cu o bază SQLite separată și fără servicii externe.
+
+    python manage.py loadtest --settings=backend.loadtest_settings
+"""
+from .settings import *  # noqa: F401,F403
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'loadtest-insecure-key-only-for-local-runs')
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('LOADTEST_DB', os.path.join(BASE_DIR, 'loadtest.sqlite3')),
+        # cererile concurente așteaptă lock-ul de scriere în loc să eșueze imediat
+        'OPTIONS': {'timeout': 30},
+    }
+}
+
+FORECAST_CACHE = {**FORECAST_CACHE, 'directory': os.path.join(BASE_DIR, 'loadtest_forecast_cache')}
@@ -59,8 +59,60 @@ REST_FRAMEWORK = {
         "rest_framework.parsers.FormParser",
         "rest_framework.parsers.MultiPartParser",
     ],
+    # orjson dacă e instalat (fallback pe encoderul DRF)
+    "DEFAULT_RENDERER_CLASSES": [
+        "aplicatie.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# Numărul de procese pentru /api/forecast/batch/ (None = os.cpu_count())
+FORECAST_BATCH_WORKERS = None
+
+# Prophet și SARIMA se antrenează în procese separate (fork: doar când procesul nu are alte
+# thread-uri, ex. gunicorn cu workeri sync; altfel secvențial); un model care depășește
+# timeout-ul (secunde) e oprit. Dacă primul model terminat are WAPE <= prag, restul sunt anulate.
+FORECAST_PARALLEL_FITS = True
+FORECAST_MODEL_TIMEOUT = 120
+FORECAST_EARLY_STOP_WAPE = None
+# un model încă neterminat e anulat când cel terminat îl bate cu peste 50% față de WAPE-ul
+# lui de la rularea anterioară (din starea salvată); None dezactivează pre-check-ul
+FORECAST_EARLY_STOP_MARGIN = 0.5
+
+# POST /api/forecast/<id>/ pune un job în coadă (procesat de `manage.py run_forecast_worker`).
+# Cu False, job-ul rulează direct în request (util în dezvoltare, fără worker).
+FORECAST_JOBS_ASYNC = True
+
+# Cache pentru rezultatele prognozelor (memorie LRU + director pe disc, partajat între workeri)
+FORECAST_CACHE = {
+    "max_entries": 256,
+    "ttl": 24 * 3600,
+    "directory": os.path.join(BASE_DIR, 'forecast_cache'),
 }
 
+# header-ul Server-Timing pe răspunsurile API (etape, query-uri SQL, total)
+SERVER_TIMING = True
+
+# profil pentru cererile lente: o fracțiune `sample_rate` din cereri rulează sub profiler,
+# iar profilul e salvat în `directory` doar dacă cererea durează peste `threshold_ms`
+PROFILE_REQUESTS = {
+    "enabled": False,
+    "sample_rate": 0.05,
+    "threshold_ms": 2000,
+    "engine": "cprofile",  # sau "pyinstrument", dacă pachetul e instalat
+    "directory": os.path.join(BASE_DIR, 'profiles'),
+}
+
+# /metrics: cu mai mulți workeri (gunicorn) fiecare proces își scrie metricile în METRICS_DIR,
+# golit la pornire; fără el, /metrics arată doar procesul care răspunde
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+# dacă e setat, /metrics cere header-ul `Authorization: Bearer <token>`
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
+# Import istoric: rânduri citite din fișier per chunk / rânduri per INSERT
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_BATCH_SIZE = 1000
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=4),
     "AUTH_COOKIE": "access_token",
@@ -77,6 +129,12 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    # primul, ca să comprime răspunsul final (brotli dacă e instalat, altfel gzip)
+    'aplicatie.middleware.CompressionMiddleware',
+    # Server-Timing: etapele cererii și query-urile SQL (după comprimare, ca să n-o includă)
+    'aplicatie.middleware.ServerTimingMiddleware',
+    # metrici Prometheus per rută (expuse la /metrics)
+    'aplicatie.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -1,17 +1,21 @@
-from flask import Flask, request, jsonify, render_template, redirect, make_response, flash
+import time
+
+from flask import Flask, Response, request, jsonify, render_template, redirect, make_response, flash, g
 import requests
 from functools import wraps
-import io
+
+import tokens
+import upstream
 
 app = Flask(__name__)
 #
 
 
-TOKEN_URL = "http://127.0.0.1:8000/api/token/"
-STOCKS_URL = "http://127.0.0.1:8000/api/stocks/"
-FORECAST_URL = "http://127.0.0.1:8000/api/forecast/"
-ALERTS_URL = "http://127.0.0.1:8000/api/alerts/"
-SETTINGS_URL = "http://127.0.0.1:8000/api/settings/"
+TOKEN_URL = upstream.url("/api/token/")
+STOCKS_URL = upstream.url("/api/stocks/")
+FORECAST_URL = upstream.url("/api/forecast/")
+ALERTS_URL = upstream.url("/api/alerts/")
+SETTINGS_URL = upstream.url("/api/settings/")
 
 def login_required(f):
     @wraps(f)
@@ -25,29 +29,107 @@ def login_required(f):
     return decorated
 
 
-def _auth_headers_from_cookie():
-    token = request.cookies.get("access_token")
-    return {"Authorization": f"Bearer {token}"} if token else {}
-
-
 def _make_response_from_requests(r, new_access=None):
-    resp = make_response(r.content, r.status_code)
+    # corpul e transmis pe bucăți, fără să fie ținut întreg în memorie (și fără decomprimare)
+    resp = Response(upstream.iter_body(r), status=r.status_code)
     resp.headers["Content-Type"] = r.headers.get("Content-Type", "application/json")
+    _copy_headers(r.headers, resp, ("Content-Length", "Content-Encoding", "Vary", "Server-Timing"))
+    _copy_validators(r.headers, resp)
+    _set_access_cookie(resp, new_access)
+    return resp
+
+
+def _copy_headers(source, resp, names):
+    for name in names:
+        if source.get(name):
+            resp.headers[name] = source[name]
+
+
+def _copy_validators(source, resp):
+    _copy_headers(source, resp, ("ETag", "Last-Modified"))
+
+
+def _set_access_cookie(resp, new_access):
     if new_access:
         resp.set_cookie(
             "access_token", new_access,
             httponly=True, secure=False, samesite="Lax", path="/"
         )
-    return resp
 
 
-def _refresh_access_token():
-    refresh = request.cookies.get("refresh_token")
-    if not refresh:
+def _cache_key(method, url, token, params):
+    """Cheia în upstream.validated: per utilizator (din token), doar pentru GET."""
+    user = tokens.token_user(token) if method == "GET" else None
+    if user is None:
         return None
+    query = sorted(params.items(multi=True)) if hasattr(params, "items") else sorted(params or [])
+    # corpul e păstrat așa cum vine (posibil comprimat): varianta depinde de Accept-Encoding
+    return (user, url, tuple(query), request.headers.get("Accept-Encoding", ""))
+
+
+def _weak(tag):
+    # Django face ETag-ul slab (W/) când comprimă; comparația e slabă, ca în Django
+    return tag[2:] if tag and tag.startswith("W/") else tag
+
+
+def _client_etags():
+    raw = request.headers.get("If-None-Match", "")
+    return {_weak(t.strip()) for t in raw.split(",") if t.strip()}
+
+
+def _conditional_headers(headers, cached):
+    """If-None-Match către Django: ce are browserul plus ce avem noi în cache."""
+    tags = _client_etags()
+    if cached:
+        tags.add(_weak(cached["etag"]))
+    if tags:
+        headers["If-None-Match"] = ", ".join(sorted(tags))
+    if request.headers.get("If-Modified-Since"):
+        headers["If-Modified-Since"] = request.headers["If-Modified-Since"]
+
+
+def _proxy_response(r, new_access, cache_key, cached):
+    etag = r.headers.get("ETag")
+    if r.status_code == 304:
+        if _weak(etag) in _client_etags() or "*" in _client_etags():
+            # browserul are deja versiunea curentă: nu transferăm nimic
+            upstream.validated.count("passthrough_304")
+            return _make_response_from_requests(r, new_access=new_access)
+        if cached and _weak(cached["etag"]) == _weak(etag):
+            r.close()
+            upstream.validated.count("hits")
+            resp = Response(cached["body"], status=200, content_type=cached["content_type"])
+            resp.headers["ETag"] = cached["etag"]
+            if cached["last_modified"]:
+                resp.headers["Last-Modified"] = cached["last_modified"]
+            if cached["content_encoding"]:
+                resp.headers["Content-Encoding"] = cached["content_encoding"]
+                resp.headers["Vary"] = "Accept-Encoding"
+            _copy_headers(r.headers, resp, ("Server-Timing",))
+            _set_access_cookie(resp, new_access)
+            return resp
+        return _make_response_from_requests(r, new_access=new_access)
+
+    length = r.headers.get("Content-Length")
+    if (cache_key is None or r.status_code != 200 or not etag
+            or not length or int(length) > upstream.validated.max_body):
+        return _make_response_from_requests(r, new_access=new_access)
+
+    body = upstream.read_body(r)
+    content_type = r.headers.get("Content-Type", "application/json")
+    upstream.validated.put(cache_key, etag, body, content_type, r.headers.get("Last-Modified"),
+                           r.headers.get("Content-Encoding"))
+    resp = Response(body, status=200, content_type=content_type)
+    _copy_headers(r.headers, resp, ("Content-Encoding", "Vary", "Server-Timing"))
+    _copy_validators(r.headers, resp)
+    _set_access_cookie(resp, new_access)
+    return resp
+
+
+def _fetch_access_token(refresh):
     try:
-        r = requests.post("http://127.0.0.1:8000/api/token/refresh/",
-                          json={"refresh": refresh}, timeout=5)
+        r = upstream.request("POST", upstream.url("/api/token/refresh/"),
+                             json={"refresh": refresh}, timeout=5)
         if r.status_code != 200:
             return None
         return r.json().get("access")
@@ -55,19 +137,58 @@ def _refresh_access_token():
         return None
 
 
-def _forward_with_refresh(method, url, retry_on_401=True, **kwargs):
-    headers = {**_auth_headers_from_cookie(), **kwargs.pop("headers", {})}
-    r = requests.request(method, url, headers=headers, **kwargs)
-    if r.status_code != 401 or not retry_on_401:
-        return _make_response_from_requests(r)
+def _refresh_access_token(rejected=None):
+    refresh = request.cookies.get("refresh_token")
+    if not refresh:
+        return None
+    # request-urile simultane ale aceleiași sesiuni fac un singur refresh
+    return tokens.refresh_access(refresh, _fetch_access_token, rejected=rejected)
 
+
+def _access_token():
+    """
+    (token de trimis către Django, token nou de pus în cookie sau None).
+    Tokenul e reîmprospătat înainte să expire, deci nu mai pierdem un request pe 401.
+    """
+    token = request.cookies.get("access_token")
+    if not tokens.needs_refresh(token):
+        return token, None
     new_access = _refresh_access_token()
     if not new_access:
+        return token, None
+    return new_access, new_access
+
+
+def _add_upstream_time(r):
+    # până la primirea headerelor de la Django (corpul e transmis în flux)
+    g.upstream_seconds = g.get("upstream_seconds", 0.0) + r.elapsed.total_seconds()
+
+
+def _forward_with_refresh(method, url, retry_on_401=True, **kwargs):
+    token, new_access = _access_token()
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    # răspunsul comprimat de Django ajunge neschimbat la browser
+    headers["Accept-Encoding"] = request.headers.get("Accept-Encoding", "identity")
+    headers.update(kwargs.pop("headers", {}))
+    cache_key = _cache_key(method, url, token, kwargs.get("params"))
+    cached = upstream.validated.get(cache_key)
+    if method == "GET":
+        _conditional_headers(headers, cached)
+    r = upstream.request(method, url, headers=headers, stream=True, **kwargs)
+    _add_upstream_time(r)
+    if r.status_code != 401 or not retry_on_401 or new_access:
+        return _proxy_response(r, new_access, cache_key, cached)
+
+    # token respins deși nu părea expirat (ex. revocat): o singură încercare cu refresh
+    new_access = _refresh_access_token(rejected=token)
+    if not new_access or new_access == token:
         return _make_response_from_requests(r)
 
+    r.close()
     headers["Authorization"] = f"Bearer {new_access}"
-    r2 = requests.request(method, url, headers=headers, **kwargs)
-    return _make_response_from_requests(r2, new_access=new_access)
+    r2 = upstream.request(method, url, headers=headers, stream=True, **kwargs)
+    _add_upstream_time(r2)
+    return _proxy_response(r2, new_access, cache_key, cached)
 
 
 @app.route("/")
@@ -91,7 +212,7 @@ def register():
     if not data or any(k not in data for k in ("username", "email", "password")):
         return jsonify({"error": "Lipsește username, email sau password"}), 400
     try:
-        resp = requests.post("http://127.0.0.1:8000/api/register/", json=data)
+        resp = upstream.request("POST", upstream.url("/api/register/"), json=data)
         if resp.status_code == 201:
             return jsonify({"message": "User creat cu succes!"}), 201
         return jsonify({"error": resp.json()}), resp.status_code
@@ -106,7 +227,7 @@ def login():
         return jsonify({"error": "Lipsește username sau password"}), 400
 
     try:
-        resp = requests.post(TOKEN_URL, json=data, timeout=5)
+        resp = upstream.request("POST", TOKEN_URL, json=data, timeout=5)
         resp.raise_for_status()
         tokens = resp.json()
         jwt_access = tokens.get("access")
@@ -130,14 +251,19 @@ def login():
 @app.route("/dashboard")
 @login_required
 def dashboard():
-    headers = _auth_headers_from_cookie()
+    token, new_access = _access_token()
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
     try:
-        resp = requests.get(STOCKS_URL, headers=headers, timeout=5)
+        resp = upstream.request("GET", STOCKS_URL, headers=headers, timeout=5)
         if resp.status_code == 401:
             flash("Token invalid sau expirat!")
             return redirect("/login_page")
         stocks = resp.json()
-        return render_template("dashboard.html", stocks=stocks)
+        page = make_response(render_template("dashboard.html", stocks=stocks))
+        if new_access:
+            page.set_cookie("access_token", new_access,
+                            httponly=True, secure=False, samesite="Lax", path="/")
+        return page
     except requests.exceptions.RequestException:
         flash("Eroare de conexiune cu serverul Django!")
         return redirect("/login_page")
@@ -198,10 +324,23 @@ def proxy_stocks():
     return _forward_with_refresh("POST", STOCKS_URL, json=payload, timeout=15)
 
 
+@app.route("/api/stocks/summary/", methods=["GET"])
+@login_required
+def proxy_stocks_summary():
+    return _forward_with_refresh("GET", STOCKS_URL + "summary/", params=request.args, timeout=10)
+
+
+@app.route("/api/stocks/<int:pk>/history/", methods=["GET"])
+@login_required
+def proxy_stock_history(pk):
+    url = f"{STOCKS_URL}{pk}/history/"
+    return _forward_with_refresh("GET", url, params=request.args, timeout=30)
+
+
 @app.route("/api/stocks/<int:pk>/", methods=["GET", "PATCH", "DELETE"])
 @login_required
 def proxy_stock_detail(pk):
-    url = f"http://127.0.0.1:8000/api/stocks/{pk}/"
+    url = upstream.url(f"/api/stocks/{pk}/")
     if request.method == "GET":
         return _forward_with_refresh("GET", url, timeout=10)
     if request.method == "PATCH":
@@ -213,57 +352,67 @@ def proxy_stock_detail(pk):
 @app.route("/api/forecast/<int:stock_id>/", methods=["POST"])
 @login_required
 def proxy_forecast_save(stock_id):
-    url = f"http://127.0.0.1:8000/api/forecast/{stock_id}/"
+    url = upstream.url(f"/api/forecast/{stock_id}/")
     payload = request.get_json(silent=True) or {}
-    return _forward_with_refresh("POST", url, json=payload, timeout=30)
+    return _forward_with_refresh("POST", url, json=payload, params=request.args, timeout=30)
+
+
+@app.route("/api/forecast/jobs/<int:job_id>/", methods=["GET"])
+@login_required
+def proxy_forecast_job(job_id):
+    url = upstream.url(f"/api/forecast/jobs/{job_id}/")
+    return _forward_with_refresh("GET", url, params=request.args, timeout=10)
+
+
+@app.route("/api/forecast/batch/", methods=["POST"])
+@login_required
+def proxy_forecast_batch():
+    url = upstream.url("/api/forecast/batch/")
+    payload = request.get_json(silent=True) or {}
+    return _forward_with_refresh("POST", url, json=payload, timeout=300)
 
 
 @app.route("/api/import-stocks/", methods=["POST"])
 @login_required
 def proxy_import_stocks():
-    url = "http://127.0.0.1:8000/api/import-stocks/"
+    url = upstream.url("/api/import-stocks/")
     name = request.form.get("stock_name", "")
     f = request.files.get("file")
 
     data = {"stock_name": name}
+    if request.form.get("stock_id"):
+        data["stock_id"] = request.form["stock_id"]
     files = None
-    file_bytes = None
-    filename = mimetype = None
-
     if f:
-        file_bytes = f.read()
-        filename = f.filename
-        mimetype = f.mimetype
-        files = {"file": (filename, io.BytesIO(file_bytes), mimetype)}
-
-    headers = _auth_headers_from_cookie()
-    r = requests.post(url, headers=headers, data=data, files=files, timeout=30)
-    if r.status_code != 401:
-        return _make_response_from_requests(r)
+        # requests construiește tot corpul multipart în memorie; stream-ul upload-ului
+        # nu poate fi recitit, deci fără retrimitere după 401
+        files = {"file": (f.filename, f.stream, f.mimetype)}
 
-    new_access = _refresh_access_token()
-    if not new_access:
-        return _make_response_from_requests(r)
+    return _forward_with_refresh("POST", url, retry_on_401=False, data=data, files=files, timeout=300)
 
-    headers["Authorization"] = f"Bearer {new_access}"
-    files_retry = None
-    if file_bytes is not None:
-        files_retry = {"file": (filename, io.BytesIO(file_bytes), mimetype)}
 
-    r2 = requests.post(url, headers=headers, data=data, files=files_retry, timeout=30)
-    return _make_response_from_requests(r2, new_access=new_access)
+@app.route("/api/stocks/ingest/", methods=["POST"])
+@login_required
+def proxy_ingest():
+    url = upstream.url("/api/stocks/ingest/")
+    if request.content_length is None:
+        return jsonify({"error": "Lipsește Content-Length."}), 411
+    body = upstream.SizedStream(request.stream, request.content_length)
+    # corpul nu poate fi retrimis după un 401, deci fără retry
+    return _forward_with_refresh("POST", url, retry_on_401=False, data=body, params=request.args,
+                                 headers={"Content-Type": request.content_type}, timeout=300)
 
 
 @app.route("/api/alerts/", methods=["GET"])
 @login_required
 def proxy_alerts():
-    return _forward_with_refresh("GET", ALERTS_URL, timeout=10)
+    return _forward_with_refresh("GET", ALERTS_URL, params=request.args, timeout=10)
 
 
 @app.route("/api/alerts/run/<int:run_id>/", methods=["DELETE"])
 @login_required
 def proxy_alerts_del(run_id):
-    url = f"http://127.0.0.1:8000/api/alerts/run/{run_id}/"
+    url = upstream.url(f"/api/alerts/run/{run_id}/")
     return _forward_with_refresh("DELETE", url, timeout=10)
 
 
@@ -272,7 +421,7 @@ def proxy_alerts_del(run_id):
 @app.route("/api/settings/avatar/", methods=["POST"])  # Alias cu slash
 @login_required
 def proxy_settings_avatar():
-    url = "http://127.0.0.1:8000/api/settings/avatar/"
+    url = upstream.url("/api/settings/avatar/")
     f = request.files.get("avatar")
     files = None
     if f:
@@ -284,7 +433,7 @@ def proxy_settings_avatar():
 @app.route("/api/settings/me/", methods=["GET", "PATCH"])
 @login_required
 def proxy_settings_me():
-    url = "http://127.0.0.1:8000/api/settings/me/"
+    url = upstream.url("/api/settings/me/")
 
     if request.method == "GET":
         return _forward_with_refresh("GET", url, timeout=10)
@@ -296,7 +445,7 @@ def proxy_settings_me():
 @app.route("/api/settings/password/", methods=["POST"])
 @login_required
 def proxy_settings_password():
-    url = "http://127.0.0.1:8000/api/settings/password/"
+    url = upstream.url("/api/settings/password/")
     payload = request.get_json(silent=True) or {}
     return _forward_with_refresh("POST", url, json=payload, timeout=10)
 
@@ -305,11 +454,18 @@ def proxy_settings_password():
 @app.route("/api/settings/delete-account/", methods=["POST"])  # Alias cu slash
 @login_required
 def proxy_delete_account():
-    url = "http://127.0.0.1:8000/api/settings/delete-account/"
+    url = upstream.url("/api/settings/delete-account/")
 
     return _forward_with_refresh("POST", url, timeout=10)
 
 
+@app.route("/api/proxy/stats/", methods=["GET"])
+@login_required
+def proxy_upstream_stats():
+    """Latențele apelurilor către Django, per endpoint, și cache-ul de răspunsuri validate."""
+    return jsonify({**upstream.stats.snapshot(), "validated_cache": upstream.validated.snapshot()})
+
+
 @app.route("/logout", methods=["GET"], strict_slashes=False, endpoint="logout")
 @app.route("/logout/", methods=["GET"], strict_slashes=False)
 def do_logout():
@@ -321,12 +477,33 @@ def do_logout():
     return resp
 
 
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+
+@app.after_request
+def add_server_timing(resp):
+    """Server-Timing de la Django (dacă a fost apelat) + durata apelului upstream și a proxy-ului."""
+    if not request.path.startswith("/api/") or "started" not in g:
+        return resp
+    parts = [resp.headers["Server-Timing"]] if resp.headers.get("Server-Timing") else []
+    if "upstream_seconds" in g:
+        parts.append(f"upstream;dur={g.upstream_seconds * 1000:.1f}")
+    parts.append(f"proxy;dur={(time.perf_counter() - g.started) * 1000:.1f}")
+    resp.headers["Server-Timing"] = ", ".join(parts)
+    return resp
+
+
 @app.after_request
 def add_nocache_headers(resp):
     p = (request.path or "")
-    if p.startswith("/dashboard") or p.startswith("/api/"):
+    if p.startswith("/dashboard"):
         resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
         resp.headers["Pragma"] = "no-cache"
+    elif p.startswith("/api/"):
+        # browserul poate păstra răspunsul, dar îl revalidează (ETag) la fiecare folosire
+        resp.headers["Cache-Control"] = "private, no-cache"
     return resp
 
 
@@ -5,89 +5,112 @@ document.addEventListener('DOMContentLoaded', () => {
   const container = document.getElementById('alertsContainer');
   if (!container) return;
 
-  apiFetch('/api/alerts/')
-    .then(r => { if (!r.ok) throw new Error(r.status); return r.json(); })
-    .then(list => {
-
-      container.innerHTML = '';
-
-      const addCard = document.createElement('div');
-      addCard.className = 'forecast-card add-new';
-      addCard.onclick = () => window.location.href = '/dashboard/forecast';
-      addCard.innerHTML = `
-          <div class="add-icon">+</div>
-          <h3>Run New Forecast</h3>
-          <p>Generate demand plan for another product</p>
-      `;
-      container.appendChild(addCard);
-
-      if (!Array.isArray(list) || !list.length) return;
-
-      const groups = list.reduce((acc, item) => {
-        const runId = item.run_id;
-        if (!acc[runId]) acc[runId] = [];
-        acc[runId].push(item);
-        return acc;
-      }, {});
-
-      Object.entries(groups).forEach(([runId, items]) => {
-        const stockName      = items[0].stock_name || "Unknown Product";
-        const durationMonths = items[0].months != null ? items[0].months : '—';
-
-        const card = document.createElement('div');
-        card.classList.add('forecast-card');
-        card.dataset.runId = runId;
-
-        const tableRows = items.map(it => {
-          const date = it.review_date
-            ? new Date(it.review_date).toLocaleDateString('ro-RO', {day:'2-digit', month:'2-digit', year:'numeric'})
-            : '—';
-
-          return `
-            <tr>
-              <td class="col-date">${date}</td>
-              <td class="col-qty">${Math.round(it.order_qty)} pcs</td>
-            </tr>`;
-        }).join('');
-
-        card.innerHTML = `
-          <div class="card-header">
-            
-            <div class="header-content">
-                <h4 class="card-title">${stockName}</h4>
-                <div class="meta-info">
-                    <span class="meta-tag">${durationMonths} Months Horizon</span>
-                </div>
-            </div>
-
-            <div class="header-actions">
-                <button class="download-card" title="Download Excel">
-                    <img src="/static/imgs/download_icon.png" alt="Download">
-                </button>
-                <button class="del-card" title="Delete Forecast">&times;</button>
+  const addCard = document.createElement('div');
+  addCard.className = 'forecast-card add-new';
+  addCard.onclick = () => window.location.href = '/dashboard/forecast';
+  addCard.innerHTML = `
+      <div class="add-icon">+</div>
+      <h3>Run New Forecast</h3>
+      <p>Generate demand plan for another product</p>
+  `;
+
+  const loadMoreBtn = document.createElement('button');
+  loadMoreBtn.className = 'btn-small-action';
+  loadMoreBtn.textContent = 'Load more';
+  loadMoreBtn.hidden = true;
+  container.insertAdjacentElement('afterend', loadMoreBtn);
+
+  // un card per run; un run poate continua pe pagina următoare
+  const cardsByRun = {};
+  let nextCursor = null;
+
+  function formatDate(value) {
+    return value
+      ? new Date(value).toLocaleDateString('ro-RO', {day:'2-digit', month:'2-digit', year:'numeric'})
+      : '—';
+  }
+
+  function rowHTML(it) {
+    return `
+      <tr>
+        <td class="col-date">${formatDate(it.review_date)}</td>
+        <td class="col-qty">${Math.round(it.order_qty)} pcs</td>
+      </tr>`;
+  }
+
+  function createCard(item) {
+    const stockName      = item.stock_name || "Unknown Product";
+    const durationMonths = item.months != null ? item.months : '—';
+
+    const card = document.createElement('div');
+    card.classList.add('forecast-card');
+    card.dataset.runId = item.run_id;
+
+    card.innerHTML = `
+      <div class="card-header">
+        
+        <div class="header-content">
+            <h4 class="card-title">${stockName}</h4>
+            <div class="meta-info">
+                <span class="meta-tag">${durationMonths} Months Horizon</span>
             </div>
+        </div>
+
+        <div class="header-actions">
+            <button class="download-card" title="Download Excel">
+                <img src="/static/imgs/download_icon.png" alt="Download">
+            </button>
+            <button class="del-card" title="Delete Forecast">&times;</button>
+        </div>
+
+      </div>
+
+      <div class="card-body">
+        <table class="mini-table">
+            <thead>
+                <tr>
+                    <th class="col-date">Review Date</th>
+                    <th class="col-qty">Order Qty</th>
+                </tr>
+            </thead>
+            <tbody></tbody>
+        </table>
+      </div>
+    `;
+
+    container.appendChild(card);
+    return card.querySelector('tbody');
+  }
+
+  function loadPage(cursor) {
+    const params = new URLSearchParams({ page_size: '200' });
+    if (cursor) params.set('cursor', cursor);
+    loadMoreBtn.disabled = true;
+
+    return apiFetch(`/api/alerts/?${params}`)
+      .then(r => { if (!r.ok) throw new Error(r.status); return r.json(); })
+      .then(data => {
+        if (!cursor) {
+          container.innerHTML = '';
+          container.appendChild(addCard);
+        }
+
+        (data.results || []).forEach(item => {
+          if (!cardsByRun[item.run_id]) cardsByRun[item.run_id] = createCard(item);
+          cardsByRun[item.run_id].insertAdjacentHTML('beforeend', rowHTML(item));
+        });
 
-          </div>
-
-          <div class="card-body">
-            <table class="mini-table">
-                <thead>
-                    <tr>
-                        <th class="col-date">Review Date</th>
-                        <th class="col-qty">Order Qty</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    ${tableRows}
-                </tbody>
-            </table>
-          </div>
-        `;
-
-        container.insertBefore(card, container.children[1] || null);
+        nextCursor = data.next ? new URL(data.next).searchParams.get('cursor') : null;
+        loadMoreBtn.hidden = !nextCursor;
+        loadMoreBtn.disabled = false;
       });
-    })
-    .catch(console.error);
+  }
+
+  loadMoreBtn.addEventListener('click', () => {
+    if (nextCursor) loadPage(nextCursor).catch(console.error);
+  });
+
+  loadPage(null).catch(console.error);
 
   container.addEventListener('click', e => {
 
@@ -26,26 +26,19 @@ function initProfileDropdown() {
 
 async function initDashboardData() {
     try {
-        const response = await fetch("/api/manage_stocks");
+        const response = await fetch("/api/stocks/summary/?page_size=1000");
         if (!response.ok) throw new Error("Network error");
 
-        const stocks = await response.json();
+        const stocks = (await response.json()).results;
 
 
         const totalProducts = stocks.length;
 
-        const totalVolume = stocks.reduce((sum, stock) => {
-            if (stock.history && stock.history.length > 0) {
-                const lastRecord = stock.history[stock.history.length - 1];
-                return sum + (lastRecord.stock_quantity || 0);
-            }
-            return sum;
-        }, 0);
+        const totalVolume = stocks.reduce((sum, stock) => sum + (stock.current_stock_quantity || 0), 0);
 
         const overstockCount = stocks.filter(s => {
-            if (!s.history || s.history.length === 0) return false;
-            const current = s.history[s.history.length - 1].stock_quantity;
-            return current > (s.min_stock_level * 2);
+            if (!s.last_date) return false;
+            return s.current_stock_quantity > (s.min_stock_level * 2);
         }).length;
 
         updateStatCard(0, totalProducts);
@@ -80,8 +73,8 @@ function populateTable(stocks) {
         let statusClass = "success";
         let statusText = "Active";
 
-        if (stock.history && stock.history.length > 0) {
-            lastDate = stock.history[stock.history.length - 1].date;
+        if (stock.last_date) {
+            lastDate = stock.last_date;
         }
 
         if (!stock.is_active) {
@@ -20,6 +20,33 @@ function normalizePlanResponse(json) {
   return { plan: [], summary: null };
 }
 
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+// cât așteptăm după job: un job rămas "queued" înseamnă de obicei că run_forecast_worker nu rulează
+const JOB_POLL_MS = 1000;
+const JOB_MAX_QUEUED_MS = 60 * 1000;
+const JOB_MAX_WAIT_MS = 5 * 60 * 1000;
+
+async function waitForJob(jobId) {
+  const started = Date.now();
+  for (;;) {
+    const resp = await apiFetch(`/api/forecast/jobs/${jobId}/`);
+    if (!resp.ok) throw new Error(await resp.text());
+    const job = await resp.json();
+    if (job.status === 'done') return job;
+    if (job.status === 'failed') throw new Error(job.error || 'Forecast failed');
+
+    const waited = Date.now() - started;
+    if (job.status === 'queued' && waited >= JOB_MAX_QUEUED_MS) {
+      throw new Error(`Forecast job ${jobId} is still queued (is the forecast worker running?)`);
+    }
+    if (waited >= JOB_MAX_WAIT_MS) {
+      throw new Error(`Forecast job ${jobId} is still ${job.status}, try again later`);
+    }
+    await sleep(JOB_POLL_MS);
+  }
+}
+
 async function fetchAndSavePlan(stockId, months, review_days) {
   const resp = await apiFetch(`/api/forecast/${stockId}/`, {
     method: 'POST',
@@ -27,7 +54,10 @@ async function fetchAndSavePlan(stockId, months, review_days) {
     body: JSON.stringify({ months, review_days })
   });
   if (!resp.ok) throw new Error(await resp.text());
-  return normalizePlanResponse(await resp.json());
+  let json = await resp.json();
+  // 202: prognoza rulează în worker, urmărim job-ul până se termină
+  if (resp.status === 202 && json.job_id) json = await waitForJob(json.job_id);
+  return normalizePlanResponse(json);
 }
 
 function renderForecastChart(planData) {
@@ -110,7 +140,7 @@ function renderForecastChart(planData) {
 document.addEventListener('DOMContentLoaded', () => {
 
   const selectProduct = document.getElementById('selectProduct');
-  apiFetch('/api/stocks/')
+  apiFetch('/api/stocks/summary/?fields=id,stock_name&page_size=1000')
     .then(async r => {
       if (!r.ok) throw new Error(await r.text());
       const ct = r.headers.get('Content-Type') || '';
@@ -9,9 +9,10 @@ document.addEventListener('DOMContentLoaded', () => {
   const rowsContainer = document.getElementById('newHistoryRows');
   const addHistoryBtn = document.getElementById('addHistoryRow');
 
-  apiFetch('/api/stocks/')
+  apiFetch('/api/stocks/summary/?page_size=1000')
     .then(r => { if (!r.ok) throw new Error(r.status); return r.json(); })
-    .then(list => {
+    .then(data => {
+      const list = data.results;
       list.sort((a, b) => a.id - b.id);
       drawCards(list);
     })
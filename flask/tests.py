@@ -0,0 +1,66 @@
+import base64
+import json
+import threading
+import time
+import unittest
+
+import tokens
+
+
+def _jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp, "user_id": 1}).encode()).rstrip(b"=").decode()
+    return f"header.{payload}.semnatura"
+
+
+class TokenRefreshTests(unittest.TestCase):
+    def setUp(self):
+        tokens._locks.clear()
+        tokens._issued.clear()
+
+    def test_needs_refresh_margin(self):
+        now = time.time()
+        self.assertTrue(tokens.needs_refresh(None))
+        self.assertTrue(tokens.needs_refresh(_jwt(now - 1)))
+        self.assertTrue(tokens.needs_refresh(_jwt(now + 10), margin=30))
+        self.assertFalse(tokens.needs_refresh(_jwt(now + 60), margin=30))
+        # un token ilizibil e lăsat lui Django
+        self.assertFalse(tokens.needs_refresh("nu-e-jwt"))
+
+    def test_concurrent_refreshes_fetch_once(self):
+        calls = []
+        fresh = _jwt(time.time() + 300)
+
+        def fetch(refresh):
+            calls.append(refresh)
+            time.sleep(0.05)
+            return fresh
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(tokens.refresh_access("r", fetch)))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(calls, ["r"])
+        self.assertEqual(results, [fresh] * 8)
+
+    def test_rejected_token_is_not_reused(self):
+        issued = [_jwt(time.time() + 300), _jwt(time.time() + 301)]
+        fetch = lambda refresh: issued.pop(0)
+        first = tokens.refresh_access("r", fetch)
+        self.assertEqual(tokens.refresh_access("r", fetch), first)
+        second = tokens.refresh_access("r", fetch, rejected=first)
+        self.assertNotEqual(second, first)
+        self.assertEqual(tokens.refresh_access("r", fetch), second)
+
+    def test_pruning(self):
+        tokens.refresh_access("valid", lambda r: _jwt(time.time() + 300))
+        tokens.refresh_access("expirat", lambda r: _jwt(time.time() - 1))
+        tokens.refresh_access("revocat", lambda r: None)
+        self.assertEqual(set(tokens._issued), {"valid"})
+        self.assertEqual(set(tokens._locks), {"valid"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import base64
+import json
+import os
+import threading
+import time
+
+# tokenul e reîmprospătat cu atâtea secunde înainte să expire
+REFRESH_MARGIN = float(os.environ.get("TOKEN_REFRESH_MARGIN", "30"))
+
+
+def _claims(token):
+    """Payload-ul JWT, fără verificarea semnăturii (o face Django); {} dacă nu se poate citi."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return claims if isinstance(claims, dict) else {}
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return {}
+
+
+def token_expiry(token):
+    exp = _claims(token).get("exp")
+    try:
+        return float(exp) if exp is not None else None
+    except (ValueError, TypeError):
+        return None
+
+
+def token_user(token):
+    """`user_id` din token (claim-ul implicit simplejwt) sau None."""
+    return _claims(token).get("user_id")
+
+
+def needs_refresh(token, margin=REFRESH_MARGIN):
+    if not token:
+        return True
+    exp = token_expiry(token)
+    # un token pe care nu-l putem citi e lăsat lui Django (fallback pe 401)
+    return exp is not None and exp - time.time() <= margin
+
+
+_guard = threading.Lock()
+_locks = {}    # refresh token -> Lock
+_issued = {}   # refresh token -> ultimul access token obținut cu el
+
+
+def refresh_access(refresh_token, fetch, rejected=None):
+    """
+    Access token nou pentru `refresh_token`, cu un singur apel `fetch(refresh_token)`
+    chiar dacă mai multe request-uri ale aceleiași sesiuni cer refresh simultan:
+    cele care așteaptă primesc tokenul obținut de primul.
+    `rejected` e tokenul tocmai respins de Django (ex. revocat): nu e refolosit din cache.
+    """
+    with _guard:
+        lock = _locks.setdefault(refresh_token, threading.Lock())
+    with lock:
+        issued = _issued.get(refresh_token)
+        if issued and issued != rejected and not needs_refresh(issued):
+            return issued
+        access = fetch(refresh_token)
+        if access:
+            _issued[refresh_token] = access
+    if not access:
+        _forget(refresh_token, lock)
+    _prune()
+    return access
+
+
+def _forget(refresh_token, lock):
+    # refresh token expirat / revocat: sesiunea nu mai poate fi reîmprospătată
+    with _guard:
+        _issued.pop(refresh_token, None)
+        # un request care încă așteaptă lock-ul îl șterge el, după propriul fetch
+        if _locks.get(refresh_token) is lock and not lock.locked():
+            _locks.pop(refresh_token, None)
+
+
+def _prune():
+    now = time.time()
+    with _guard:
+        for refresh_token, access in list(_issued.items()):
+            exp = token_expiry(access)
+            if exp is not None and exp > now:
+                continue
+            lock = _locks.get(refresh_token)
+            if lock is not None and lock.locked():
+                continue
+            _issued.pop(refresh_token, None)
+            _locks.pop(refresh_token, None)
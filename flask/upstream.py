@@ -0,0 +1,207 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configurare din mediu; valorile implicite corespund rulării locale (Django pe 8000)
+DJANGO_URL = os.environ.get("DJANGO_API_URL", "http://127.0.0.1:8000").rstrip("/")
+POOL_SIZE = int(os.environ.get("UPSTREAM_POOL_SIZE", "20"))
+CONNECT_TIMEOUT = float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.environ.get("UPSTREAM_READ_TIMEOUT", "30"))
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def url(path):
+    return DJANGO_URL + path
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session():
+    """Sesiunea partajată (keep-alive, pool de conexiuni) pentru toate apelurile către Django."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                _session = s
+    return _session
+
+
+def _percentile_ms(values, q):
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+
+class LatencyStats:
+    """Latențe per endpoint upstream (metodă + cale cu id-urile normalizate)."""
+
+    def __init__(self, samples=500):
+        self._lock = threading.Lock()
+        self._samples = samples
+        self._data = {}
+
+    @staticmethod
+    def key(method, target):
+        path = re.sub(r"/\d+(?=/|$)", "/<id>", urlsplit(target).path)
+        return f"{method.upper()} {path}"
+
+    def record(self, key, seconds, error=False):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                entry = self._data[key] = {"count": 0, "errors": 0, "total": 0.0, "max": 0.0,
+                                           "recent": deque(maxlen=self._samples)}
+            entry["count"] += 1
+            entry["errors"] += int(error)
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            entry["recent"].append(seconds)
+
+    def snapshot(self):
+        out = {}
+        with self._lock:
+            for key, e in self._data.items():
+                recent = sorted(e["recent"])
+                out[key] = {
+                    "count": e["count"],
+                    "errors": e["errors"],
+                    "avg_ms": round(e["total"] / e["count"] * 1000, 2),
+                    "p50_ms": _percentile_ms(recent, 0.50),
+                    "p95_ms": _percentile_ms(recent, 0.95),
+                    "max_ms": round(e["max"] * 1000, 2),
+                }
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+
+stats = LatencyStats()
+
+
+def request(method, target, timeout=None, **kwargs):
+    """
+    Apel către Django prin sesiunea partajată. `timeout` e timeout-ul de citire;
+    cel de conectare vine din UPSTREAM_CONNECT_TIMEOUT. Latența (până la headere)
+    e înregistrată în `stats`; răspunsurile 5xx și erorile de rețea contează ca erori.
+    """
+    key = LatencyStats.key(method, target)
+    started = time.perf_counter()
+    try:
+        r = session().request(method, target, timeout=(CONNECT_TIMEOUT, timeout or READ_TIMEOUT), **kwargs)
+    except requests.exceptions.RequestException:
+        stats.record(key, time.perf_counter() - started, error=True)
+        raise
+    stats.record(key, time.perf_counter() - started, error=r.status_code >= 500)
+    return r
+
+
+def iter_body(r):
+    """
+    Corpul răspunsului pe bucăți, exact cum l-a trimis Django (fără decomprimare:
+    Content-Encoding e transmis mai departe); conexiunea revine în pool la final.
+    """
+    try:
+        for chunk in r.raw.stream(STREAM_CHUNK_SIZE, decode_content=False):
+            yield chunk
+    finally:
+        # serverul WSGI se poate opri după Content-Length fără să epuizeze generatorul;
+        # dacă tot corpul a fost citit, conexiunea poate fi refolosită
+        if getattr(r.raw, "length_remaining", None) == 0:
+            r.raw.release_conn()
+        r.close()
+
+
+class SizedStream:
+    """
+    Corpul cererii clientului, transmis mai departe pe bucăți cu Content-Length-ul
+    original (fără el, requests ar trimite chunked, pe care Django nu-l acceptă).
+    """
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+
+def read_body(r):
+    """Tot corpul, nedecomprimat (pentru răspunsurile mici, păstrate în cache)."""
+    try:
+        body = r.raw.read(decode_content=False)
+        r.raw.release_conn()
+        return body
+    finally:
+        r.close()
+
+
+CACHE_ENTRIES = int(os.environ.get("UPSTREAM_CACHE_ENTRIES", "256"))
+CACHE_MAX_BODY = int(os.environ.get("UPSTREAM_CACHE_MAX_BODY", str(1024 * 1024)))
+
+
+class ValidatedCache:
+    """
+    Răspunsuri GET cu ETag, per utilizator (LRU). O intrare e servită doar după ce
+    Django a confirmat-o cu 304 pentru tokenul curent, deci nu ocolește autorizarea.
+    """
+
+    def __init__(self, max_entries=CACHE_ENTRIES, max_body=CACHE_MAX_BODY):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+        self.max_body = max_body
+        self._counts = {"hits": 0, "passthrough_304": 0, "stored": 0}
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, etag, body, content_type, last_modified=None, content_encoding=None):
+        if key is None or len(body) > self.max_body:
+            return
+        with self._lock:
+            self._entries[key] = {"etag": etag, "body": body, "content_type": content_type,
+                                  "last_modified": last_modified, "content_encoding": content_encoding}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._counts["stored"] += 1
+
+    def count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"entries": len(self._entries), **self._counts}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for name in self._counts:
+                self._counts[name] = 0
+
+
+validated = ValidatedCache()